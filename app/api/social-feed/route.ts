@@ -1,46 +1,115 @@
-
 import { NextResponse, NextRequest } from 'next/server';
+import { Db, ObjectId } from 'mongodb';
 import clientPromise from '@/lib/mongodb';
 
 export const dynamic = 'force-dynamic';
 
+// Totals are approximate: read from the per-(source, sentiment) counters the
+// ingest pipeline maintains in 'post_counts', cached briefly per filter
+const TOTAL_TTL_MS = 60 * 1000;
+const totalCache = new Map<string, { total: number; expires: number }>();
+
+type Cursor = { t: number; id: string };
+
+// Opaque keyset token: base64url of the last post's (timestamp, _id)
+function encodeCursor(post: any): string {
+    const cursor: Cursor = { t: new Date(post.timestamp).getTime(), id: post._id.toString() };
+    return Buffer.from(JSON.stringify(cursor)).toString('base64url');
+}
+
+function decodeCursor(token: string): Cursor | null {
+    try {
+        const cursor = JSON.parse(Buffer.from(token, 'base64url').toString('utf8'));
+        if (typeof cursor.t !== 'number' || !ObjectId.isValid(cursor.id)) return null;
+        return cursor;
+    } catch {
+        return null;
+    }
+}
+
+async function approximateTotal(db: Db, sentiment: string | null, source: string | null, query: any) {
+    const key = `${source || 'All'}|${sentiment || 'All'}`;
+    const cached = totalCache.get(key);
+    if (cached && cached.expires > Date.now()) return cached.total;
+
+    const countQuery: any = {};
+    if (source) countQuery.source_lc = source;
+    if (sentiment) countQuery.sentiment_class = sentiment;
+    const counters = await db.collection('post_counts')
+        .aggregate([{ $match: countQuery }, { $group: { _id: null, total: { $sum: '$count' } } }])
+        .toArray();
+
+    let total = counters[0]?.total;
+    if (total === undefined) {
+        // Counters not built yet (run the Python ingest once); avoid a full scan
+        total = Object.keys(query).length === 0
+            ? await db.collection('posts').estimatedDocumentCount()
+            : await db.collection('posts').countDocuments(query, { limit: 10000, maxTimeMS: 2000 });
+    }
+    totalCache.set(key, { total, expires: Date.now() + TOTAL_TTL_MS });
+    return total;
+}
+
 export async function GET(request: NextRequest) {
     try {
         const { searchParams } = new URL(request.url);
-        const page = parseInt(searchParams.get('page') || '1');
-        const limit = parseInt(searchParams.get('limit') || '12'); // 3 cols * 4 rows
-        const sentiment = searchParams.get('sentiment');
-        const source = searchParams.get('source');
+        const limit = Math.min(100, Math.max(1, parseInt(searchParams.get('limit') || '12'))); // 3 cols * 4 rows
+        const sentimentParam = searchParams.get('sentiment');
+        const sourceParam = searchParams.get('source');
+        const token = searchParams.get('cursor');
+
+        const sentiment = sentimentParam && sentimentParam !== 'All' ? sentimentParam : null;
+        // Normalized lowercase copy of 'source' (set by the ingest pipeline),
+        // so this is an index equality match instead of a regex scan
+        const source = sourceParam && sourceParam !== 'All' ? sourceParam.trim().toLowerCase() : null;
 
         const client = await clientPromise;
         const db = client.db('financial_sentiment_db');
 
         const query: any = {};
-        if (sentiment && sentiment !== 'All') {
+        if (sentiment) {
             query['analysis.sentiment_class'] = sentiment;
         }
-        if (source && source !== 'All') {
-            // regex/fuzzy match or exact match depending on data
-            query['source'] = { $regex: source, $options: 'i' };
+        if (source) {
+            query['source_lc'] = source;
+        }
+
+        // Keyset pagination on (timestamp, _id): every page is an index range
+        // scan of 'limit' entries, however deep, instead of skip() over N docs
+        const feedQuery: any = { ...query };
+        if (token) {
+            const cursor = decodeCursor(token);
+            if (!cursor) {
+                return NextResponse.json({ error: 'Invalid cursor' }, { status: 400 });
+            }
+            const t = new Date(cursor.t);
+            feedQuery.$or = [
+                { timestamp: { $lt: t } },
+                { timestamp: t, _id: { $lt: new ObjectId(cursor.id) } }
+            ];
         }
 
-        const total = await db.collection('posts').countDocuments(query);
-        const totalPages = Math.ceil(total / limit);
+        const [rows, total] = await Promise.all([
+            db.collection('posts')
+                .find(feedQuery)
+                .sort({ timestamp: -1, _id: -1 })
+                .limit(limit + 1)
+                .toArray(),
+            approximateTotal(db, sentiment, source, query)
+        ]);
 
-        const posts = await db.collection('posts')
-            .find(query)
-            .sort({ timestamp: -1 })
-            .skip((page - 1) * limit)
-            .limit(limit)
-            .toArray();
+        const hasMore = rows.length > limit;
+        const posts = hasMore ? rows.slice(0, limit) : rows;
 
         return NextResponse.json({
             posts,
             pagination: {
                 total,
-                page,
-                totalPages,
-                limit
+                totalPages: Math.max(1, Math.ceil(total / limit)),
+                limit,
+                next: hasMore ? encodeCursor(posts[posts.length - 1]) : null,
+                hasMore,
+                approximate: true
             }
         });
 
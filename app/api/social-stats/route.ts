@@ -9,91 +9,85 @@ export async function GET() {
         const client = await clientPromise;
         const db = client.db('financial_sentiment_db');
 
-        // 1. Total Records
-        const totalPosts = await db.collection('posts').countDocuments({});
+        // Counts come from 'sentiment_rollups', maintained by the Python ingest
+        // (minute/hour/day x source x sentiment), so nothing here scans 'posts'
+        const rollups = db.collection('sentiment_rollups');
 
-        // 2. Sentiment Breakdown
-        const sentimentAgg = await db.collection('posts').aggregate([
+        // 1 + 2. Total Records & Sentiment Breakdown (all-time, from day buckets)
+        const totalsAgg = await rollups.aggregate([
+            { $match: { granularity: 'day' } },
             {
                 $group: {
-                    _id: "$analysis.sentiment_class",
-                    count: { $sum: 1 }
+                    _id: null,
+                    total: { $sum: '$total' },
+                    positive: { $sum: '$counts.Positive' },
+                    negative: { $sum: '$counts.Negative' },
+                    neutral: { $sum: '$counts.Neutral' },
+                    positiveConfidence: { $sum: '$confidence.Positive' },
+                    negativeConfidence: { $sum: '$confidence.Negative' },
+                    neutralConfidence: { $sum: '$confidence.Neutral' }
                 }
             }
         ]).toArray();
 
+        const totals: any = totalsAgg[0] || {};
+        const totalPosts = totals.total || 0;
+
         const sentimentCounts = {
-            Positive: 0,
-            Negative: 0,
-            Neutral: 0
+            Positive: totals.positive || 0,
+            Negative: totals.negative || 0,
+            Neutral: totals.neutral || 0
         };
 
-        sentimentAgg.forEach((item: any) => {
-            if (item._id === 'Positive') sentimentCounts.Positive = item.count;
-            if (item._id === 'Negative') sentimentCounts.Negative = item.count;
-            if (item._id === 'Neutral') sentimentCounts.Neutral = item.count;
-        });
+        const averageConfidence = {
+            Positive: sentimentCounts.Positive ? totals.positiveConfidence / sentimentCounts.Positive : 0,
+            Negative: sentimentCounts.Negative ? totals.negativeConfidence / sentimentCounts.Negative : 0,
+            Neutral: sentimentCounts.Neutral ? totals.neutralConfidence / sentimentCounts.Neutral : 0
+        };
 
-        // 3. Top Trend (Simple Word Frequency on recent 50 posts titles)
-        const recentPosts = await db.collection('posts')
-            .find({}, { projection: { title: 1 } })
-            .sort({ timestamp: -1 })
-            .limit(50)
+        // 3. Top Trend: Space-Saving snapshots over the full stream, written by
+        // the Python ingest (1h / 24h / 7d sliding windows)
+        const snapshots = await db.collection('trend_snapshots')
+            .find({ _id: { $in: ['1h', '24h', '7d'] } } as any)
             .toArray();
 
-        const wordMap: Record<string, number> = {};
-        const stopWords = new Set(['the', 'and', 'for', 'that', 'with', 'from', 'this', 'market', 'stock', 'video', 'news', 'update', 'analysis', 'price', 'today', '2025', '2024']);
-
-        recentPosts.forEach(post => {
-            const words = post.title.toLowerCase().match(/\b\w+\b/g) || [];
-            words.forEach((w: string) => {
-                if (w.length > 3 && !stopWords.has(w)) {
-                    wordMap[w] = (wordMap[w] || 0) + 1;
-                }
-            });
+        const trendingTerms: Record<string, { term: string; count: number; keyword: boolean }[]> = {};
+        snapshots.forEach((snapshot: any) => {
+            trendingTerms[snapshot.window] = (snapshot.terms || []).slice(0, 10).map((t: any) => ({
+                term: t.term,
+                count: t.count,
+                keyword: t.keyword
+            }));
         });
 
-        let topTrend = "General Market";
-        let maxCount = 0;
-
-        for (const [word, count] of Object.entries(wordMap)) {
-            if (count > maxCount) {
-                maxCount = count;
-                topTrend = word.charAt(0).toUpperCase() + word.slice(1);
-            }
-        }
+        // Prefer a MARKET_KEYWORDS phrase from the last 24h, else the top free term
+        const dayTerms = trendingTerms['24h'] || trendingTerms['7d'] || [];
+        const top = dayTerms.find(t => t.keyword) || dayTerms[0];
+        const topTrend = top
+            ? top.term.charAt(0).toUpperCase() + top.term.slice(1)
+            : "General Market";
 
-        // 4. Trend Data (Sentiment over time - Last 24h grouped by hour)
-        // Note: MongoDB Atlas Free Tier might limit some date operators, but standard $hour works.
-        // We'll simulate a proper time-series for the frontend by grouping.
+        // 4. Trend Data (Sentiment over time - Last 24h, hour buckets summed over sources)
         const now = new Date();
         const yesterday = new Date(now.getTime() - 24 * 60 * 60 * 1000);
+        yesterday.setUTCMinutes(0, 0, 0);
 
-        const trendAgg = await db.collection('posts').aggregate([
-            { $match: { timestamp: { $gte: yesterday } } },
+        const trendAgg = await rollups.aggregate([
+            { $match: { granularity: 'hour', bucket: { $gte: yesterday } } },
             {
                 $group: {
-                    _id: {
-                        hour: { $hour: "$timestamp" },
-                        day: { $dayOfMonth: "$timestamp" }
-                    },
-                    positive: {
-                        $sum: { $cond: [{ $eq: ["$analysis.sentiment_class", "Positive"] }, 1, 0] }
-                    },
-                    negative: {
-                        $sum: { $cond: [{ $eq: ["$analysis.sentiment_class", "Negative"] }, 1, 0] }
-                    },
-                    neutral: {
-                        $sum: { $cond: [{ $eq: ["$analysis.sentiment_class", "Neutral"] }, 1, 0] }
-                    }
+                    _id: '$bucket',
+                    positive: { $sum: '$counts.Positive' },
+                    negative: { $sum: '$counts.Negative' },
+                    neutral: { $sum: '$counts.Neutral' }
                 }
             },
-            { $sort: { "_id.day": 1, "_id.hour": 1 } }
+            { $sort: { _id: 1 } }
         ]).toArray();
 
         // Format trend data for Recharts
         const trendData = trendAgg.map((t: any) => ({
-            time: `${t._id.hour}:00`,
+            time: `${new Date(t._id).getUTCHours()}:00`,
             Positive: t.positive,
             Negative: t.negative,
             Neutral: t.neutral
@@ -117,7 +111,9 @@ export async function GET() {
         return NextResponse.json({
             totalPosts,
             sentimentCounts,
+            averageConfidence,
             topTrend,
+            trendingTerms,
             trendData,
             recentFeed
         });
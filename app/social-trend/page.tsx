@@ -41,7 +41,9 @@ export default function SocialTrendPage() {
     // Feed State
     const [feed, setFeed] = useState<FeedPost[]>([]);
     const [feedLoading, setFeedLoading] = useState(true);
-    const [pagination, setPagination] = useState({ page: 1, totalPages: 1, total: 0 });
+    const [pagination, setPagination] = useState({ page: 1, totalPages: 1, total: 0, hasMore: false });
+    // cursors[i] = keyset token that loads page i + 1 (page 1 needs none)
+    const [cursors, setCursors] = useState<(string | null)[]>([null]);
     const [filters, setFilters] = useState({ sentiment: 'All', source: 'All' });
 
     useEffect(() => {
@@ -65,17 +67,24 @@ export default function SocialTrendPage() {
     const fetchFeed = () => {
         setFeedLoading(true);
         const params = new URLSearchParams({
-            page: pagination.page.toString(),
             limit: '9',
             sentiment: filters.sentiment,
             source: filters.source
         });
+        const cursor = cursors[pagination.page - 1];
+        if (cursor) params.set('cursor', cursor);
 
         fetch(`/api/social-feed?${params}`)
             .then(res => res.json())
             .then(data => {
                 setFeed(data.posts);
                 setPagination(prev => ({ ...prev, ...data.pagination }));
+                const page = pagination.page;
+                setCursors(prev => {
+                    const next = prev.slice(0, page);
+                    next[page] = data.pagination.next;
+                    return next;
+                });
                 setFeedLoading(false);
             })
             .catch(err => console.error(err))
@@ -85,6 +94,7 @@ export default function SocialTrendPage() {
     const handleFilterChange = (key: string, value: string) => {
         setFilters(prev => ({ ...prev, [key]: value }));
         setPagination(prev => ({ ...prev, page: 1 })); // Reset to page 1
+        setCursors([null]);
     };
 
     // Helper to format large numbers
@@ -347,7 +357,7 @@ export default function SocialTrendPage() {
                         {/* Pagination Controls */}
                         <div className="p-4 border-t border-white/5 bg-white/5 flex items-center justify-between">
                             <span className="text-xs text-slate-500">
-                                Page {pagination.page} of {pagination.totalPages}
+                                Page {pagination.page} of ~{pagination.totalPages}
                             </span>
                             <div className="flex items-center gap-2">
                                 <button
@@ -358,8 +368,8 @@ export default function SocialTrendPage() {
                                     <ChevronLeft className="w-4 h-4" />
                                 </button>
                                 <button
-                                    onClick={() => setPagination(prev => ({ ...prev, page: Math.min(prev.totalPages, prev.page + 1) }))}
-                                    disabled={pagination.page >= pagination.totalPages}
+                                    onClick={() => setPagination(prev => ({ ...prev, page: prev.page + 1 }))}
+                                    disabled={!pagination.hasMore || !cursors[pagination.page]}
                                     className="p-1.5 rounded-lg bg-slate-800 text-slate-400 hover:text-white disabled:opacity-30 transition-colors"
                                 >
                                     <ChevronRight className="w-4 h-4" />
@@ -0,0 +1,41 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+
+# Ensure we can import from local scripts
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fetch_financial_posts import run_sources, get_writer, iter_google_news, iter_social_proxy
+
+def run_backfill(from_year=None, to_year=2005, dry_run=False):
+    """
+    One-off, resumable archive sweep for Google News and the social proxy.
+    Every (source, query, year) slice is marked complete in the cursor store
+    as soon as its posts are flushed (during the run, never on dry runs), so
+    an interrupted run picks up where it stopped. The current year is left to the regular incremental runs.
+    """
+    from_year = from_year or datetime.now().year - 1
+    years = list(range(from_year, to_year - 1, -1))
+    print(f"\n📦 Starting History Backfill ({from_year}-{to_year})...")
+
+    sources = {
+        "google_news": lambda: iter_google_news(years=years, backfill=True),
+        "social_proxy": lambda: iter_social_proxy(years=years, backfill=True),
+    }
+    pipeline, docs = run_sources(sources, dry_run=dry_run)
+    total = len(docs) if dry_run else sum(pipeline.saved.values())
+
+    pipeline.report()
+    if not dry_run:
+        print(f"   💾 Writer: {get_writer().stats.summary()}")
+    print(f"🏁 Backfill Finished. Total Items: {total}\n")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable archive backfill")
+    parser.add_argument("--from-year", type=int, default=None, help="newest year to backfill (default: last year)")
+    parser.add_argument("--to-year", type=int, default=2005, help="oldest year to backfill")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    run_backfill(args.from_year, args.to_year, args.dry_run)
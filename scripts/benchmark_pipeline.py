@@ -0,0 +1,421 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import inspect
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import fetch_engine, cursor_store
+from utils.cursor_store import CursorStore
+from utils.db_schema import bootstrap
+from utils.fetch_engine import HostLimiter, ValidatorStore
+from utils.financial_keywords import MARKET_KEYWORDS, HASHTAGS
+from utils.keyword_matcher import default_matcher
+from utils.profiling import start_profile
+from utils.replay import FixtureStore, ReplayAdapter, RecordingAdapter
+from utils.spool import PostSpool
+
+# The sources with recordable public endpoints (YouTube / MarketWatch are HTML scrapes)
+BENCH_SOURCES = ["reddit", "google_news", "mastodon", "hackernews", "lemmy", "medium"]
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+UNPACED = (1e6, 1e6, 64)
+
+# ==========================================
+# SYNTHETIC FIXTURES
+# ==========================================
+
+COMPANIES = ["Apex Bank", "Northwind", "Helios Energy", "Vertex Pharma", "Orion Motors", "Tata Steel",
+             "Infosys", "Reliance", "Globex", "Initech", "Umbrella Health", "Stark Industries"]
+VERBS = ["jumps", "slides", "rebounds", "stalls", "surges", "slips", "steadies", "tumbles"]
+CLAUSES = [
+    "as investors weigh the next move from the central bank", "after a volatile week for global markets",
+    "heading into earnings season", "while bond yields climb for a third day", "as fund managers rotate into defensives",
+    "as traders price in a softer inflation print", "on upbeat guidance from management", "after a surprise analyst downgrade",
+]
+SENTENCES = [
+    "Portfolio managers said positioning in {company} looked stretched ahead of the {month} data release.",
+    "Volume in {company} was {n} percent above its thirty day average by the close.",
+    "Several strategists flagged {kw} as the main risk for the quarter, citing tighter credit.",
+    "The move came as large banks slipped and the dollar firmed against {n} major currencies.",
+    "{company} said it would review its {month} outlook, sending options activity higher.",
+    "Retail flows into {kw} themed funds reached {n} million over the past week.",
+    "Desk notes pointed to {kw} and a crowded short base as reasons for the swing.",
+]
+OFF_TOPIC = [
+    "Weekend hiking trip photos from the lake district, the weather was perfect all day",
+    "My cat has learned to open the fridge door and I need advice on child locks",
+    "Best sourdough starter routine for a cold kitchen, looking for tips from bakers",
+    "Finished my first marathon today after training for eight months with the club",
+]
+MONTHS = ["January", "March", "April", "June", "August", "October", "November"]
+PUBLISHERS = ["Reuters", "Bloomberg", "CNBC", "Economic Times", "Mint"]
+
+class _Stories:
+    """ Deterministic post texts: finance headlines, off-topic chatter and syndicated repeats. """
+    def __init__(self, rng, syndicated=0.15, off_topic=0.2):
+        self.rng = rng
+        self.syndicated = syndicated
+        self.off_topic = off_topic
+        self.pool = []
+
+    def next(self):
+        roll = self.rng.random()
+        if roll < self.off_topic:
+            return self.rng.choice(OFF_TOPIC), ""
+        if roll < self.off_topic + self.syndicated and self.pool:
+            # Same story on another source: the near-dup stage should fold it
+            return self.rng.choice(self.pool)
+        rng = self.rng
+        kw = rng.choice(MARKET_KEYWORDS)
+        title = f"{rng.choice(COMPANIES)} {rng.choice(VERBS)} {rng.randint(1, 19)}% {rng.choice(CLAUSES)}, {kw} in focus"
+        body = " ".join(sentence.format(company=rng.choice(COMPANIES), kw=rng.choice(MARKET_KEYWORDS),
+                                        month=rng.choice(MONTHS), n=rng.randint(2, 400))
+                        for sentence in rng.sample(SENTENCES, 3))
+        story = (title, body)
+        self.pool.append(story)
+        return story
+
+def _rss(items, namespaces=""):
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"{namespaces}><channel>{"".join(items)}</channel></rss>'
+
+def synthesize(directory, responses=12, per_response=25, seed=7):
+    """
+    Writes DIR/responses.jsonl with 'responses' recordings per source endpoint
+    in each API's own format, so the fetchers' real parsing code runs.
+    """
+    rng = random.Random(seed)
+    stories = _Stories(rng)
+    store = FixtureStore(directory)
+    if os.path.exists(store.path): os.remove(store.path)
+    now = datetime.now()
+    next_id = iter(range(10_000_000, 100_000_000))
+
+    def when():
+        return now - timedelta(seconds=rng.randint(0, 86_400))
+
+    for n in range(responses):
+        keyword = rng.choice(MARKET_KEYWORDS)
+        query = keyword.replace(" ", "+")
+
+        children = []
+        for _ in range(per_response):
+            title, body = stories.next()
+            post_id = f"s{next(next_id)}"
+            children.append({"data": {
+                "id": post_id, "title": title, "selftext": body, "author": f"user{rng.randint(1, 5000)}",
+                "permalink": f"/r/investing/comments/{post_id}/", "subreddit": "investing",
+                "created_utc": when().timestamp(), "score": rng.randint(0, 900), "num_comments": rng.randint(0, 120),
+            }})
+        # Chains of three pages, like a keyword chunk paging back with 'after'
+        after = f"t3_{children[-1]['data']['id']}" if n % 3 != 2 else None
+        store.add(f"https://www.reddit.com/search.json?q={query}&sort=new&limit=25",
+                  200, {"Content-Type": "application/json"},
+                  json.dumps({"data": {"children": children, "after": after}}), rng.uniform(250, 900))
+
+        items = []
+        for _ in range(per_response):
+            title, _ = stories.next()
+            link = f"https://news.example.com/articles/{next(next_id)}"
+            items.append(f"<item><title>{escape(title)} - {rng.choice(PUBLISHERS)}</title><link>{link}</link>"
+                         f"<pubDate>{format_datetime(when())}</pubDate><description>{escape(title)}</description></item>")
+        store.add(f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en",
+                  200, {"Content-Type": "application/xml; charset=utf-8"}, _rss(items), rng.uniform(150, 600))
+
+        statuses = []
+        for _ in range(per_response):
+            title, body = stories.next()
+            status_id = next(next_id)
+            statuses.append({
+                "id": str(status_id), "content": f"<p>{escape(title)}</p><p>{escape(body)}</p>",
+                "url": f"https://mastodon.social/@trader/{status_id}",
+                "account": {"display_name": "", "username": f"trader{rng.randint(1, 900)}"},
+                "favourites_count": rng.randint(0, 40), "replies_count": rng.randint(0, 10), "reblogs_count": rng.randint(0, 15),
+            })
+        store.add(f"https://mastodon.social/api/v1/timelines/tag/{rng.choice(HASHTAGS)}?limit=40",
+                  200, {"Content-Type": "application/json"}, json.dumps(statuses), rng.uniform(100, 400))
+
+        hits = []
+        for _ in range(per_response):
+            title, _ = stories.next()
+            object_id = next(next_id)
+            hits.append({"objectID": str(object_id), "title": title, "url": f"https://blog.example.com/{object_id}",
+                         "author": f"hn{rng.randint(1, 900)}", "points": rng.randint(1, 400),
+                         "num_comments": rng.randint(0, 200), "created_at_i": int(when().timestamp())})
+        store.add(f"http://hn.algolia.com/api/v1/search?query={query}&tags=story&hitsPerPage=50",
+                  200, {"Content-Type": "application/json"}, json.dumps({"hits": hits}), rng.uniform(80, 300))
+
+        posts = []
+        for _ in range(per_response):
+            title, body = stories.next()
+            post_id = next(next_id)
+            posts.append({"post": {"id": post_id, "name": title, "body": body, "creator_id": rng.randint(1, 900),
+                                   "ap_id": f"https://lemmy.world/post/{post_id}"},
+                          "counts": {"score": rng.randint(0, 300), "comments": rng.randint(0, 60)}})
+        store.add(f"https://lemmy.world/api/v3/post/list?community_name=finance&sort=New&limit=40",
+                  200, {"Content-Type": "application/json"}, json.dumps({"posts": posts}), rng.uniform(150, 500))
+
+        items = []
+        for _ in range(per_response):
+            title, _ = stories.next()
+            link = f"https://medium.com/@writer/{next(next_id)}"
+            items.append(f"<item><title>{escape(title)}</title><link>{link}</link>"
+                         f"<dc:creator>Writer {rng.randint(1, 300)}</dc:creator></item>")
+        store.add(f"https://medium.com/feed/tag/{keyword.replace(' ', '-')}",
+                  200, {"Content-Type": "text/xml; charset=UTF-8"},
+                  _rss(items, ' xmlns:dc="http://purl.org/dc/elements/1.1/"'), rng.uniform(200, 700))
+    return store
+
+# ==========================================
+# MODELS / DATABASE
+# ==========================================
+
+class StubAIClient:
+    """
+    Model-free stand-in for AgriAIClient with the same analyze_batch() output:
+    keyword triage decides relevance (ambiguous counts as relevant), a hash of
+    the text picks the sentiment, and every call sleeps batch_ms + item_ms per
+    text so the inference stage has a fixed, known cost.
+    """
+    cache = None
+
+    def __init__(self, item_ms=2.0, batch_ms=5.0):
+        self.item_ms = item_ms
+        self.batch_ms = batch_ms
+        self.matcher = default_matcher()
+        self.prefilter_stats = {"hit": 0, "miss": 0, "ambiguous": 0}
+
+    def analyze_batch(self, texts, batch_size=None):
+        time.sleep((self.batch_ms + self.item_ms * len(texts)) / 1000)
+        results = []
+        for text in texts:
+            if not text:
+                results.append(None)
+                continue
+            tags, prescore, decision = self.matcher.triage(text)
+            self.prefilter_stats[decision] += 1
+            if decision == "miss":
+                results.append({"is_relevant": False, "sentiment_class": "Neutral", "confidence": 0, "summary": ""})
+                continue
+            digest = hashlib.blake2b(text.encode(), digest_size=2).digest()
+            results.append({
+                "is_relevant": True,
+                "sentiment_class": SENTIMENTS[digest[0] % len(SENTIMENTS)],
+                "confidence": 0.5 + digest[1] / 512,
+                "summary": text[:100] + "...",
+                "tags": tags,
+                "prescore": prescore,
+            })
+        return results
+
+def mongomock_db():
+    """ In-memory 'posts' database. """
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+    if "sort" not in inspect.signature(BulkOperationBuilder.add_update).parameters:
+        # pymongo >= 4.11 passes sort= to bulk update builders; older mongomock rejects it
+        add_update = BulkOperationBuilder.add_update
+        BulkOperationBuilder.add_update = lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+    return mongomock.MongoClient().get_database("financial_sentiment_bench")
+
+def mongod_db(uri, live_uri):
+    """ Scratch database on a real mongod, dropped first. Never the live one. """
+    import pymongo
+    db_name = uri.split('/')[-1].split('?')[0]
+    if not db_name or db_name == (live_uri.split('/')[-1].split('?')[0] or 'financial_sentiment_db'):
+        raise SystemExit(f"Refusing to benchmark on the live database '{db_name or 'financial_sentiment_db'}'")
+    client = pymongo.MongoClient(uri)
+    client.drop_database(db_name)
+    return client.get_database(db_name)
+
+def peak_rss_mb():
+    """ Peak resident set size of this process (None where 'resource' is unavailable). """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+# ==========================================
+# HARNESS
+# ==========================================
+
+def isolate(ingest, db, workdir, model, adapter, paced=False):
+    """
+    Points the ingest module at the benchmark database, model and transport,
+    with fresh cursor / validator stores so high-water marks from real runs
+    (or earlier passes of another benchmark) don't hide fixture posts, and a
+    scratch spool. The scratch DB is migrated first, as ingest requires.
+    """
+    bootstrap(db)
+    ingest._db = db
+    ingest.AI = model
+    cursor_store._store = CursorStore(os.path.join(workdir, "cursors.sqlite"))
+    fetch_engine._validators = ValidatorStore(os.path.join(workdir, "http_validators.sqlite"))
+    ingest._spool = PostSpool(os.path.join(workdir, "spool"))
+    if not paced:
+        fetch_engine.LIMITER = HostLimiter(limits={}, default=UNPACED)
+    fetch_engine.use_transport(adapter)
+
+def pass_report(pipeline, elapsed, writer):
+    stats = pipeline.stats
+    fetched = stats["fetch"].items_in
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "fetched": fetched,
+        "inferred": stats["inference"].items_in,
+        "accepted": stats["inference"].items_out,
+        "queued": sum(pipeline.saved.values()),
+        "written_total": writer.stats.written,
+        "posts_per_sec": round(fetched / elapsed, 1) if elapsed else 0.0,
+        "stages": {
+            name: {
+                "calls": s.calls,
+                "busy_s": round(s.busy, 3),
+                "p50_ms": round(s.percentile(0.5) * 1000, 2),
+                "p99_ms": round(s.percentile(0.99) * 1000, 2),
+            } for name, s in stats.items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def print_report(report):
+    print(f"\n📊 Pipeline benchmark ({report['model']} model, {report['target']}, {len(report['passes'])} pass(es))")
+    for n, p in enumerate(report["passes"], 1):
+        print(f"   Pass {n}: {p['fetched']} fetched, {p['inferred']} inferred, {p['accepted']} accepted, "
+              f"{p['queued']} queued in {p['elapsed_s']:.2f}s -> {p['posts_per_sec']:.1f} posts/s")
+        for name, s in p["stages"].items():
+            print(f"      {name:<9} calls={s['calls']:<5} busy={s['busy_s']:7.2f}s "
+                  f"p50={s['p50_ms']:8.1f}ms p99={s['p99_ms']:8.1f}ms")
+    rss = report["peak_rss_mb"]
+    print(f"   🧮 Peak RSS: {f'{rss:.0f} MB' if rss is not None else 'n/a'}")
+    print(f"   🎞️ Replay: {report['replay']['served']} responses served, {report['replay']['misses']} unmatched")
+
+def compare(report, baseline, tolerance):
+    """ Prints deltas against a saved report; returns the regressions beyond 'tolerance'. """
+    regressions = []
+    current, previous = report["passes"][0], baseline["passes"][0]
+    checks = [("posts/s", current["posts_per_sec"], previous["posts_per_sec"], True)]
+    for name, s in current["stages"].items():
+        old = previous["stages"].get(name)
+        if old: checks.append((f"{name} p99", s["p99_ms"], old["p99_ms"], False))
+    if report.get("peak_rss_mb") and baseline.get("peak_rss_mb"):
+        checks.append(("peak RSS", report["peak_rss_mb"], baseline["peak_rss_mb"], False))
+
+    print("\n📐 Against baseline (first pass):")
+    for label, value, old, higher_is_better in checks:
+        if not old: continue
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+        marker = "❌" if worse > tolerance else "✅"
+        if worse > tolerance: regressions.append(label)
+        print(f"   {marker} {label:<15} {old:10.1f} -> {value:10.1f} ({change:+.0%})")
+    return regressions
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="fin_pipeline_bench_")
+    if args.record:
+        store = FixtureStore(args.record)
+        adapter = RecordingAdapter(store, pool_connections=16, pool_maxsize=16, max_retries=1)
+    else:
+        if args.fixtures:
+            store = FixtureStore(args.fixtures).load()
+        else:
+            store = synthesize(os.path.join(workdir, "fixtures"), args.responses, args.per_response, args.seed)
+        adapter = ReplayAdapter(store, latency_scale=args.replay_latency)
+
+    quiet = open(os.devnull, "w") if not args.verbose else sys.stdout
+    with contextlib.redirect_stdout(quiet):
+        import fetch_financial_posts as ingest
+        if args.model == "real":
+            from utils.ai_client import AgriAIClient
+            model = AgriAIClient(cache=args.cache, lazy=False)
+        else:
+            model = StubAIClient(args.stub_item_ms, args.stub_batch_ms)
+        if args.mongo_uri and not args.record:
+            db, target = mongod_db(args.mongo_uri, ingest.MONGO_URI), "mongod"
+        else:
+            db, target = mongomock_db(), "mongomock"
+        # Recording talks to the real sites -> keep their rate limits
+        isolate(ingest, db, workdir, model, adapter, paced=args.paced or bool(args.record))
+
+    random.seed(args.seed)
+    selected = {name: ingest.SOURCES[name] for name in args.source}
+    passes = []
+    try:
+        for n in range(args.passes):
+            started = time.perf_counter()
+            run = start_profile(args.profile, args.profile_sample, label=f"{args.model} pass {n + 1}") if args.profile else None
+            with contextlib.redirect_stdout(quiet):
+                pipeline, _ = ingest.run_sources(selected, inference_workers=args.inference_workers)
+            if run: run.finish(model=args.model, sources=args.source, pass_number=n + 1)
+            passes.append(pass_report(pipeline, time.perf_counter() - started, ingest.get_writer()))
+    finally:
+        fetch_engine.use_transport(None)
+
+    if args.record:
+        print(f"🎙️ Recorded {len(store.responses)} responses to {store.path}")
+    return {
+        "model": args.model,
+        "target": target,
+        "sources": args.source,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "fixtures": len(store.responses),
+        "replay": {"served": getattr(adapter, "served", 0), "misses": getattr(adapter, "misses", 0)},
+        "passes": passes,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay benchmark for the fetch -> analyze -> upsert pipeline")
+    parser.add_argument("--fixtures", help="recorded responses dir (default: synthetic fixtures)")
+    parser.add_argument("--record", metavar="DIR", help="fetch live and record responses to DIR instead of replaying")
+    parser.add_argument("--synthesize", metavar="DIR", help="only write synthetic fixtures to DIR")
+    parser.add_argument("--responses", type=int, default=12, help="synthetic responses per source endpoint")
+    parser.add_argument("--per-response", type=int, default=25, help="posts per synthetic response")
+    parser.add_argument("--source", action="append", choices=BENCH_SOURCES, help="benchmark only this source (repeatable)")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub", help="stub classifier or the real AgriAIClient")
+    parser.add_argument("--cache", action="store_true", help="let the real model use the inference cache")
+    parser.add_argument("--stub-item-ms", type=float, default=2.0, help="stub model cost per text")
+    parser.add_argument("--stub-batch-ms", type=float, default=5.0, help="stub model cost per batch")
+    parser.add_argument("--mongo-uri", help="scratch DB on a local mongod (default: mongomock); dropped first")
+    parser.add_argument("--inference-workers", type=int, default=1)
+    parser.add_argument("--passes", type=int, default=1, help="repeat the run (later passes see known posts)")
+    parser.add_argument("--paced", action="store_true", help="keep the per-host rate limits while replaying")
+    parser.add_argument("--replay-latency", type=float, default=0.0, help="sleep recorded response times x this factor")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the report as JSON (to diff / use as --baseline)")
+    parser.add_argument("--baseline", help="compare with a previous --output report")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="regression threshold for --baseline")
+    parser.add_argument("--verbose", action="store_true", help="show the fetchers' own logs")
+    parser.add_argument("--profile", metavar="DIR", help="write a span trace + summary per pass to DIR")
+    parser.add_argument("--profile-sample", action="store_true", help="with --profile, also sample stacks per stage")
+    args = parser.parse_args()
+    args.source = args.source or BENCH_SOURCES
+
+    if args.synthesize:
+        store = synthesize(args.synthesize, args.responses, args.per_response, args.seed)
+        print(f"🌱 Wrote {len(store.responses)} synthetic responses to {store.path}")
+        sys.exit(0)
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"   💾 Report saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"⚠️ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
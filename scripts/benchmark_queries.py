@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+import pymongo
+
+from utils.db_schema import POST_INDEXES, bootstrap
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../.env.local'))
+MONGO_URI = os.getenv('MONGODB_URI') or 'mongodb://localhost:27017/financial_sentiment_db'
+
+SOURCES = ["reddit", "news", "youtube", "mastodon", "hackernews", "medium", "lemmy", "marketwatch", "twitter"]
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+
+def query_shapes(now):
+    """ The filters / sorts the Next.js routes send, as (name, filter, sort, limit). """
+    return [
+        ("realtime-posts latest 50", {}, [("timestamp", -1)], 50),
+        ("social-feed sentiment", {"analysis.sentiment_class": "Negative"}, [("timestamp", -1)], 12),
+        ("social-feed source", {"source_lc": "reddit"}, [("timestamp", -1)], 12),
+        ("social-feed source+sentiment", {"source_lc": "reddit", "analysis.sentiment_class": "Positive"}, [("timestamp", -1)], 12),
+        ("social-feed page 50", {"source_lc": "news"}, [("timestamp", -1)], 12 * 50),
+        ("social-stats last 24h", {"timestamp": {"$gte": now - timedelta(hours=24)}}, None, 0),
+        ("upsert lookup", {"reddit_id": "rd_5000"}, None, 1),
+    ]
+
+def seed(collection, total, batch=10_000):
+    """ Inserts 'total' synthetic posts spread over the last two years. """
+    now = datetime.now()
+    started = time.time()
+    for start in range(0, total, batch):
+        docs = []
+        for n in range(start, min(total, start + batch)):
+            source = random.choice(SOURCES)
+            docs.append({
+                "reddit_id": f"rd_{n}",
+                "title": f"Synthetic post {n}",
+                "source": source,
+                "source_lc": source,
+                "timestamp": now - timedelta(seconds=random.randint(0, 2 * 365 * 86400)),
+                "analysis": {"sentiment_class": random.choice(SENTIMENTS), "confidence": random.random()},
+                "metrics": {"likes": random.randint(0, 500), "comments": random.randint(0, 50), "shares": 0}
+            })
+        collection.insert_many(docs, ordered=False)
+        if (start // batch) % 50 == 0:
+            print(f"   🌱 {start + len(docs):,}/{total:,} seeded ({time.time() - started:.0f}s)")
+
+def plan_stages(plan):
+    """ Flattens a winning plan into 'LIMIT <- FETCH <- IXSCAN(name)'. """
+    stages = []
+    while plan:
+        stage = plan.get("stage")
+        if stage == "IXSCAN": stage += f"({plan.get('indexName')})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages)
+
+def explain(collection, name, filter, sort, limit):
+    cursor = collection.find(filter)
+    if sort: cursor = cursor.sort(sort)
+    if limit: cursor = cursor.limit(limit)
+    result = cursor.explain()
+    stats = result.get("executionStats", {})
+    stages = plan_stages(result.get("queryPlanner", {}).get("winningPlan", {}))
+    marker = "❌" if "COLLSCAN" in stages or "SORT" in stages.split(" <- ") else "✅"
+    print(f"   {marker} {name:<30} {stats.get('executionTimeMillis', 0):>7} ms  "
+          f"keys={stats.get('totalKeysExamined', 0):<9} docs={stats.get('totalDocsExamined', 0):<9} {stages}")
+    return stages
+
+def run_benchmark(total, db_name, reseed=False, keep=False):
+    # The scratch DB gets dropped / reseeded -> never point this at the real one
+    if db_name == (MONGO_URI.split('/')[-1].split('?')[0] or 'financial_sentiment_db'):
+        raise SystemExit(f"Refusing to benchmark on the live database '{db_name}'")
+    client = pymongo.MongoClient(MONGO_URI)
+    db = client[db_name]
+    collection = db['posts']
+
+    if reseed or collection.estimated_document_count() < total:
+        print(f"\n🌱 Seeding {total:,} synthetic posts into '{db_name}.posts'...")
+        collection.drop()
+        db['schema_meta'].drop()
+        seed(collection, total)
+
+    now = datetime.now()
+    print(f"\n🐢 Without indexes ({collection.estimated_document_count():,} docs):")
+    collection.drop_indexes()
+    for shape in query_shapes(now):
+        explain(collection, *shape)
+
+    print(f"\n🏗️  Building {len(POST_INDEXES)} indexes...")
+    started = time.time()
+    bootstrap(db)
+    print(f"   Built in {time.time() - started:.1f}s")
+
+    print("\n🚀 With indexes:")
+    scans = [explain(collection, *shape) for shape in query_shapes(now)]
+    remaining = sum("COLLSCAN" in stages for stages in scans)
+    print(f"\n🏁 Collection scans left: {remaining}\n")
+
+    if not keep:
+        client.drop_database(db_name)
+    return remaining
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explain-plan benchmark for the posts query shapes")
+    parser.add_argument("--docs", type=int, default=10_000_000, help="synthetic posts to seed")
+    parser.add_argument("--db", default="financial_sentiment_bench", help="scratch database (dropped afterwards)")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database for reruns")
+    args = parser.parse_args()
+    run_benchmark(args.docs, args.db, args.reseed, args.keep)
@@ -0,0 +1,38 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+
+# Ensure we can import from local scripts
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fetch_financial_posts import get_db
+from utils.db_schema import LATEST_VERSION, MIGRATIONS, bootstrap, schema_version
+from utils.post_counts import PostCounter
+from utils.rollups import SentimentRollups
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="posts collection maintenance")
+    parser.add_argument("command", nargs="?", choices=["status", "migrate"], default="status",
+                        help="status: show pending migrations (default); migrate: apply them and create missing indexes")
+    parser.add_argument("--migrate", action="store_true", help="same as the 'migrate' command")
+    parser.add_argument("--rebuild-counts", action="store_true", help="recompute the per-filter feed totals")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="recompute the dashboard sentiment rollups")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="only rebuild rollups from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = get_db()
+    if args.migrate or args.command == "migrate":
+        indexes = bootstrap(db)
+        print(f"🏁 Schema version {schema_version(db)}, indexes: {', '.join(indexes)}")
+    elif not (args.rebuild_counts or args.rebuild_rollups):
+        version = schema_version(db)
+        print(f"🏁 Schema version {version} of {LATEST_VERSION}")
+        for target, name, _ in MIGRATIONS:
+            if target > version:
+                print(f"   ⏳ Pending migration {target}: {name} (ingest refuses to run until `manage_db.py migrate`)")
+    if args.rebuild_counts:
+        PostCounter(db).rebuild()
+    if args.rebuild_rollups:
+        SentimentRollups(db).rebuild(since=args.since)
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure we can import from local scripts
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.ai_client import AgriAIClient
+from utils.metrics import REGISTRY, CONTENT_TYPE
+
+HOST = os.getenv('FIN_AI_SERVER_HOST', '127.0.0.1')
+PORT = int(os.getenv('FIN_AI_SERVER_PORT', '8765'))
+
+class ModelServer:
+    """
+    Long-lived local model process. Loads both models once and serves
+    POST /analyze {"texts": [...]} -> {"results": [...]} plus GET /health
+    and GET /metrics (model latency / batch sizes of this process).
+    Point fetch jobs at it with FIN_AI_SERVER_URL=http://127.0.0.1:8765.
+    """
+    def __init__(self, ai=None, host=HOST, port=PORT):
+        self.ai = ai or AgriAIClient(lazy=False)
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = REGISTRY.render().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if self.path != "/health":
+                    return self._send(404, {"error": "not found"})
+                ai = server.ai
+                self._send(200, {
+                    "status": "ok",
+                    "backend": ai.backend,
+                    "models_loaded": bool(ai.classifier and ai.model),
+                    "cache": ai.cache.stats() if ai.cache else None
+                })
+
+            def do_POST(self):
+                if self.path != "/analyze":
+                    return self._send(404, {"error": "not found"})
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    texts = json.loads(self.rfile.read(length))["texts"]
+                except (ValueError, KeyError) as e:
+                    return self._send(400, {"error": f"bad request: {e}"})
+                # One model instance -> one batch at a time
+                with server.lock:
+                    results = server.ai.analyze_batch(texts)
+                self._send(200, {"results": results})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        host, port = self.httpd.server_address[:2]
+        print(f"🧠 [Model Server] Listening on http://{host}:{port}")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.httpd.server_close()
+
+if __name__ == "__main__":
+    ModelServer().serve_forever()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPTS_DIR)
+
+def profile_imports(module="fetch_financial_posts", top=15):
+    """
+    Imports 'module' in a fresh interpreter with -X importtime and prints the
+    slowest imports (cumulative and self time). Returns total import seconds.
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+        except ValueError:
+            continue
+
+    print(f"\n⏱️  Cold import of '{module}': {wall:.2f}s wall ({len(rows)} modules)")
+    if proc.returncode != 0:
+        print(f"   ⚠️ Import failed:\n{proc.stderr.splitlines()[-1] if proc.stderr else ''}")
+
+    print(f"\n   Top {top} by cumulative time:")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"   {cumulative_us / 1e6:7.3f}s  {name.strip()}")
+
+    print(f"\n   Top {top} by self time:")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[0], reverse=True)[:top]:
+        print(f"   {self_us / 1e6:7.3f}s  {name.strip()}")
+    return wall
+
+def profile_model_load():
+    """ Times the deferred part: loading both models on first use. """
+    from utils.ai_client import AgriAIClient
+    ai = AgriAIClient(cache=False)
+    started = time.perf_counter()
+    ai.load()
+    print(f"\n🧠 Model load on first use: {time.perf_counter() - started:.2f}s")
+
+def diff_profiles(old_path, new_path, top=15):
+    """ Compares two run summaries (summary.json, or the run directories) written by --profile. """
+    from utils.profiling import diff_summaries
+    summaries = []
+    for path in (old_path, new_path):
+        if os.path.isdir(path): path = os.path.join(path, "summary.json")
+        with open(path, encoding="utf-8") as f:
+            summaries.append(json.load(f))
+    old, new = summaries
+    print(f"\n🔬 Span time: {old.get('label')} ({old['wall_s']:.1f}s) -> {new.get('label')} ({new['wall_s']:.1f}s)")
+    for name, a, b, change in diff_summaries(old, new, top):
+        shown = f"{change:+.0%}" if change is not None else "new"
+        print(f"   {name:<28} {a:>10.1f}ms -> {b:>10.1f}ms  {shown:>6}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup / import-time profiler")
+    parser.add_argument("--module", default="fetch_financial_posts")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--with-models", action="store_true", help="also time the lazy model load")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two --profile runs instead")
+    args = parser.parse_args()
+
+    if args.diff:
+        diff_profiles(*args.diff, top=args.top)
+        sys.exit(0)
+    profile_imports(args.module, args.top)
+    if args.with_models:
+        profile_model_load()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import argparse
+
+# Ensure we can import from local scripts
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import fetch_financial_posts as ingest
+from utils.spool import PostSpool, read_segment, replay
+
+def list_segments(spool):
+    segments = spool.segments()
+    total = 0
+    for path in segments:
+        count = sum(1 for _ in read_segment(path))
+        total += count
+        print(f"      📼 {os.path.basename(path)}: {count} posts, {os.path.getsize(path) / 1e6:.1f} MB")
+    print(f"   {len(segments)} segment(s), {total} posts awaiting replay in {spool.directory}")
+
+def replay_once(spool, workers, keep):
+    ingest.require_schema()
+    started = time.time()
+    segments, docs, failed = replay(spool, ingest.make_writer, workers=workers, keep=keep)
+    if segments:
+        try:
+            ingest.get_trends().flush()
+        except Exception as e:
+            print(f"      ⚠️ Trend Snapshot Error: {e}")
+    print(f"🏁 Replayed {docs} posts from {segments - failed}/{segments} segment(s) in {time.time() - started:.1f}s"
+          + (f" ({failed} kept for the next replay)" if failed else ""))
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load spooled posts into MongoDB")
+    parser.add_argument("--dir", default=None, help="spool directory (FIN_SPOOL_DIR, default .cache/spool)")
+    parser.add_argument("--workers", type=int, default=None, help="segments loaded in parallel (FIN_SPOOL_WORKERS, default 4)")
+    parser.add_argument("--keep", action="store_true", help="move loaded segments to <dir>/done instead of deleting them")
+    parser.add_argument("--list", action="store_true", help="only list the segments awaiting replay")
+    parser.add_argument("--watch", type=float, default=None, metavar="SECS", help="keep replaying every SECS seconds")
+    args = parser.parse_args()
+
+    # Replay never appends; 'only' keeps PostSpool from treating this as a wal run
+    spool = PostSpool(args.dir, mode="only")
+    if args.list:
+        list_segments(spool)
+        sys.exit(0)
+    if args.watch is None:
+        sys.exit(1 if replay_once(spool, args.workers, args.keep) else 0)
+
+    print("🚀 Spool replayer started (Ctrl+C to stop)")
+    try:
+        while True:
+            if spool.segments() or spool.recover():
+                replay_once(spool, args.workers, args.keep)
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        print("\n🛑 Replayer stopped.")
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+# Ensure we can import from local scripts
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import fetch_financial_posts as ingest
+from utils.fetch_engine import HTTP_STATS
+from utils.query_scheduler import QueryScheduler
+from utils.metrics import REGISTRY, configure_logging, log_event, serve as serve_metrics
+
+CYCLE_POSTS = REGISTRY.counter("fin_scheduler_new_posts", "New posts credited to a scheduled source", ["source"])
+CYCLE_REQUESTS = REGISTRY.counter("fin_scheduler_requests", "Requests spent on a scheduled source", ["source"])
+
+def build_scheduler(names=None, budget=None):
+    sources = {name: (ingest.SOURCES[name], queries, group_size)
+               for name, (queries, group_size) in ingest.QUERY_SOURCES.items()
+               if not names or name in names}
+    scheduler = QueryScheduler(sources, budget=budget)
+    ingest.INSERT_LISTENERS.append(scheduler.observe_inserted)
+    return scheduler
+
+def print_plan(plan):
+    for name, (groups, allowance) in plan.items():
+        shown = ", ".join(" | ".join(group) for group in groups[:4])
+        more = f" (+{len(groups) - 4} more)" if len(groups) > 4 else ""
+        print(f"      🎯 {name:<12} {allowance:>3} requests, {len(groups)} query groups: {shown}{more}")
+
+def run_cycle(scheduler, dry_run=False):
+    """ Polls the due sources once within the request budget. Returns the new posts inserted. """
+    plan = scheduler.plan(scheduler.due())
+    if not plan: return 0
+    print(f"\n🗓️ [{datetime.now():%H:%M:%S}] Scheduler cycle: {len(plan)} due source(s), budget {scheduler.budget} requests")
+    print_plan(plan)
+    if dry_run: return 0
+
+    requests_before, cpu_before = HTTP_STATS.requests, time.process_time()
+    sources = {name: scheduler.source(name, groups, allowance) for name, (groups, allowance) in plan.items()}
+    pipeline, _ = ingest.run_sources(sources)
+    report = scheduler.update()
+
+    requests = HTTP_STATS.requests - requests_before
+    cpu = time.process_time() - cpu_before
+    posts = sum(p for p, _, _ in report.values())
+    for name, (p, r, interval) in sorted(report.items()):
+        CYCLE_POSTS.inc(p, source=name)
+        CYCLE_REQUESTS.inc(r, source=name)
+        log_event("scheduler_source", f"      📈 {name:<12} {p:>4} new / {r:>3} requests ({p / r if r else 0:.2f}/req), next poll in {interval / 60:.0f} min",
+                  source=name, new_posts=p, requests=r, interval=interval)
+    log_event("scheduler_cycle", f"   🏁 {posts} new posts from {requests} requests ({posts / requests if requests else 0:.2f}/req, "
+              f"{posts / cpu if cpu else 0:.2f}/CPU-s) in {pipeline.elapsed:.1f}s",
+              new_posts=posts, requests=requests, cpu_seconds=round(cpu, 2), elapsed=round(pipeline.elapsed, 2))
+    return posts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive polling daemon for the steerable sources")
+    parser.add_argument("--source", action="append", choices=sorted(ingest.QUERY_SOURCES), help="schedule only this source (repeatable)")
+    parser.add_argument("--budget", type=int, default=None, help="HTTP requests per cycle (FIN_SCHED_BUDGET, default 60)")
+    parser.add_argument("--once", action="store_true", help="run one cycle of the due sources and exit")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without fetching")
+    parser.add_argument("--metrics-port", type=int, default=None, help="serve /metrics on this port (FIN_METRICS_PORT)")
+    parser.add_argument("--log-format", choices=["text", "json"], default=None, help="log format (FIN_LOG_FORMAT)")
+    args = parser.parse_args()
+    configure_logging(args.log_format)
+    serve_metrics(args.metrics_port)
+
+    scheduler = build_scheduler(args.source, args.budget)
+    if args.once or args.dry_run:
+        run_cycle(scheduler, dry_run=args.dry_run)
+        sys.exit(0)
+
+    print("🚀 Scheduler daemon started (Ctrl+C to stop)")
+    try:
+        while True:
+            run_cycle(scheduler)
+            # Sleep until the next source is due (re-checked at least every minute)
+            time.sleep(min(60, max(1, scheduler.next_due() - time.time())))
+    except KeyboardInterrupt:
+        print("\n🛑 Scheduler stopped.")
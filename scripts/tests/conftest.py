@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Tests import the pipeline modules the way the scripts do (utils.* from scripts/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch):
+    """
+    fetch_financial_posts wired to mongomock, the stub classifier and replayed
+    synthetic fixtures (as benchmark_pipeline.py runs it), with scratch cursor,
+    validator and spool stores. Every global it touches is restored afterwards.
+    """
+    import benchmark_pipeline as bench
+    import fetch_financial_posts as ingest
+    from utils import cursor_store, fetch_engine
+    from utils.replay import ReplayAdapter
+
+    for module, name in [(ingest, "_db"), (ingest, "AI"), (ingest, "_spool"), (ingest, "_schema_ready"),
+                         (cursor_store, "_store"), (fetch_engine, "_validators"), (fetch_engine, "LIMITER")]:
+        monkeypatch.setattr(module, name, getattr(module, name))
+    for name in ("_writer", "_known_posts", "_trends"):
+        monkeypatch.setattr(ingest, name, None)
+    monkeypatch.setattr(ingest, "_near_dups", {})
+
+    store = bench.synthesize(str(tmp_path / "fixtures"), responses=2, per_response=10)
+    bench.isolate(ingest, bench.mongomock_db(), str(tmp_path), bench.StubAIClient(0, 0), ReplayAdapter(store))
+    yield ingest
+    fetch_engine.use_transport(None)
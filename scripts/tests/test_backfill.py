@@ -0,0 +1,36 @@
+import time
+
+from utils.cursor_store import get_cursor_store
+
+YEARS = [2023, 2022, 2021, 2020]
+
+def test_interrupted_backfill_resumes_after_the_finished_slices(ingest_env, monkeypatch):
+    monkeypatch.setenv("FIN_COMMIT_SECS", "0")
+    cursors = get_cursor_store()
+
+    def killed_midway():
+        for n, page in enumerate(ingest_env.iter_google_news(years=YEARS, backfill=True, queries=["Stock Market"])):
+            if n == 2:
+                # The finished years are committed while the run is still going
+                deadline = time.time() + 10
+                while not cursors.is_complete("google_news", "Stock Market", 2022) and time.time() < deadline:
+                    time.sleep(0.02)
+                raise RuntimeError("killed")
+            yield page
+
+    pipeline = ingest_env.IngestPipeline(
+        ingest_env.AI.analyze_batch, ingest_env.save_posts,
+        checkpoint=ingest_env.checkpoint_posts, commit_interval=0)
+    pipeline.run({"google_news": killed_midway})
+    # No end-of-run commit(): as if the process had died here
+    assert [y for y in YEARS if cursors.is_complete("google_news", "Stock Market", y)] == [2023, 2022]
+
+    fetched = []
+
+    class Unavailable:
+        status_code = 503
+        def close(self): pass
+
+    monkeypatch.setattr(ingest_env, "http_get", lambda url, **kw: fetched.append(url) or Unavailable())
+    list(ingest_env.iter_google_news(years=YEARS, backfill=True, queries=["Stock Market"]))
+    assert [u.split("after:")[1][:4] for u in fetched] == ["2021", "2020"]
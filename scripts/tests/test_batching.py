@@ -0,0 +1,29 @@
+from utils.batching import token_budget_batches, truncate_ids
+
+def test_batches_respect_the_padded_token_budget_and_max_batch():
+    lengths = [10, 500, 12, 11, 480, 9, 13, 10]
+    batches = token_budget_batches(lengths, token_budget=1000, max_batch=3)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) * max(lengths[i] for i in batch) <= 1000
+    # Short items are grouped together, never padded to a long neighbour
+    assert [sorted(lengths[i] for i in batch) for batch in batches] == [[9, 10, 10], [11, 12, 13], [480, 500]]
+
+def test_batch_boundary_is_inclusive_of_the_budget():
+    assert token_budget_batches([50, 50, 50, 50], token_budget=100, max_batch=8) == [[0, 1], [2, 3]]
+
+def test_oversize_items_get_a_batch_of_their_own():
+    lengths = [5, 2000, 6, 3000]
+    batches = token_budget_batches(lengths, token_budget=512, max_batch=16)
+    assert batches == [[0, 2], [1], [3]]
+    assert token_budget_batches([], token_budget=512, max_batch=16) == []
+
+def test_truncation_policies():
+    ids = list(range(20))
+    assert truncate_ids(ids, 32, "head_tail") == [ids]
+    assert truncate_ids(ids, 8) == [ids[:8]]
+    # A quarter from the head, the rest from the tail
+    assert truncate_ids(ids, 8, "head_tail") == [[0, 1, 14, 15, 16, 17, 18, 19]]
+    assert truncate_ids(ids, 8, "chunk") == [ids[:8], ids[8:16], ids[16:]]
+    assert truncate_ids(ids, 8, "chunk", max_chunks=2) == [ids[:8], ids[8:16]]
@@ -0,0 +1,25 @@
+from utils.cursor_store import CursorStore
+
+def test_high_water_mark_only_moves_forward(tmp_path):
+    store = CursorStore(str(tmp_path / "cursors.sqlite"))
+    assert store.get("reddit", "stocks") == (None, None)
+    store.advance("reddit", "stocks", ts=200.0, item_id="t3_b")
+    store.advance("reddit", "stocks", ts=100.0, item_id="t3_a")
+    assert store.get("reddit", "stocks") == (200.0, "t3_b")
+    # An id-only advance keeps the timestamp
+    store.advance("reddit", "stocks", item_id="t3_c")
+    assert store.get("reddit", "stocks") == (200.0, "t3_c")
+    store.advance("reddit", "stocks")
+    assert store.get("reddit", "stocks") == (200.0, "t3_c")
+
+def test_state_survives_reopening_and_is_per_query(tmp_path):
+    path = str(tmp_path / "cursors.sqlite")
+    store = CursorStore(path)
+    store.advance("medium", "finance", ts=50.0)
+    store.mark_complete("google_news", "Stock Market", 2020)
+
+    reopened = CursorStore(path)
+    assert reopened.get("medium", "finance") == (50.0, None)
+    assert reopened.get("medium", "crypto") == (None, None)
+    assert reopened.is_complete("google_news", "Stock Market", 2020)
+    assert not reopened.is_complete("google_news", "Stock Market", 2021)
@@ -0,0 +1,19 @@
+import pytest
+
+from utils.db_schema import LATEST_VERSION, bootstrap, schema_version
+
+def test_ingest_refuses_an_unmigrated_db_and_never_migrates_it(ingest_env, monkeypatch):
+    import benchmark_pipeline as bench
+    db = bench.mongomock_db()
+    db.drop_collection("schema_meta")
+    monkeypatch.setattr(ingest_env, "_db", db)
+    monkeypatch.setattr(ingest_env, "_schema_ready", False)
+
+    with pytest.raises(SystemExit, match="manage_db.py migrate"):
+        ingest_env.run_sources({"medium": ingest_env.SOURCES["medium"]})
+    assert schema_version(db) == 0 and db["posts"].count_documents({}) == 0
+
+    bootstrap(db)
+    assert schema_version(db) == LATEST_VERSION
+    pipeline, _ = ingest_env.run_sources({"medium": ingest_env.SOURCES["medium"]})
+    assert sum(pipeline.saved.values()) > 0
@@ -0,0 +1,38 @@
+from utils.feed_parser import iter_items, parse_ts
+
+RSS = b"""<?xml version="1.0"?>
+<rss xmlns:dc="http://purl.org/dc/elements/1.1/"><channel><title>feed</title>
+<item><title>Newest</title><link>https://x/3</link><pubDate>Wed, 03 Jan 2024 10:00:00 GMT</pubDate><dc:creator>ann</dc:creator></item>
+<item><title>No link</title><pubDate>Tue, 02 Jan 2024 12:00:00 GMT</pubDate></item>
+<item><title>Middle</title><link>https://x/2</link><pubDate>Tue, 02 Jan 2024 10:00:00 GMT</pubDate></item>
+<item><title>Oldest</title><link>https://x/1</link><pubDate>Mon, 01 Jan 2024 10:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+ATOM = b"""<feed xmlns="http://www.w3.org/2005/Atom">
+<entry><title>Atom post</title><link rel="self" href="https://x/self"/><link href="https://x/a"/>
+<updated>2024-01-02T10:00:00Z</updated><author><name>bo</name></author><summary>body</summary></entry>
+</feed>"""
+
+def _chunks(data, size=7):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_rss_items_across_chunk_boundaries():
+    items = list(iter_items(_chunks(RSS)))
+    assert [i["title"] for i in items] == ["Newest", "Middle", "Oldest"]
+    assert items[0]["author"] == "ann" and items[0]["published"] == parse_ts("Wed, 03 Jan 2024 10:00:00 GMT")
+
+def test_atom_alternate_link_and_updated_fallback():
+    item, = iter_items(_chunks(ATOM))
+    assert item["link"] == "https://x/a" and item["author"] == "bo" and item["description"] == "body"
+    assert item["published"] == parse_ts("2024-01-02T10:00:00Z")
+
+def test_limit_counts_skipped_items():
+    assert [i["title"] for i in iter_items([RSS], limit=2)] == ["Newest"]
+
+def test_since_filters_and_ordered_stops_at_the_mark():
+    mark = parse_ts("Tue, 02 Jan 2024 10:00:00 GMT")
+    assert [i["title"] for i in iter_items([RSS], since=mark)] == ["Newest"]
+    unordered = RSS.replace(b"<title>Oldest</title><link>https://x/1</link><pubDate>Mon, 01",
+                            b"<title>Late</title><link>https://x/4</link><pubDate>Thu, 04")
+    assert [i["title"] for i in iter_items([unordered], since=mark)] == ["Newest", "Late"]
+    assert [i["title"] for i in iter_items([unordered], since=mark, ordered=True)] == ["Newest"]
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from utils import fetch_engine
+from utils.fetch_engine import HostLimiter, ValidatorStore, http_get, save_validators
+
+class _ETagAdapter(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(dict(request.headers))
+        resp = Response()
+        resp.url, resp.request = request.url, request
+        if request.headers.get("If-None-Match") == '"v1"':
+            resp.status_code, resp._content = 304, b""
+        else:
+            resp.status_code, resp._content = 200, b"<rss/>"
+            resp.headers = CaseInsensitiveDict({"ETag": '"v1"'})
+        return resp
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def transport(tmp_path, monkeypatch):
+    adapter = _ETagAdapter()
+    monkeypatch.setattr(fetch_engine, "_validators", ValidatorStore(str(tmp_path / "validators.sqlite")))
+    monkeypatch.setattr(fetch_engine, "LIMITER", HostLimiter(limits={}, default=(1e6, 1e6, 8)))
+    fetch_engine.use_transport(adapter)
+    yield adapter
+    fetch_engine.use_transport(None)
+
+def test_validators_are_not_stored_until_saved(transport):
+    url = "https://feeds.example.com/rss"
+    first = http_get(url, conditional=True)
+    assert first.status_code == 200 and first.validators == (url, '"v1"', None)
+    # Page never saved (failed / dry run): the next run refetches the body
+    assert http_get(url, conditional=True).status_code == 200
+
+    save_validators(first.validators)
+    assert http_get(url, conditional=True).status_code == 304
+    assert transport.sent[-1]["If-None-Match"] == '"v1"'
+
+def test_token_bucket_allows_the_burst_then_paces():
+    bucket = fetch_engine.TokenBucket(rate=50, capacity=2)
+    started = time.monotonic()
+    for _ in range(4): bucket.acquire()
+    # Two from the burst, two more at 50/s
+    assert 0.03 <= time.monotonic() - started < 0.5
+
+def test_host_limiter_caps_in_flight_requests_per_host():
+    limiter = HostLimiter(limits={"slow.example": (1e6, 1e6, 2)}, default=(1e6, 1e6, 8))
+    active, peak, lock = {"slow.example": 0, "fast.example": 0}, {"slow.example": 0, "fast.example": 0}, threading.Lock()
+
+    def fetch(host):
+        with limiter.slot(f"https://{host}/feed"):
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+
+    threads = [threading.Thread(target=fetch, args=(host,)) for host in ("slow.example", "fast.example") for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert peak["slow.example"] == 2 and peak["fast.example"] > 2
@@ -0,0 +1,22 @@
+from utils.inference_cache import InferenceCache, text_key
+
+def test_key_ignores_case_and_whitespace_but_not_model():
+    assert text_key("NVDA  beats\nestimates", "m1") == text_key("nvda beats estimates", "m1")
+    assert text_key("nvda beats estimates", "m1") != text_key("nvda beats estimates", "m2")
+
+def test_hits_and_misses(tmp_path):
+    cache = InferenceCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many([("a", {"is_relevant": True, "sentiment_score": 0.5})])
+    assert cache.get_many(["a", "b"]) == {"a": {"is_relevant": True, "sentiment_score": 0.5}}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_eviction_runs_every_1000_writes_and_drops_least_recently_used(tmp_path):
+    cache = InferenceCache(str(tmp_path / "cache.sqlite"), max_entries=500)
+    cache.put_many([(f"k{i}", {"i": i}) for i in range(999)])
+    # Below the write threshold the bound is not checked yet
+    assert cache.conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0] == 999
+
+    cache.conn.execute("UPDATE analysis SET last_used = 0 WHERE key != 'k998'")
+    cache.put_many([("k999", {"i": 999})])
+    keys = {row[0] for row in cache.conn.execute("SELECT key FROM analysis")}
+    assert len(keys) == 500 and {"k998", "k999"} <= keys
@@ -0,0 +1,87 @@
+from utils.cursor_store import get_cursor_store
+
+def _cursor_rows():
+    return get_cursor_store().conn.execute("SELECT source, query FROM cursors").fetchall()
+
+def test_dry_run_leaves_high_water_marks_alone(ingest_env):
+    sources = {name: ingest_env.SOURCES[name] for name in ("hackernews", "mastodon", "reddit")}
+    pipeline, docs = ingest_env.run_sources(sources, dry_run=True)
+    assert docs
+    assert _cursor_rows() == []
+
+    ingest_env.run_sources(sources)
+    assert {source for source, _ in _cursor_rows()} == {"hackernews", "mastodon", "reddit"}
+
+def test_dry_run_backfill_marks_no_year_complete(ingest_env):
+    cursors = get_cursor_store()
+    sources = {"google_news": lambda: ingest_env.iter_google_news(years=[2020], backfill=True, queries=["Stock Market"])}
+
+    ingest_env.run_sources(sources, dry_run=True)
+    assert not cursors.is_complete("google_news", "Stock Market", 2020)
+
+    ingest_env.run_sources(sources)
+    assert cursors.is_complete("google_news", "Stock Market", 2020)
+
+def test_relevance_ordered_feeds_ignore_the_pubdate_mark(ingest_env):
+    # Google News search results are not date-ordered: an old-dated item that
+    # newly appears must not be dropped by a high-water mark
+    get_cursor_store().advance("google_news", "Stock Market", ts=4102444800)   # 2100-01-01
+    pages = list(ingest_env.iter_google_news(queries=["Stock Market"]))
+    assert sum(len(page) for page in pages) == 10
+
+def test_medium_yields_no_empty_pages(ingest_env, monkeypatch):
+    pages = list(ingest_env.iter_medium(queries=["finance"]))
+    assert len(pages) == 1 and pages[0]
+
+    # Every item at or before the high-water mark
+    def parse_nothing(resp, **kwargs):
+        resp.close()
+        return iter(())
+    monkeypatch.setattr(ingest_env, "parse_feed", parse_nothing)
+    assert list(ingest_env.iter_medium(queries=["finance"])) == []
+
+class _Json:
+    def __init__(self, data):
+        self.status_code, self.validators, self._data = 200, None, data
+    def json(self): return self._data
+    def close(self): pass
+
+def _status(i):
+    return {"id": str(i), "content": f"<p>status {i} about markets</p>", "url": f"https://m/{i}",
+            "account": {"display_name": "", "username": "u"}}
+
+def test_mastodon_pages_forward_from_the_mark(ingest_env, monkeypatch):
+    import urllib.parse
+    newest = 100
+
+    def http_get(url, **kwargs):
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+        low = int(params.get("min_id", newest - 40))
+        ids = list(range(low + 1, min(newest, low + int(params["limit"])) + 1))
+        return _Json([_status(i) for i in reversed(ids)])
+
+    monkeypatch.setattr(ingest_env, "http_get", http_get)
+    get_cursor_store().advance("mastodon", "finance", item_id="10")
+    pipeline, docs = ingest_env.run_sources({"mastodon": lambda: ingest_env.iter_mastodon(["finance"])}, dry_run=True)
+    assert sorted(int(d["reddit_id"][6:]) for d in docs) == list(range(11, 101))
+
+    ingest_env.run_sources({"mastodon": lambda: ingest_env.iter_mastodon(["finance"])})
+    assert get_cursor_store().get("mastodon", "finance")[1] == "100"
+
+def test_hacker_news_moves_the_mark_only_after_the_last_page(ingest_env, monkeypatch):
+    pages = {"count": 3}
+
+    def http_get(url, **kwargs):
+        number = int(url.rsplit("&page=", 1)[1])
+        hits = [{"objectID": f"{number}_{i}", "title": f"Story {number} {i}", "created_at_i": 1000 + number * 10 + i}
+                for i in range(5)]
+        return _Json({"hits": hits, "nbPages": pages["count"]})
+
+    monkeypatch.setattr(ingest_env, "http_get", http_get)
+    pages["count"] = ingest_env.CATCHUP_PAGES + 5
+    pipeline, docs = ingest_env.run_sources({"hackernews": lambda: ingest_env.iter_hacker_news(["finance"])})
+    assert get_cursor_store().get("hackernews", "finance")[0] is None
+
+    pages["count"] = 3
+    ingest_env.run_sources({"hackernews": lambda: ingest_env.iter_hacker_news(["finance"])})
+    assert get_cursor_store().get("hackernews", "finance")[0] == 1024
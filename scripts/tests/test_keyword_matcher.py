@@ -0,0 +1,33 @@
+import csv
+import os
+
+from utils.keyword_matcher import AhoCorasick, KeywordMatcher, default_matcher
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "..", "test_dataset.csv")
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick([("he", 1), ("she", 2), ("hers", 3)])
+    assert sorted(automaton.iter_matches("ushers")) == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+def test_whole_words_only_and_tags():
+    matcher = KeywordMatcher(["Interest Rates", "Inflation"], ["crypto"], ["fed"])
+    assert matcher.match("Fed holds INTEREST  rates as inflation cools #crypto") == ["#crypto", "Inflation", "Interest Rates"]
+    assert matcher.match("Hyperinflation of federal cryptography") == []
+
+def test_no_keyword_is_not_a_miss():
+    matcher = default_matcher()
+    assert matcher.triage("$TSLA can you hear that cash burning")[2] == "ambiguous"
+    with open(DATASET, encoding="utf-8") as f:
+        decisions = {matcher.triage(row["text"])[2] for row in csv.DictReader(f)}
+    assert "miss" not in decisions
+
+def test_misses_come_only_from_the_negative_list():
+    matcher = KeywordMatcher(["Inflation"], lexicon=["stocks"], negatives=["gym buddy"])
+    assert matcher.triage("Looking for a gym buddy downtown") == ([], 0.0, "miss")
+    assert matcher.triage("gym buddy who trades stocks")[2] == "ambiguous"
+    assert matcher.triage("gym buddy talk about inflation")[0] == ["Inflation"]
+
+def test_confident_hit():
+    matcher = KeywordMatcher(["Interest Rates", "Inflation"], hit_threshold=1.0)
+    assert matcher.triage("interest rates and inflation")[1:] == (1.0, "hit")
+    assert matcher.triage("interest rates")[2] == "ambiguous"
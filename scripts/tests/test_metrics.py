@@ -0,0 +1,46 @@
+import multiprocessing
+
+import pytest
+
+from utils import inference_pool
+from utils.ai_client import GATEKEEPER_REJECTED, MODEL_SECONDS
+from utils.inference_pool import InferencePool
+from utils.metrics import REGISTRY, Registry
+
+def test_take_resets_and_merge_adds_up():
+    worker, parent = Registry(), Registry()
+    for registry in (worker, parent):
+        registry.counter("fin_docs", "Docs", ["result"])
+        registry.histogram("fin_seconds", "Seconds", buckets=(0.1, 1.0))
+    worker.metrics["fin_docs"].inc(3, result="ok")
+    worker.metrics["fin_seconds"].observe(0.5)
+    parent.metrics["fin_docs"].inc(1, result="ok")
+
+    parent.merge(worker.take())
+    assert worker.take() == {}
+    assert parent.metrics["fin_docs"].value(result="ok") == 4
+    assert 'fin_seconds_bucket{le="1.0"} 1' in parent.render()
+
+class _RejectingAI:
+    """ Records the gatekeeper metrics the way AgriAIClient does, in whatever process runs it. """
+    def analyze_batch(self, texts):
+        MODEL_SECONDS.observe(0.01, model="gatekeeper")
+        GATEKEEPER_REJECTED.inc(len(texts))
+        return [{"is_relevant": False} for _ in texts]
+
+def _init_stub_worker():
+    REGISTRY.take()
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_worker_metrics_reach_the_parent_registry(monkeypatch):
+    monkeypatch.setattr(inference_pool, "_WORKER_AI", _RejectingAI())
+    pool = InferencePool(num_workers=2)
+    pool._pool = multiprocessing.get_context("fork").Pool(2, initializer=_init_stub_worker)
+    rejected = GATEKEEPER_REJECTED.value()
+    try:
+        results = pool.analyze_batch([f"text {i}" for i in range(10)], chunk_size=3)
+    finally:
+        pool.close()
+    assert len(results) == 10 and not any(r["is_relevant"] for r in results)
+    # Counted once, in the parent, not in the forked copies
+    assert GATEKEEPER_REJECTED.value() == rejected + 10
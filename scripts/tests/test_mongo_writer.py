@@ -0,0 +1,112 @@
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from benchmark_pipeline import mongomock_db
+from utils.mongo_writer import BulkWriter, DUPLICATE_KEY
+
+class _Result:
+    def __init__(self, ops):
+        self.bulk_api_result = {"nUpserted": len(ops), "nModified": 0, "nMatched": 0,
+                                "upserted": [{"index": i} for i in range(len(ops))]}
+
+class FlakyCollection:
+    """ Fails whole batches with 'errors' first, then per-op codes from 'codes' (key -> code). """
+    name = "posts"
+
+    def __init__(self, errors=0, codes=None):
+        self.errors = errors
+        self.codes = dict(codes or {})
+        self.batches = []
+
+    def bulk_write(self, ops, ordered=False):
+        keys = [op._filter["reddit_id"] for op in ops]
+        self.batches.append(keys)
+        if self.errors:
+            self.errors -= 1
+            raise AutoReconnect("primary stepped down")
+        failed = [{"index": i, "code": self.codes.pop(k), "errmsg": "x"} for i, k in enumerate(keys) if k in self.codes]
+        if failed:
+            ok = len(keys) - len(failed)
+            raise BulkWriteError({"writeErrors": failed, "nUpserted": ok, "nModified": 0, "nMatched": 0,
+                                  "upserted": [{"index": i} for i in range(len(keys)) if i not in {f["index"] for f in failed}]})
+        return _Result(ops)
+
+def _writer(collection, **kwargs):
+    return BulkWriter(collection, max_ops=100, backoff=0, **kwargs)
+
+def _docs(*ids):
+    return [{"reddit_id": i, "title": i} for i in ids]
+
+def test_transient_error_retries_the_whole_batch():
+    collection = FlakyCollection(errors=2)
+    writer = _writer(collection)
+    writer.upsert_many(_docs("a", "b"))
+    assert writer.close() == 2
+    assert collection.batches == [["a", "b"]] * 3
+    assert writer.stats.retries == 2 and writer.stats.written == 2
+
+def test_partial_failure_retries_only_transient_ops_and_counts_duplicates():
+    collection = FlakyCollection(codes={"b": DUPLICATE_KEY, "c": 11600})
+    failed = []
+    writer = _writer(collection, on_failed=failed.extend)
+    writer.upsert_many(_docs("a", "b", "c"))
+    assert writer.close() == 2
+    assert collection.batches == [["a", "b", "c"], ["c"]]
+    assert writer.stats.duplicates == 1 and writer.stats.failed == 0 and failed == []
+
+def test_gives_up_after_max_retries_and_reports_failed_docs():
+    collection = FlakyCollection(errors=10)
+    failed = []
+    writer = BulkWriter(collection, max_ops=100, backoff=0, max_retries=2, on_failed=failed.extend)
+    writer.upsert_many(_docs("a"))
+    assert writer.close() == 0
+    assert [d["reddit_id"] for d in failed] == ["a"] and writer.stats.failed == 1
+
+def test_callback_errors_do_not_lose_the_result():
+    def boom(docs): raise RuntimeError("trend store down")
+    inserted = []
+    writer = _writer(FlakyCollection(), on_written=boom, on_inserted=inserted.extend)
+    writer.upsert_many(_docs("a"))
+    assert writer.close() == 1
+    assert [d["reddit_id"] for d in inserted] == ["a"]
+
+def test_coalesced_upserts_and_mutable_fields():
+    collection = mongomock_db().posts
+    writer = _writer(collection)
+    writer.upsert({"reddit_id": "a", "title": "first", "source_lc": "reddit", "tags": ["$nvda"], "sources": ["reddit"]})
+    writer.add_to_set("a", "sources", "news")
+    writer.close()
+    # A re-save only touches the mutable fields and grows the set fields
+    writer.upsert({"reddit_id": "a", "title": "second", "source_lc": "news", "tags": ["$amd"], "sources": ["mastodon"]})
+    writer.close()
+    doc = collection.find_one({"reddit_id": "a"})
+    assert doc["title"] == "first"
+    assert doc["source_lc"] == "news" and doc["tags"] == ["$amd"]
+    assert sorted(doc["sources"]) == ["mastodon", "news", "reddit"]
+
+class LostAckCollection:
+    """ Applies the first bulk_write, then loses the reply (AutoReconnect), as after a primary step-down. """
+    def __init__(self):
+        self.collection = mongomock_db().posts
+        self.name = self.collection.name
+        self.lost = 1
+
+    def bulk_write(self, ops, ordered=False):
+        result = self.collection.bulk_write(ops, ordered=ordered)
+        if self.lost:
+            self.lost -= 1
+            raise AutoReconnect("connection closed")
+        return result
+
+    def find(self, *args, **kwargs):
+        return self.collection.find(*args, **kwargs)
+
+def test_inserts_applied_before_a_lost_reply_are_still_reported():
+    collection = LostAckCollection()
+    collection.collection.insert_one({"reddit_id": "old", "title": "old"})
+    inserted = []
+    writer = _writer(collection, on_inserted=inserted.extend)
+    writer.upsert_many(_docs("a", "b", "old"))
+    writer.close()
+    # The retry only matched "a" / "b"; their write token shows they are new
+    assert sorted(d["reddit_id"] for d in inserted) == ["a", "b"]
+    assert writer.stats.retries == 1 and writer.stats.written == 2 and writer.stats.unchanged == 1
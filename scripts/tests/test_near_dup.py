@@ -0,0 +1,90 @@
+import mongomock
+
+from utils.near_dup import NearDuplicateIndex, bands, minhash, similarity, BANDS
+
+STORY = ("Federal Reserve officials signaled on Wednesday that interest rates will stay higher for longer "
+         "as inflation remains stubborn, sending Treasury yields to their highest level since 2007")
+
+def _index(add_to_set=None):
+    return NearDuplicateIndex(mongomock.MongoClient().db.posts, add_to_set=add_to_set)
+
+def _doc(reddit_id, title, content="", source="news"):
+    return {"reddit_id": reddit_id, "title": title, "content": content, "source": source}
+
+def _page(*docs):
+    return [(doc, f"{doc['title']} {doc['content']}") for doc in docs]
+
+def test_signatures_are_stable_and_estimate_similarity():
+    a, b = minhash(STORY), minhash(STORY.replace("Wednesday", "Thursday") + " https://example.com/x")
+    assert a == minhash(STORY) and len(bands(a)) == BANDS
+    assert similarity(a, b) >= 0.7
+    assert similarity(a, minhash("Apple unveils a new iPhone with a faster chip and better camera today")) < 0.3
+    assert minhash("too short to compare") is None
+
+def test_syndicated_copies_collapse_into_the_canonical():
+    index = _index()
+    kept = index.split(_page(_doc("a", STORY), _doc("b", "Reuters: " + STORY, source="mastodon")))
+    assert [doc["reddit_id"] for doc, _ in kept] == ["a"]
+    assert [s["reddit_id"] for s in kept[0][0]["sources"]] == ["a", "b"]
+
+def test_templated_youtube_posts_are_never_collapsed():
+    index = _index()
+    videos = [_doc(f"yt_{i}", f"YouTube Video: vid{i:04d}xq", "Video discussion on stock market news", "youtube")
+              for i in range(100)]
+    assert len(index.split(_page(*videos))) == 100 and index.collapsed == 0
+
+def test_boilerplate_bodies_are_not_compared():
+    index = _index()
+    pages = [_doc(f"mw_{i}", f"[Web] {title}", "Scraped via BeautifulSoup from MarketWatch", "marketwatch")
+             for i, title in enumerate(["Oil prices slide", "Chip stocks rally", "Gold hits record"])]
+    assert len(index.split(_page(*pages))) == 3
+
+def test_rejected_canonical_is_released():
+    index = _index()
+    (canonical, _), = index.split(_page(_doc("a", STORY)))
+    index.release([canonical])
+    assert [doc["reddit_id"] for doc, _ in index.split(_page(_doc("b", STORY)))] == ["b"]
+
+def test_seal_writes_outside_the_lock_and_forwards_late_duplicates():
+    added = []
+    index = _index(add_to_set=lambda *args: added.append(args))
+    kept = index.split(_page(_doc("a", STORY)))
+
+    def write(docs):
+        assert not index._lock.locked()
+        # A copy arriving while the canonical is being queued
+        assert index.split(_page(_doc("b", STORY, source="lemmy"))) == []
+        assert [s["reddit_id"] for s in docs[0]["sources"]] == ["a"]
+        return len(docs)
+
+    assert index.seal([doc for doc, _ in kept], write) == 1
+    assert added == [("a", "sources", {"source": "lemmy", "reddit_id": "b", "url": None})]
+    index.split(_page(_doc("c", STORY, source="medium")))
+    assert added[-1][2]["reddit_id"] == "c"
+
+def test_sealed_canonical_is_released_when_the_writer_gives_up(ingest_env, monkeypatch):
+    class Down:
+        name = "posts"
+        def bulk_write(self, ops, ordered=False): raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ingest_env.get_spool(), "mode", "off")
+    writer = ingest_env.get_writer()
+    monkeypatch.setattr(writer, "collection", Down())
+    (canonical, _), = ingest_env.get_near_dups().split(_page(_doc("a", STORY)))
+    canonical["analysis"] = {"sentiment_class": "Neutral", "confidence": 0.5}
+    ingest_env.save_posts("news", [canonical])
+    # The write fails on flush, after the canonical was sealed
+    writer.flush()
+    assert ingest_env.get_spool().failed == 1
+    kept = ingest_env.get_near_dups().split(_page(_doc("b", "Reuters: " + STORY, source="mastodon")))
+    assert [doc["reddit_id"] for doc, _ in kept] == ["b"]
+
+def test_canonicals_read_from_posts_are_not_released():
+    index = _index()
+    signature = minhash(STORY)
+    index.collection.insert_one({"reddit_id": "a", "minhash": signature, "minhash_bands": bands(signature),
+                                 "analysis": {"sentiment_class": "Neutral"}})
+    assert index.split(_page(_doc("b", STORY))) == []
+    # Another writer failing on a post with the same id doesn't unmake the stored one
+    index.release([_doc("a", STORY)])
+    assert index.split(_page(_doc("c", STORY))) == []
@@ -0,0 +1,89 @@
+from utils.pipeline import IngestPipeline, defer
+
+def _pipeline(classify=None, write=None):
+    classify = classify or (lambda texts: [{"is_relevant": True} for _ in texts])
+    return IngestPipeline(classify, write or (lambda source, docs: len(docs)))
+
+def _source(marks, name):
+    def run():
+        yield [({"reddit_id": f"{name}_1"}, "text")]
+        defer(marks.append, name)
+    return run
+
+def test_deferred_commits_run_only_on_commit():
+    marks = []
+    pipeline = _pipeline()
+    pipeline.run({"a": _source(marks, "a"), "b": _source(marks, "b")})
+    assert marks == []
+    assert pipeline.commit() == 2
+    assert sorted(marks) == ["a", "b"]
+
+def test_source_with_write_error_keeps_its_cursors():
+    marks = []
+
+    def write(source, docs):
+        if source == "a": raise RuntimeError("db down")
+        return len(docs)
+
+    pipeline = _pipeline(write=write)
+    pipeline.run({"a": _source(marks, "a"), "b": _source(marks, "b")})
+    pipeline.commit()
+    assert marks == ["b"]
+
+def test_inference_error_fails_every_source_in_the_batch():
+    marks = []
+
+    def classify(texts):
+        raise RuntimeError("model crashed")
+
+    pipeline = _pipeline(classify=classify)
+    pipeline.run({"a": _source(marks, "a")})
+    assert pipeline.commit() == 0
+    assert marks == []
+
+def test_defer_outside_a_pipeline_is_dropped():
+    marks = []
+    for _ in _source(marks, "a")(): pass
+    assert marks == []
+
+def test_rejected_docs_go_to_reject():
+    rejected = []
+    pipeline = IngestPipeline(lambda texts: [{"is_relevant": t == "keep"} for t in texts],
+                              lambda source, docs: len(docs),
+                              reject=lambda source, docs: rejected.extend(d["reddit_id"] for d in docs))
+    saved = pipeline.run({"a": lambda: [[({"reddit_id": "1"}, "keep"), ({"reddit_id": "2"}, "drop")]]})
+    assert saved == {"a": 1} and rejected == ["2"]
+
+def test_commit_waits_for_every_earlier_page():
+    marks = []
+
+    def write(source, docs):
+        if docs[0]["reddit_id"] == "p2": raise RuntimeError("db down")
+        return len(docs)
+
+    def source():
+        for n in (1, 2, 3):
+            yield [({"reddit_id": f"p{n}"}, "text")]
+            defer(marks.append, n)
+
+    pipeline = _pipeline(write=write)
+    pipeline.run({"a": source})
+    pipeline.commit()
+    # Page 2 was lost, so nothing deferred after it may run
+    assert marks == [1]
+
+def test_checkpoint_commits_during_the_run():
+    marks, checkpoints = [], []
+
+    def source():
+        yield [({"reddit_id": "p1"}, "text")]
+        defer(marks.append, 1)
+        yield [({"reddit_id": "p2"}, "text")]
+        defer(marks.append, 2)
+
+    pipeline = IngestPipeline(lambda texts: [{"is_relevant": True} for _ in texts], lambda source, docs: len(docs),
+                              checkpoint=lambda: checkpoints.append(1) or True, commit_interval=0)
+    pipeline.run({"a": source})
+    assert checkpoints and 1 in marks
+    pipeline.commit()
+    assert marks == [1, 2]
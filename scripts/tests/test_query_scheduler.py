@@ -0,0 +1,70 @@
+import random
+
+import pytest
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from utils import fetch_engine
+from utils.fetch_engine import HostLimiter, RequestBudgetSpent, http_get, thread_requests
+from utils.query_scheduler import QueryScheduler, YieldStore
+
+class _OkAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        resp = Response()
+        resp.url, resp.request = request.url, request
+        resp.status_code, resp._content = 200, b"{}"
+        return resp
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def transport(monkeypatch):
+    monkeypatch.setattr(fetch_engine, "LIMITER", HostLimiter(limits={}, default=(1e6, 1e6, 8)))
+    fetch_engine.use_transport(_OkAdapter())
+    yield
+    fetch_engine.use_transport(None)
+
+def _scheduler(tmp_path, sources, budget):
+    return QueryScheduler(sources, budget=budget, store=YieldStore(str(tmp_path / "scheduler.sqlite")),
+                          rng=random.Random(7))
+
+def _pager(pages):
+    """ iter_* stand-in that pages 'pages' requests per group, like a search with many results. """
+    def iterate(queries):
+        for i in range(pages):
+            try:
+                http_get(f"https://api.example.com/search?q={queries[0]}&page={i}")
+            except RequestBudgetSpent:
+                return
+            yield [({"reddit_id": f"{queries[0]}-{i}"}, None)]
+    return iterate
+
+def test_plan_never_exceeds_the_budget(tmp_path):
+    sources = {f"s{i}": (_pager(1), [f"q{i}{j}" for j in range(6)], 2) for i in range(5)}
+    plan = _scheduler(tmp_path, sources, budget=12).plan(list(sources))
+    assert set(plan) == set(sources)
+    assert all(allowance >= 1 for _, allowance in plan.values())
+    assert sum(allowance for _, allowance in plan.values()) <= 12
+
+def test_plan_with_fewer_requests_than_sources_leaves_the_rest_due(tmp_path):
+    sources = {f"s{i}": (_pager(1), [f"q{i}"], 1) for i in range(5)}
+    scheduler = _scheduler(tmp_path, sources, budget=2)
+    plan = scheduler.plan(list(sources))
+    assert len(plan) == 2 and all(allowance == 1 for _, allowance in plan.values())
+    # Unplanned sources get no next due time from update() and stay due
+    scheduler.update()
+    assert set(scheduler.due()) >= set(sources) - set(plan)
+
+def test_allowance_is_charged_per_request_inside_paging(tmp_path, transport):
+    sources = {"deep": (_pager(50), ["a", "b", "c"], 1)}
+    scheduler = _scheduler(tmp_path, sources, budget=4)
+    groups, allowance = scheduler.plan(["deep"])["deep"]
+    assert allowance == 4
+    before = thread_requests()
+    pages = list(scheduler.source("deep", groups, allowance)())
+    # The first group pages until the allowance is spent, mid-query
+    assert len(pages) == 4 and thread_requests() - before == 4
+    # The cap is lifted once the source is done
+    http_get("https://api.example.com/after")
+    assert thread_requests() - before == 5
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from benchmark_pipeline import mongomock_db
+from utils.rollups import SentimentRollups
+
+def _post(ts, sentiment="Positive", source="reddit"):
+    return {"timestamp": ts, "source_lc": source, "analysis": {"sentiment_class": sentiment, "confidence": 0.5}}
+
+def test_buckets_expire_by_bucket_time_and_backfills_skip_expired_granularities():
+    db = mongomock_db()
+    rollups = SentimentRollups(db)
+    recent = (datetime.now() - timedelta(hours=3)).replace(minute=30, second=0, microsecond=0)
+    rollups.increment([_post(recent), _post(datetime(2020, 3, 1, 12, 30))])
+
+    minute = db.sentiment_rollups.find_one({"granularity": "minute"})
+    assert minute["bucket"] == recent and minute["expires_at"] == recent + timedelta(days=2)
+    assert db.sentiment_rollups.count_documents({"granularity": "minute"}) == 1
+    assert db.sentiment_rollups.count_documents({"granularity": "hour"}) == 1
+    # The 2020 post only lands in a (never expiring) day bucket
+    days = list(db.sentiment_rollups.find({"granularity": "day"}))
+    assert len(days) == 2 and all("expires_at" not in d for d in days)
+
+def test_rebuild_since_only_replaces_later_buckets():
+    db = mongomock_db()
+    # Within the hour retention, so hour buckets are rebuilt too
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=10)
+    db.posts.insert_many([_post(base + timedelta(hours=9)), _post(base + timedelta(days=4, hours=9), "Negative")])
+    rollups = SentimentRollups(db)
+    rollups.rebuild()
+    db.posts.insert_one(_post(base + timedelta(days=4, hours=10), "Negative"))
+    rollups.rebuild(since=base + timedelta(days=2, hours=18))
+
+    days = {d["bucket"]: d for d in db.sentiment_rollups.find({"granularity": "day"})}
+    assert days[base]["counts"] == {"Positive": 1} and days[base + timedelta(days=4)]["counts"] == {"Negative": 2}
+    assert db.sentiment_rollups.count_documents({"granularity": "hour"}) == 3
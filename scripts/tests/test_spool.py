@@ -0,0 +1,55 @@
+import os
+from datetime import datetime
+
+import mongomock
+
+from utils.mongo_writer import BulkWriter
+from utils.spool import PostSpool, read_segment, replay
+
+def _docs(n, start=0):
+    return [{"reddit_id": f"p{i}", "timestamp": datetime(2024, 1, 1, 12, i % 60), "analysis": {"confidence": 0.5}}
+            for i in range(start, start + n)]
+
+def test_wal_checkpoint_drops_clean_runs_and_seals_failed_ones(tmp_path):
+    spool = PostSpool(str(tmp_path), mode="wal")
+    spool.append(_docs(3))
+    assert spool.checkpoint() == 0 and spool.segments() == []
+
+    spool.append(_docs(3))
+    spool.mark_failed(_docs(1))
+    assert spool.checkpoint() == 1
+    segment, = spool.segments()
+    assert list(read_segment(segment)) == _docs(3)
+
+def test_torn_tail_ends_the_segment(tmp_path):
+    spool = PostSpool(str(tmp_path), mode="only")
+    spool.append(_docs(2))
+    spool.checkpoint()
+    segment, = spool.segments()
+    with open(segment, "ab") as f:
+        f.write(b"\x00\x00\x01\x00partial")
+    assert [d["reddit_id"] for d in read_segment(segment)] == ["p0", "p1"]
+
+def test_replay_loads_every_segment_once(tmp_path):
+    spool = PostSpool(str(tmp_path), mode="only", segment_bytes=200)
+    for start in range(0, 20, 5):
+        spool.append(_docs(5, start))
+    spool.checkpoint()
+    assert len(spool.segments()) > 1
+
+    posts = mongomock.MongoClient().db.posts
+    segments, docs, failed = replay(spool, lambda: BulkWriter(posts), workers=3)
+    assert (docs, failed) == (20, 0) and segments > 1
+    assert posts.count_documents({}) == 20 and spool.segments() == []
+
+def test_failed_replay_keeps_the_segment(tmp_path):
+    class Down:
+        name = "posts"
+        def bulk_write(self, ops, ordered=False): raise RuntimeError("db down")
+
+    spool = PostSpool(str(tmp_path), mode="only")
+    spool.append(_docs(2))
+    spool.checkpoint()
+    assert replay(spool, lambda: BulkWriter(Down(), backoff=0))[2] == 1
+    segment, = spool.segments()
+    assert os.path.exists(segment)
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+from benchmark_pipeline import mongomock_db
+from utils.trends import PANES_COLLECTION, SNAPSHOTS_COLLECTION, WINDOWS, SpaceSaving, TrendEngine
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def _post(title, at=NOW):
+    return {"title": title, "timestamp": datetime.fromtimestamp(at, timezone.utc)}
+
+def _counts(engine, window):
+    return {term: count for term, count, _ in engine.top(window, n=100)}
+
+def test_space_saving_keeps_heavy_hitters_with_bounded_error():
+    summary = SpaceSaving(2)
+    for term in ["nvda"] * 5 + ["amd", "tsla", "amd"]:
+        summary.offer(term)
+    top = dict(summary.top(2))
+    assert top["nvda"] == [5, 0]
+    # Evicted newcomers inherit the floor as their error
+    assert all(count - error <= 2 for term, (count, error) in top.items() if term != "nvda")
+
+def test_market_keywords_are_matched_as_one_term():
+    engine = TrendEngine(mongomock_db(), ["interest rates"], clock=Clock())
+    terms = engine.terms({"title": "Fed holds interest rates steady"})
+    assert "interest rates" in terms and "interest" not in terms and "steady" in terms
+
+def test_concurrent_engines_add_up_instead_of_overwriting():
+    db = mongomock_db()
+    first, second = TrendEngine(db, [], clock=Clock()), TrendEngine(db, [], clock=Clock())
+    first.observe([_post("nvidia earnings")])
+    second.observe([_post("nvidia earnings"), _post("nvidia guidance")])
+    first.flush()
+    second.flush()
+    # Flushing again only writes what is new
+    first.flush()
+    assert _counts(second, "1h")["nvidia"] == 3
+    snapshot = db[SNAPSHOTS_COLLECTION].find_one({"_id": "1h"})
+    assert {t["term"]: t["count"] for t in snapshot["terms"]}["nvidia"] == 3
+    # A fresh process restores the summed panes
+    fresh = TrendEngine(db, [], clock=Clock())
+    fresh.load()
+    assert _counts(fresh, "1h")["nvidia"] == 3 and _counts(fresh, "1h")["guidance"] == 1
+
+def test_expired_panes_are_dropped_by_pane_time():
+    db = mongomock_db()
+    clock = Clock()
+    engine = TrendEngine(db, [], clock=clock)
+    engine.observe([_post("nvidia earnings")])
+    engine.flush()
+    assert db[PANES_COLLECTION].count_documents({"window": "1h"}) > 0
+
+    pane_seconds, n_panes = WINDOWS["1h"]
+    clock.now += pane_seconds * n_panes
+    # Another process flushing (nothing new of its own) expires the old 1h panes
+    other = TrendEngine(db, [], clock=clock)
+    other.load()
+    other.flush()
+    assert db[PANES_COLLECTION].count_documents({"window": "1h"}) == 0
+    assert db[PANES_COLLECTION].count_documents({"window": "24h"}) > 0
+    assert "nvidia" not in _counts(other, "1h") and _counts(other, "24h")["nvidia"] == 1
@@ -1,107 +1,374 @@
-
 import io
-import torch
-import torch.nn.functional as F
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-except ImportError:
-    pipeline = None
+import os
+import time
+import threading
+
+# torch / transformers are imported on first use (AgriAIClient.load) so that
+# importing the pipeline, dry runs and server-backed jobs stay cheap
+from utils.inference_cache import InferenceCache, text_key
+from utils.inference_backend import default_backend
+from utils.batching import TRUNCATION_POLICIES, truncate_ids, token_budget_batches
+from utils.keyword_matcher import default_matcher
+from utils.metrics import REGISTRY, SIZE_BUCKETS
+from utils.profiling import span
+
+GATEKEEPER_MODEL = "typeform/distilbert-base-uncased-mnli"
+SENTIMENT_MODEL = "ProsusAI/finbert"
+
+MODEL_SECONDS = REGISTRY.histogram("fin_model_batch_seconds", "Model forward time per batch", ["model"])
+MODEL_BATCH = REGISTRY.histogram("fin_model_batch_size", "Texts (gatekeeper) or segments (finbert) per batch", ["model"], SIZE_BUCKETS)
+PREFILTER_DECISIONS = REGISTRY.counter("fin_prefilter_decisions", "Keyword pre-filter triage outcomes", ["decision"])
+GATEKEEPER_REJECTED = REGISTRY.counter("fin_gatekeeper_rejected", "Texts the gatekeeper classified as not finance-related")
+CACHE_LOOKUPS = REGISTRY.counter("fin_inference_cache_lookups", "Inference cache lookups", ["result"])
 
 class AgriAIClient:
     """
     AI Client with:
     1. DistilBERT Gatekeeper (Relevance Filter)
     2. FinBERT (Financial Sentiment Analysis)
+
+    gatekeeper="single_pass" (default) scores all labels in one batched NLI pass,
+    gatekeeper="pipeline" uses the original transformers zero-shot pipeline.
+
+    Results are cached on disk by normalized text hash (FIN_AI_CACHE=0 disables,
+    FIN_AI_CACHE_SIZE bounds the number of entries).
+
+    backend="torch" | "int8" | "onnx" picks the CPU inference backend for both
+    models (default FIN_AI_BACKEND, else fp32 torch); num_threads defaults to
+    FIN_AI_THREADS.
+
+    Models are loaded lazily on the first analyze call (lazy=False loads now).
+
+    Batches are built by token count, not text count: length-sorted texts are
+    grouped until batch_size * longest_item reaches token_budget
+    (FIN_AI_TOKEN_BUDGET). Texts over the 512-token window follow the
+    truncation policy (FIN_AI_TRUNCATION): "head" keeps the start, "head_tail"
+    keeps the start and the end, "chunk" scores up to MAX_CHUNKS windows and
+    averages FinBERT probabilities weighted by window length.
+
+    Every result carries the keyword matcher's 'tags' and 'prescore'.
+    prefilter=True (FIN_AI_PREFILTER, default off until its agreement with the
+    gatekeeper is checked with verify_gatekeeper.py) also acts on the triage:
+    confident hits skip the gatekeeper, texts matching only the calibrated
+    negative list are rejected without it.
     """
-    def __init__(self):
+    def __init__(self, gatekeeper="single_pass", cache=None, backend=None, num_threads=None, lazy=True,
+                 truncation=None, token_budget=None, prefilter=None):
         self.classifier = None   # Gatekeeper
         self.tokenizer = None    # FinBERT
         self.model = None        # FinBERT
-        
+        self.cache = None
+        self.gatekeeper = gatekeeper
+        self.num_threads = num_threads
+        self.backend = backend or default_backend()
+        self.truncation = truncation or os.getenv('FIN_AI_TRUNCATION', 'head')
+        if self.truncation not in TRUNCATION_POLICIES:
+            raise ValueError(f"Unknown truncation policy '{self.truncation}' (expected one of {TRUNCATION_POLICIES})")
+        self.token_budget = token_budget or int(os.getenv('FIN_AI_TOKEN_BUDGET', '16384'))
+        self.model_id = f"{GATEKEEPER_MODEL}|{SENTIMENT_MODEL}|{self.backend}"
+        if self.truncation != "head":
+            # Long texts score differently under other policies -> separate cache entries
+            self.model_id += f"|{self.truncation}"
+        if prefilter is None:
+            prefilter = os.getenv('FIN_AI_PREFILTER', '0') != '0'
+        self.prefilter = prefilter
+        self.matcher = default_matcher()
+        self.prefilter_stats = {"hit": 0, "miss": 0, "ambiguous": 0}
+        if self.prefilter:
+            # Keyword hits bypass the gatekeeper -> relevance can differ from model-only entries
+            self.model_id += "|kw"
+        self._cache_setting = cache
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+        if not lazy:
+            self.load()
+
+    def __getstate__(self):
+        # Picklable for spawn-based worker pools: no lock, no SQLite handle
+        state = self.__dict__.copy()
+        state["_load_lock"] = None
+        state["cache"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """ Loads both models (once). Falls back to Neutral-only output if that fails. """
+        if self._loaded: return self
+        with self._load_lock:
+            if self._loaded: return self
+            self._load_models()
+            self._load_cache()
+            self._loaded = True
+        return self
+
+    def _load_models(self):
+        try:
+            from transformers import pipeline, AutoTokenizer
+            from utils.gatekeeper import ZeroShotGatekeeper
+            from utils.inference_backend import configure_threads, load_sequence_classifier
+        except ImportError:
+            print("      ⚠️ Transformers not installed. Using fallback.")
+            return
+
         try:
-            if pipeline:
-                print("      🧠 Loading AI Models...")
-                print("        1. [Gatekeeper] Loading DistilBERT...")
-                self.classifier = pipeline("zero-shot-classification", model="typeform/distilbert-base-uncased-mnli")
-                
-                print("        2. [Sentiment] Loading FinBERT (ProsusAI)...")
-                self.tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-                self.model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
-                self.model.eval() # Set to evaluation mode
+            num_threads = configure_threads(self.num_threads)
+            print(f"      🧠 Loading AI Models ({self.backend} backend)...")
+            print(f"        1. [Gatekeeper] Loading DistilBERT ({self.gatekeeper})...")
+            if self.gatekeeper == "pipeline":
+                self.classifier = pipeline("zero-shot-classification", model=GATEKEEPER_MODEL)
             else:
-                print("      ⚠️ Transformers not installed. Using fallback.")
+                self.classifier = ZeroShotGatekeeper(GATEKEEPER_MODEL, self.CANDIDATE_LABELS,
+                                                     backend=self.backend, num_threads=num_threads)
+            
+            print("        2. [Sentiment] Loading FinBERT (ProsusAI)...")
+            self.tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+            self.model = load_sequence_classifier(SENTIMENT_MODEL, self.backend, num_threads)
         except Exception as e:
             print(f"      ⚠️ Model Load Error: {e}. Using fallback.")
 
+    def _load_cache(self):
+        cache = self._cache_setting
+        if cache is None:
+            cache = os.getenv('FIN_AI_CACHE', '1') != '0'
+        # Only cache real model output, never the Neutral fallback
+        if cache and self.classifier and self.model:
+            try:
+                self.cache = cache if isinstance(cache, InferenceCache) else InferenceCache(
+                    max_entries=int(os.getenv('FIN_AI_CACHE_SIZE', '500000'))
+                )
+            except Exception as e:
+                print(f"      ⚠️ Inference Cache Error: {e}. Running uncached.")
+
+    # Gatekeeper labels (first one is the "relevant" class)
+    CANDIDATE_LABELS = [
+        "financial market and economy", 
+        "personal life and relationships", 
+        "entertainment and movies", 
+        "gaming",
+        "general discussion"
+    ]
+    BATCH_SIZE = 32
+    MAX_CHUNKS = 8
+
     def analyze(self, text):
         """
         Analyzes text using DistilBERT for relevance and FinBERT for sentiment.
         """
         if not text: return None
-        
-        is_relevant = True
-        sentiment = "Neutral"
-        confidence = 0.0
-        
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts, batch_size=None):
+        """
+        Batched version of analyze().
+        Texts are tokenized once, sorted by token length and packed into
+        batches under the token budget (at most batch_size texts each);
+        results are returned in input order (None for empty texts).
+        """
+        self.load()
+        batch_size = batch_size or self.BATCH_SIZE
+        results = [None] * len(texts)
+
+        # Fast checking for very short text to avoid overhead
+        pending = []
+        for i, text in enumerate(texts):
+            if not text: continue
+            if self.classifier and len(text.split()) < 3:
+                results[i] = self._rejected()
+                continue
+            pending.append(i)
+
+        # --- 0. Keyword Pre-filter (tags always; with prefilter on, confident hits skip the gatekeeper) ---
+        keyword_hits, prescores = set(), {}
+        if pending:
+            remaining = []
+            with span("ai.prefilter", "model", texts=len(pending)):
+                for i in pending:
+                    prescores[i] = self.matcher.triage(texts[i])
+                    if not self.prefilter:
+                        remaining.append(i)
+                        continue
+                    decision = prescores[i][2]
+                    self.prefilter_stats[decision] += 1
+                    PREFILTER_DECISIONS.inc(decision=decision)
+                    if decision == "miss":
+                        results[i] = self._rejected()
+                        continue
+                    if decision == "hit":
+                        keyword_hits.add(i)
+                    remaining.append(i)
+            pending = remaining
+
+        # --- 0b. Inference Cache ---
+        computed = {}
+        if self.cache and pending:
+            keys = {i: text_key(texts[i], self.model_id) for i in pending}
+            with span("ai.cache_lookup", "model", keys=len(keys)):
+                cached = self.cache.get_many(list(set(keys.values())))
+            misses = []
+            for i in pending:
+                hit = cached.get(keys[i])
+                if hit is None:
+                    misses.append(i)
+                    continue
+                hit = dict(hit)
+                hit["summary"] = texts[i][:100] + "..." if hit["is_relevant"] else ""
+                results[i] = hit
+            CACHE_LOOKUPS.inc(len(pending) - len(misses), result="hit")
+            CACHE_LOOKUPS.inc(len(misses), result="miss")
+            pending = misses
+
         # --- 1. DistilBERT Gatekeeper ---
-        if self.classifier:
+        unchecked = set()
+        gated = [i for i in pending if i not in keyword_hits]
+        if self.classifier and gated:
+            relevant = [i for i in pending if i in keyword_hits]
             try:
-                candidate_labels = [
-                    "financial market and economy", 
-                    "personal life and relationships", 
-                    "entertainment and movies", 
-                    "gaming",
-                    "general discussion"
-                ]
-                
-                # Fast checking for very short text to avoid overhead
-                if len(text.split()) < 3: 
-                    return {"is_relevant": False, "sentiment_class": "Neutral", "confidence": 0, "summary": ""}
-
-                result = self.classifier(text, candidate_labels)
-                top_label = result['labels'][0]
-                top_score = result['scores'][0]
-                
-                # Strict Gatekeeper Rule (0.4 threshold for robust filtering)
-                if top_label != "financial market and economy" and top_score > 0.4:
-                    # print(f"        [AI Filter] Skipped: '{text[:40]}...' ({top_label}: {top_score:.2f})")
-                    return {"is_relevant": False, "sentiment_class": "Neutral", "confidence": 0, "summary": ""}
-                
+                # Tokenization + token-budget batching of the premises
+                with span("ai.gatekeeper.prepare", "model", texts=len(gated)):
+                    chunks, run = self._gatekeeper_batches(texts, gated, batch_size)
             except Exception as e:
                 print(f"      ⚠️ Gatekeeper Error: {e}")
-        
+                chunks, run = [], None
+                relevant.extend(gated)
+                unchecked.update(gated)
+            for chunk in chunks:
+                try:
+                    # Every text is scored against each candidate label (one NLI pair per label)
+                    with MODEL_SECONDS.time(model="gatekeeper"), \
+                         span("ai.gatekeeper.batch", "model", texts=len(chunk), pairs=len(chunk) * len(self.CANDIDATE_LABELS)):
+                        outputs = run(chunk)
+                    MODEL_BATCH.observe(len(chunk), model="gatekeeper")
+                    if isinstance(outputs, dict): outputs = [outputs]
+                except Exception as e:
+                    print(f"      ⚠️ Gatekeeper Error: {e}")
+                    relevant.extend(chunk)
+                    unchecked.update(chunk)
+                    continue
+
+                for i, result in zip(chunk, outputs):
+                    top_label = result['labels'][0]
+                    top_score = result['scores'][0]
+                    
+                    # Strict Gatekeeper Rule (0.4 threshold for robust filtering)
+                    if top_label != self.CANDIDATE_LABELS[0] and top_score > 0.4:
+                        results[i] = computed[i] = self._rejected()
+                        GATEKEEPER_REJECTED.inc()
+                    else:
+                        relevant.append(i)
+            pending = relevant
+
         # --- 2. FinBERT Sentiment Analysis ---
-        if self.tokenizer and self.model:
+        sentiments = {}
+        if self.tokenizer and self.model and pending:
+            import torch
+            import torch.nn.functional as F
+            # ProsusAI/finbert labels are: {0: 'positive', 1: 'negative', 2: 'neutral'}
+            labels = self.model.config.id2label
             try:
-                inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                
-                # FinBERT Output: [positive, negative, neutral] (Check config, usually: 0=positive, 1=negative, 2=neutral OR similar)
-                # Actually ProsusAI/finbert labels are: {0: 'positive', 1: 'negative', 2: 'neutral'}
-                # Let's verify mapping dynamically
-                labels = self.model.config.id2label
-                
-                scores = F.softmax(outputs.logits, dim=1)
-                max_score, max_index = torch.max(scores, dim=1)
-                
-                sentiment_label = labels[max_index.item()] # 'positive', 'negative', 'neutral'
-                confidence = max_score.item()
-                
-                # Capitalize for frontend consistency
-                sentiment = sentiment_label.capitalize() 
-                
+                with span("ai.finbert.tokenize", "model", texts=len(pending)):
+                    segments, owners = self._sentiment_segments(texts, pending)
             except Exception as e:
                 print(f"      ⚠️ FinBERT Error: {e}")
-                sentiment = "Neutral"
-        
-        # Fallback if models failed
-        else:
-             sentiment = "Neutral"
-
-        return {
-            "is_relevant": is_relevant,
-            "sentiment_class": sentiment,
-            "confidence": confidence,
-            "summary": text[:100] + "..."
-        }
+                segments, owners = [], []
+
+            # Per text: sum of segment probabilities weighted by segment length
+            totals, failed = {}, set()
+            lengths = [len(segment) for segment in segments]
+            for batch in token_budget_batches(lengths, self.token_budget, batch_size):
+                try:
+                    started = time.perf_counter()
+                    with span("ai.finbert.batch", "model", segments=len(batch), tokens=sum(lengths[k] for k in batch)):
+                        features = [self.tokenizer.prepare_for_model(segments[k]) for k in batch]
+                        inputs = self.tokenizer.pad(features, return_tensors="pt")
+                        with torch.no_grad():
+                            outputs = self.model(**inputs)
+                    MODEL_SECONDS.observe(time.perf_counter() - started, model="finbert")
+                    MODEL_BATCH.observe(len(batch), model="finbert")
+
+                    scores = F.softmax(outputs.logits, dim=1)
+                    for k, row in zip(batch, scores):
+                        weight = max(1, lengths[k])
+                        total, weights = totals.get(owners[k], (0, 0))
+                        totals[owners[k]] = (total + row * weight, weights + weight)
+                except Exception as e:
+                    print(f"      ⚠️ FinBERT Error: {e}")
+                    failed.update(owners[k] for k in batch)
+
+            for i, (total, weights) in totals.items():
+                if i in failed: continue
+                score, index = torch.max(total / weights, dim=0)
+                # Capitalize for frontend consistency
+                sentiments[i] = (labels[index.item()].capitalize(), score.item())
+
+        # Fallback if models failed -> Neutral
+        for i in pending:
+            sentiment, confidence = sentiments.get(i, ("Neutral", 0.0))
+            results[i] = {
+                "is_relevant": True,
+                "sentiment_class": sentiment,
+                "confidence": confidence,
+                "summary": texts[i][:100] + "..."
+            }
+            if i in sentiments and i not in unchecked:
+                computed[i] = results[i]
+
+        if self.cache and computed:
+            try:
+                self.cache.put_many([(text_key(texts[i], self.model_id), result) for i, result in computed.items()])
+            except Exception as e:
+                print(f"      ⚠️ Inference Cache Error: {e}")
+
+        # Tags are recomputed every call (cheap), so they are never stale in the cache
+        for i, (tags, prescore, _) in prescores.items():
+            if results[i] is not None:
+                results[i]["tags"] = tags
+                results[i]["prescore"] = prescore
+        return results
+
+    def _gatekeeper_batches(self, texts, indices, batch_size):
+        """
+        Returns (chunks, run) for the gatekeeper stage. The single-pass
+        gatekeeper gets pre-tokenized premises in token-budget batches (each
+        text costs one row per label); the transformers pipeline gets
+        character-length buckets.
+        """
+        if not hasattr(self.classifier, "classify_ids"):
+            run = lambda chunk: self.classifier([texts[i] for i in chunk], self.CANDIDATE_LABELS, batch_size=batch_size)
+            return self._length_buckets(texts, indices, batch_size), run
+
+        # Relevance is decided on one window; "chunk" falls back to head+tail here
+        policy = "head" if self.truncation == "head" else "head_tail"
+        limit = self.classifier.max_premise_tokens
+        token_ids = self.classifier.tokenize([texts[i] for i in indices])
+        premises = {i: truncate_ids(ids, limit, policy)[0] for i, ids in zip(indices, token_ids)}
+
+        rows = len(self.CANDIDATE_LABELS)
+        lengths = [(len(premises[i]) + self.classifier.pair_overhead) * rows for i in indices]
+        chunks = [[indices[k] for k in batch] for batch in token_budget_batches(lengths, self.token_budget, batch_size)]
+        return chunks, lambda chunk: self.classifier.classify_ids([premises[i] for i in chunk])
+
+    def _sentiment_segments(self, texts, indices):
+        """ FinBERT token-id segments under the truncation policy, plus the text index owning each. """
+        limit = min(512, self.tokenizer.model_max_length) - self.tokenizer.num_special_tokens_to_add()
+        token_ids = self.tokenizer([texts[i] for i in indices], add_special_tokens=False, verbose=False)["input_ids"]
+
+        segments, owners = [], []
+        for i, ids in zip(indices, token_ids):
+            for segment in truncate_ids(ids, limit, self.truncation, self.MAX_CHUNKS):
+                segments.append(segment)
+                owners.append(i)
+        return segments, owners
+
+    @staticmethod
+    def _length_buckets(texts, indices, batch_size):
+        """ Groups indices of similar text length so batches carry little padding. """
+        ordered = sorted(indices, key=lambda i: len(texts[i]))
+        return [ordered[k:k + batch_size] for k in range(0, len(ordered), batch_size)]
+
+    @staticmethod
+    def _rejected():
+        return {"is_relevant": False, "sentiment_class": "Neutral", "confidence": 0, "summary": ""}
@@ -0,0 +1,37 @@
+# Token-aware batching helpers shared by the gatekeeper and FinBERT paths.
+
+# "head"      = keep the first tokens (what truncation=True always did)
+# "head_tail" = keep the first quarter and the last three quarters of the window
+# "chunk"     = score consecutive windows and average them (FinBERT only)
+TRUNCATION_POLICIES = ("head", "head_tail", "chunk")
+
+def truncate_ids(ids, max_tokens, policy="head", max_chunks=8):
+    """ Returns the token-id segment(s) to score for one text under 'policy'. """
+    if len(ids) <= max_tokens:
+        return [ids]
+    if policy == "head_tail":
+        head = max_tokens // 4
+        return [ids[:head] + ids[len(ids) - (max_tokens - head):]]
+    if policy == "chunk":
+        return [ids[k:k + max_tokens] for k in range(0, len(ids), max_tokens)][:max_chunks]
+    return [ids[:max_tokens]]
+
+def token_budget_batches(lengths, token_budget, max_batch):
+    """
+    Groups item indices by length so that every batch satisfies
+    batch_size * longest_item <= token_budget (the padded tensor size) and
+    batch_size <= max_batch. Short items end up together and never pay for
+    a long neighbour's padding.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, current, longest = [], [], 0
+    for i in order:
+        grown = max(longest, lengths[i])
+        if current and (len(current) >= max_batch or (len(current) + 1) * grown > token_budget):
+            batches.append(current)
+            current, grown = [], lengths[i]
+        current.append(i)
+        longest = grown
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,79 @@
+import os
+import time
+import sqlite3
+import threading
+
+from utils.inference_cache import CACHE_DIR
+
+class CursorStore:
+    """
+    Per-source, per-query fetch state:
+    - high-water mark: newest timestamp (epoch seconds) and id seen so far
+    - history flags:   (source, query, year) slices the backfill has finished
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'cursors.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cursors ("
+            " source TEXT, query TEXT, newest_ts REAL, newest_id TEXT, updated REAL,"
+            " PRIMARY KEY (source, query))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " source TEXT, query TEXT, year INTEGER, completed REAL,"
+            " PRIMARY KEY (source, query, year))"
+        )
+        self.conn.commit()
+
+    def get(self, source, query=""):
+        """ Returns (newest_ts, newest_id); (None, None) if never fetched. """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT newest_ts, newest_id FROM cursors WHERE source=? AND query=?", (source, query)
+            ).fetchone()
+        return row or (None, None)
+
+    def advance(self, source, query="", ts=None, item_id=None):
+        """ Moves the high-water mark forward (never back). """
+        if ts is None and item_id is None: return
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT newest_ts, newest_id FROM cursors WHERE source=? AND query=?", (source, query)
+            ).fetchone()
+            old_ts, old_id = row or (None, None)
+            if ts is not None and old_ts is not None and ts < old_ts:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors (source, query, newest_ts, newest_id, updated) VALUES (?, ?, ?, ?, ?)",
+                (source, query, ts if ts is not None else old_ts, item_id if item_id is not None else old_id, time.time())
+            )
+            self.conn.commit()
+
+    def is_complete(self, source, query, year):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM history WHERE source=? AND query=? AND year=?", (source, query, year)
+            ).fetchone()
+        return row is not None
+
+    def mark_complete(self, source, query, year):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO history (source, query, year, completed) VALUES (?, ?, ?, ?)",
+                (source, query, year, time.time())
+            )
+            self.conn.commit()
+
+_store = None
+# Fetch threads reach get_cursor_store() concurrently on their first page
+_init_lock = threading.Lock()
+
+def get_cursor_store():
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = CursorStore()
+    return _store
@@ -0,0 +1,140 @@
+import time
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+from utils.post_counts import PostCounter
+from utils.rollups import SentimentRollups
+from utils.near_dup import minhash, bands, signature_text, source_entry
+
+# Indexes for 'posts', matching the query shapes of the Next.js routes:
+# - upserts / dedup:           reddit_id (unique)
+# - feed, realtime, stats:     sort by (timestamp, _id), optionally filtered
+#                              by sentiment and/or source (source_lc equality);
+#                              _id is the keyset-pagination tiebreaker
+POST_INDEXES = [
+    # Partial: legacy docs without a reddit_id must not collide on null
+    ([("reddit_id", ASCENDING)], {"name": "reddit_id_unique", "unique": True,
+                                  "partialFilterExpression": {"reddit_id": {"$type": "string"}}}),
+    ([("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "timestamp_id"}),
+    ([("analysis.sentiment_class", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+     {"name": "sentiment_timestamp_id"}),
+    ([("source_lc", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "source_timestamp_id"}),
+    ([("source_lc", ASCENDING), ("analysis.sentiment_class", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+     {"name": "source_sentiment_timestamp_id"}),
+    # Keyword / hashtag tags from the pre-filter (multikey)
+    ([("tags", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "tags_timestamp_id"}),
+    # MinHash LSH bands for near-duplicate lookups (multikey)
+    ([("minhash_bands", ASCENDING)], {"name": "minhash_bands"}),
+]
+
+META_COLLECTION = "schema_meta"
+
+def normalize_source(source):
+    """ Lowercase source key, so filters are equality matches instead of /source/i regexes. """
+    return (source or "").strip().lower()
+
+# ---- migrations (applied once, in order) ----
+
+def _add_source_lc(db):
+    """ Backfills 'source_lc' on posts written before the field existed. """
+    result = db['posts'].update_many(
+        {"source_lc": {"$exists": False}},
+        [{"$set": {"source_lc": {"$toLower": {"$trim": {"input": {"$ifNull": ["$source", ""]}}}}}}]
+    )
+    print(f"      🔧 source_lc backfilled on {result.modified_count} posts")
+
+def _dedupe_reddit_ids(db):
+    """ Keeps the newest copy of any duplicated reddit_id so the unique index can build. """
+    duplicates = db['posts'].aggregate([
+        {"$match": {"reddit_id": {"$type": "string"}}},
+        {"$group": {"_id": "$reddit_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    removed = 0
+    for group in duplicates:
+        stale = sorted(group["ids"])[:-1]
+        removed += db['posts'].delete_many({"_id": {"$in": stale}}).deleted_count
+    print(f"      🔧 Removed {removed} duplicate reddit_id posts")
+
+def _drop_pre_keyset_indexes(db):
+    """ The (timestamp) indexes without the _id tiebreaker are superseded by the *_id ones. """
+    existing = db['posts'].index_information()
+    for name in ("timestamp", "sentiment_timestamp", "source_timestamp", "source_sentiment_timestamp"):
+        if name in existing:
+            db['posts'].drop_index(name)
+            print(f"      🔧 Dropped index {name}")
+
+def _build_post_counts(db):
+    PostCounter(db).rebuild()
+
+def _build_sentiment_rollups(db):
+    SentimentRollups(db).rebuild()
+
+def _backfill_minhash(db, chunk=1000):
+    """ MinHash + LSH bands (and a 'sources' list) for posts stored before near-dup detection. """
+    posts = db['posts']
+    cursor = posts.find({"minhash": {"$exists": False}, "analysis": {"$exists": True}},
+                        {"title": 1, "content": 1, "source": 1, "reddit_id": 1, "url": 1}, batch_size=chunk)
+    ops, done = [], 0
+    for doc in cursor:
+        body = signature_text(doc)
+        signature = minhash(body) if body else None
+        fields = {"sources": [source_entry(doc)]}
+        if signature is not None:
+            fields.update(minhash=signature, minhash_bands=bands(signature))
+        ops.append(UpdateOne({"_id": doc["_id"], "sources": {"$exists": False}}, {"$set": fields}))
+        if len(ops) >= chunk:
+            done += posts.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        done += posts.bulk_write(ops, ordered=False).modified_count
+    print(f"      🔧 MinHash backfilled on {done} posts")
+
+MIGRATIONS = [
+    (1, "add source_lc", _add_source_lc),
+    (2, "dedupe reddit_id", _dedupe_reddit_ids),
+    (3, "keyset pagination indexes", _drop_pre_keyset_indexes),
+    (4, "per-filter post counts", _build_post_counts),
+    (5, "sentiment rollups", _build_sentiment_rollups),
+    (6, "near-duplicate minhash", _backfill_minhash),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(db):
+    meta = db[META_COLLECTION].find_one({"_id": "posts"})
+    return meta["version"] if meta else 0
+
+def migrate(db):
+    """ Applies pending migrations in order. Returns the resulting schema version. """
+    version = schema_version(db)
+    for target, name, apply in MIGRATIONS:
+        if target <= version: continue
+        print(f"      🔧 Migration {target}: {name}...")
+        started = time.time()
+        apply(db)
+        db[META_COLLECTION].update_one(
+            {"_id": "posts"}, {"$set": {"version": target, "updated": time.time()}}, upsert=True
+        )
+        version = target
+        print(f"      ✅ Migration {target} done ({time.time() - started:.1f}s)")
+    return version
+
+def ensure_indexes(collection):
+    """ Creates any missing POST_INDEXES (no-op for existing ones). Returns the index names. """
+    names = []
+    for keys, options in POST_INDEXES:
+        try:
+            names.append(collection.create_index(keys, **options))
+        except OperationFailure as e:
+            print(f"      ⚠️ Index {options['name']} Error: {e}")
+    return names
+
+def bootstrap(db):
+    """
+    Migrations first (they make the unique index buildable), then indexes.
+    Only run explicitly (manage_db.py migrate); ingest just checks the version.
+    """
+    migrate(db)
+    return ensure_indexes(db['posts'])
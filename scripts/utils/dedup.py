@@ -0,0 +1,54 @@
+import threading
+
+from utils.profiling import span
+
+class KnownPostFilter:
+    """
+    Pre-inference dedup on 'reddit_id'.
+
+    A page of candidates is checked against 'posts' with one $in query
+    (analyzed posts only). Known posts skip inference entirely; only their
+    metrics are refreshed. IDs confirmed in this process are kept in a local
+    index so repeated pages don't hit the DB again.
+    """
+    def __init__(self, collection):
+        self.collection = collection
+        self.known_ids = set()
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def split(self, page):
+        """ Returns (new_candidates, known_docs) for a page of (doc, text) pairs. """
+        ids = [doc["reddit_id"] for doc, _ in page]
+        with self._lock:
+            unknown = [i for i in ids if i not in self.known_ids]
+
+        if unknown:
+            try:
+                with span("mongo.find_known", "mongo", ids=len(unknown)):
+                    cursor = self.collection.find(
+                        {"reddit_id": {"$in": unknown}, "analysis": {"$exists": True}},
+                        {"reddit_id": 1, "_id": 0}
+                    )
+                    found = {d["reddit_id"] for d in cursor}
+            except Exception as e:
+                # DB unavailable -> classify everything, as before
+                print(f"      ⚠️ Dedup Lookup Error: {e}")
+                found = set()
+            with self._lock:
+                self.known_ids.update(found)
+
+        new, known = [], []
+        with self._lock:
+            for doc, text in page:
+                if doc["reddit_id"] in self.known_ids:
+                    known.append(doc)
+                else:
+                    new.append((doc, text))
+            self.skipped += len(known)
+        return new, known
+
+    def remember(self, docs):
+        """ Marks freshly written posts as known. """
+        with self._lock:
+            self.known_ids.update(doc["reddit_id"] for doc in docs)
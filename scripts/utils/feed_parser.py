@@ -0,0 +1,109 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from utils.fetch_engine import iter_body
+from utils.profiling import span
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ITEM_TAGS = ("item", f"{ATOM}entry")
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def parse_ts(text):
+    """ Epoch seconds of an RSS (RFC 822) or Atom (ISO 8601) date, or None. """
+    if not text: return None
+    text = text.strip()
+    try:
+        return parsedate_to_datetime(text).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def _record(elem):
+    """ Normalized {title, link, description, published, author} of an RSS <item> / Atom <entry>. """
+    record = {"title": None, "link": None, "description": "", "published": None, "author": None}
+    updated = None
+    for child in elem:
+        name = _local(child.tag)
+        if name == "title":
+            record["title"] = child.text
+        elif name == "link":
+            # Atom: <link rel="alternate" href="..."/>, RSS: <link>url</link>
+            href = child.get("href")
+            if href is None:
+                record["link"] = child.text
+            elif child.get("rel", "alternate") == "alternate" or record["link"] is None:
+                record["link"] = href
+        elif name in ("description", "summary", "content"):
+            if not record["description"]: record["description"] = child.text or ""
+        elif name in ("pubDate", "published"):
+            record["published"] = parse_ts(child.text)
+        elif name == "updated":
+            updated = parse_ts(child.text)
+        elif name == "creator":
+            record["author"] = child.text
+        elif name == "author":
+            author = child.find(f"{ATOM}name")
+            record["author"] = author.text if author is not None else child.text
+    if record["published"] is None: record["published"] = updated
+    return record
+
+def iter_items(chunks, limit=None, since=None, ordered=False):
+    """
+    Incrementally parses an RSS / Atom body given as byte chunks and yields
+    one normalized record per <item> / <entry> as soon as its end tag arrives.
+    Parsed items are cleared and detached from their parent, so memory stays
+    at one item regardless of feed size.
+
+    - limit:   stop after this many items (counted before the 'since' filter,
+               like slicing findall() used to)
+    - since:   skip items published at or before this high-water mark
+    - ordered: the feed is newest-first, so the first item at the mark ends
+               the parse
+    Items without a title or link are skipped (they can't be keyed or classified).
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack, seen = [], 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag not in ITEM_TAGS: continue
+
+            record = _record(elem)
+            elem.clear()
+            if stack: stack[-1].remove(elem)
+            seen += 1
+
+            published = record["published"]
+            if since is not None and published is not None and published <= since:
+                if ordered: return
+            elif record["title"] and record["link"]:
+                yield record
+            if limit and seen >= limit: return
+    parser.close()
+
+def parse_feed(resp, limit=None, since=None, ordered=False):
+    """
+    iter_items() over a response fetched with http_get(..., stream=True): the
+    body is parsed while it downloads and the connection is dropped as soon
+    as the limit / high-water mark is reached, without reading the rest.
+    """
+    # The span covers the whole lazy parse, including the caller's per-item work
+    with span("parse.feed", "parse", url=resp.url) as trace:
+        count = 0
+        try:
+            for record in iter_items(iter_body(resp), limit, since, ordered):
+                count += 1
+                yield record
+        finally:
+            resp.close()
+            trace.set(items=count)
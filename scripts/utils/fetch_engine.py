@@ -0,0 +1,240 @@
+import os
+import time
+import sqlite3
+import threading
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.inference_cache import CACHE_DIR
+from utils.metrics import REGISTRY, current_source
+from utils.profiling import span
+
+# ==========================================
+# RATE LIMITING
+# ==========================================
+
+class TokenBucket:
+    """ Thread-safe token bucket: 'rate' requests/sec with bursts up to 'capacity'. """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# host -> (requests/sec, burst, max in-flight). Replaces the old fixed sleeps.
+HOST_LIMITS = {
+    "www.reddit.com": (0.5, 1, 1),
+    "news.google.com": (2.0, 2, 2),
+    "mastodon.social": (2.0, 4, 4),
+    "lemmy.world": (2.0, 4, 4),
+    "medium.com": (1.0, 2, 2),
+    "www.youtube.com": (1.0, 2, 2),
+    "hn.algolia.com": (2.0, 2, 2),
+}
+DEFAULT_LIMIT = (1.0, 2, 2)
+
+class HostLimiter:
+    """ Per-host concurrency cap + token bucket, shared by every fetcher thread. """
+    def __init__(self, limits=None, default=DEFAULT_LIMIT):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.default = default
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                rate, burst, in_flight = self.limits.get(host, self.default)
+                self._hosts[host] = (TokenBucket(rate, burst), threading.BoundedSemaphore(in_flight))
+            return self._hosts[host]
+
+    def slot(self, url):
+        bucket, semaphore = self._get(urllib.parse.urlsplit(url).netloc)
+        return _HostSlot(bucket, semaphore)
+
+class _HostSlot:
+    def __init__(self, bucket, semaphore):
+        self.bucket = bucket
+        self.semaphore = semaphore
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        self.bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+        return False
+
+LIMITER = HostLimiter()
+
+# ==========================================
+# POOLED SESSIONS + CONDITIONAL GET
+# ==========================================
+
+class ValidatorStore:
+    """ Persistent url -> (ETag, Last-Modified) store for conditional GETs. """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'http_validators.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS validators ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, updated REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute("SELECT etag, last_modified FROM validators WHERE url=?", (url,)).fetchone()
+        return row or (None, None)
+
+    def put(self, url, etag, last_modified):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO validators (url, etag, last_modified, updated) VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, time.time())
+            )
+            self.conn.commit()
+
+class HttpStats:
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, resp, streamed=False):
+        with self._lock:
+            self.requests += 1
+            if resp.status_code == 304:
+                self.not_modified += 1
+            # Streamed bodies are counted by iter_body() as they are read
+            if not streamed: self.bytes += len(resp.content or b"")
+
+    def add_bytes(self, n):
+        with self._lock:
+            self.bytes += n
+
+HTTP_STATS = HttpStats()
+HTTP_SECONDS = REGISTRY.histogram("fin_http_request_seconds", "HTTP request latency (excluding rate-limit waits)", ["source"])
+HTTP_RESPONSES = REGISTRY.counter("fin_http_responses", "HTTP responses by status ('error' = no response)", ["source", "status"])
+_validators = None
+_local = threading.local()
+# get_validators() is first called by several fetch threads at once
+_init_lock = threading.Lock()
+_transport = None
+
+def use_transport(adapter):
+    """
+    Routes sessions created from now on through 'adapter' instead of the
+    network (fixture replay / recording in benchmark_pipeline.py); None
+    restores the pooled HTTPAdapter.
+    """
+    global _transport
+    _transport = adapter
+
+def get_session():
+    """ One keep-alive session per thread (requests.Session is not thread-safe). """
+    session = getattr(_local, "session", None)
+    if session is not None and getattr(_local, "transport", None) is not _transport:
+        session = None
+    if session is None:
+        session = requests.Session()
+        adapter = _transport or HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        _local.session = session
+        _local.transport = _transport
+    return session
+
+def thread_requests():
+    """ Requests sent by the calling thread so far (a fetch thread runs one source at a time). """
+    return getattr(_local, "requests", 0)
+
+class RequestBudgetSpent(Exception):
+    """ http_get refused: the calling thread's request allowance is used up. """
+
+def set_request_allowance(requests):
+    """ Caps the calling thread's further http_get calls at 'requests' (None: no cap). """
+    _local.allowance = None if requests is None else thread_requests() + requests
+
+def get_validators():
+    global _validators
+    with _init_lock:
+        if _validators is None:
+            _validators = ValidatorStore()
+    return _validators
+
+def http_get(url, conditional=False, **kwargs):
+    """
+    GET over a pooled keep-alive session, behind the shared per-host limiter.
+    conditional=True sends the stored ETag/Last-Modified; an unchanged
+    resource comes back as 304 with an empty body, which callers skip
+    like any other non-200. The new validators of a 200 are not stored here:
+    they come back as resp.validators for save_validators() once the page
+    is saved, so a failed or dry run doesn't turn the next fetch into a 304.
+    stream=True leaves the body unread; consume it with iter_body().
+    Raises RequestBudgetSpent once set_request_allowance() is used up.
+    """
+    streamed = kwargs.get("stream", False)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if conditional:
+        etag, last_modified = get_validators().get(url)
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+
+    allowance = getattr(_local, "allowance", None)
+    if allowance is not None and thread_requests() >= allowance:
+        raise RequestBudgetSpent(f"request allowance spent, not fetching {url}")
+    # Counted before sending, so requests that time out still cost their share
+    _local.requests = thread_requests() + 1
+    source = current_source()
+    with LIMITER.slot(url), span("http.get", "http", host=urllib.parse.urlsplit(url).netloc) as trace:
+        started = time.perf_counter()
+        try:
+            resp = get_session().get(url, headers=headers, **kwargs)
+        except Exception:
+            HTTP_RESPONSES.inc(source=source, status="error")
+            raise
+        finally:
+            HTTP_SECONDS.observe(time.perf_counter() - started, source=source)
+        if not streamed: trace.set(bytes=len(resp.content or b""))
+        trace.set(status=resp.status_code)
+    HTTP_STATS.record(resp, streamed)
+    HTTP_RESPONSES.inc(source=source, status=resp.status_code)
+
+    resp.validators = None
+    if conditional and resp.status_code == 200:
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+        if etag or last_modified:
+            resp.validators = (url, etag, last_modified)
+    return resp
+
+def save_validators(validators):
+    """ Stores resp.validators of a conditional GET (no-op for None). """
+    if validators:
+        get_validators().put(*validators)
+
+def iter_body(resp, chunk_size=16384):
+    """ Decoded body chunks of a streamed response, counted into HTTP_STATS as they arrive. """
+    for chunk in resp.iter_content(chunk_size):
+        HTTP_STATS.add_bytes(len(chunk))
+        yield chunk
@@ -0,0 +1,96 @@
+import torch
+import torch.nn.functional as F
+try:
+    from transformers import AutoTokenizer
+except ImportError:
+    AutoTokenizer = None
+
+from utils.inference_backend import load_sequence_classifier
+from utils.profiling import span
+
+class ZeroShotGatekeeper:
+    """
+    Drop-in replacement for the transformers zero-shot pipeline.
+
+    The pipeline runs one NLI forward pass per (text, label) pair. Here the
+    hypothesis token ids are encoded once at load time, every premise is
+    tokenized once, and all premise x hypothesis pairs of a batch go through
+    the model in a single padded forward pass.
+    Scores are the softmax of the entailment logits across labels, i.e. the
+    same numbers as pipeline(..., multi_label=False).
+    """
+    HYPOTHESIS_TEMPLATE = "This example is {}."
+
+    def __init__(self, model_name, candidate_labels, max_length=512, backend=None, num_threads=None):
+        self.candidate_labels = list(candidate_labels)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = load_sequence_classifier(model_name, backend, num_threads)
+        self.max_length = min(max_length, self.tokenizer.model_max_length)
+
+        # Same lookup as the pipeline: first label starting with "entail", else last
+        self.entailment_id = -1
+        for label, idx in self.model.config.label2id.items():
+            if label.lower().startswith("entail"):
+                self.entailment_id = idx
+
+        # Hypotheses never change -> tokenize once
+        self.hypothesis_ids = [
+            self.tokenizer.encode(self.HYPOTHESIS_TEMPLATE.format(label), add_special_tokens=False)
+            for label in self.candidate_labels
+        ]
+        # Room left for the premise in every premise/hypothesis pair
+        self.pair_overhead = max(len(h) for h in self.hypothesis_ids) + self.tokenizer.num_special_tokens_to_add(pair=True)
+        self.max_premise_tokens = self.max_length - self.pair_overhead
+
+    def tokenize(self, texts):
+        """ Premise token ids without special tokens (one tokenizer call per batch). """
+        return self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+
+    def __call__(self, texts, candidate_labels=None, batch_size=None):
+        """
+        Classifies a text or list of texts.
+        Returns pipeline-shaped dicts: {'sequence', 'labels', 'scores'} sorted by score.
+        """
+        if candidate_labels is not None and list(candidate_labels) != self.candidate_labels:
+            raise ValueError("ZeroShotGatekeeper labels are fixed at load time")
+
+        single = isinstance(texts, str)
+        if single: texts = [texts]
+
+        results = self.classify_ids(self.tokenize(texts))
+        for text, result in zip(texts, results):
+            result["sequence"] = text
+        return results[0] if single else results
+
+    def classify_ids(self, premises):
+        """ Pipeline-shaped {'labels', 'scores'} dicts for pre-tokenized premises. """
+        results = []
+        for row in self.score_ids(premises).tolist():
+            ranked = sorted(zip(self.candidate_labels, row), key=lambda x: x[1], reverse=True)
+            results.append({
+                "labels": [label for label, _ in ranked],
+                "scores": [score for _, score in ranked]
+            })
+        return results
+
+    def score(self, texts):
+        """ Returns a (len(texts), len(labels)) tensor of label probabilities. """
+        return self.score_ids(self.tokenize(texts))
+
+    def score_ids(self, premises):
+        """ Same as score() for premises that are already token ids. """
+        features = []
+        with span("gatekeeper.pairs", "model", premises=len(premises), hypotheses=len(self.hypothesis_ids)):
+            for premise in premises:
+                for hypothesis in self.hypothesis_ids:
+                    features.append(self.tokenizer.prepare_for_model(
+                        premise, hypothesis,
+                        truncation="only_first", max_length=self.max_length
+                    ))
+            inputs = self.tokenizer.pad(features, return_tensors="pt")
+
+        with torch.no_grad(), span("gatekeeper.forward", "model", rows=len(features)):
+            logits = self.model(**inputs).logits
+
+        entailment = logits[:, self.entailment_id].view(len(premises), len(self.candidate_labels))
+        return F.softmax(entailment, dim=1)
@@ -0,0 +1,65 @@
+import os
+
+# torch / transformers / onnxruntime are imported inside the loaders so that
+# importing this module (e.g. for default_backend) stays cheap
+
+# "torch" = fp32 PyTorch (reference), "int8" = dynamic int8 quantization of the
+# Linear layers, "onnx" = exported graph on ONNX Runtime (needs optimum[onnxruntime])
+BACKENDS = ("torch", "int8", "onnx")
+
+def default_backend():
+    return os.getenv('FIN_AI_BACKEND', 'torch')
+
+def configure_threads(num_threads=None, interop_threads=None):
+    """
+    Sets torch intra-op / inter-op thread counts (FIN_AI_THREADS / FIN_AI_INTEROP_THREADS).
+    Returns the intra-op count so ONNX sessions can use the same value.
+    """
+    import torch
+    num_threads = num_threads or int(os.getenv('FIN_AI_THREADS', '0')) or None
+    interop_threads = interop_threads or int(os.getenv('FIN_AI_INTEROP_THREADS', '0')) or None
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed once, before any parallel work has started
+            pass
+    return num_threads
+
+def load_sequence_classifier(model_name, backend=None, num_threads=None):
+    """
+    Loads a sequence classification model for the given backend.
+    Every backend returns an object that takes tokenizer output (**inputs)
+    and returns something with .logits, plus .config.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError:
+        ORTModelForSequenceClassification = None
+
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {BACKENDS})")
+
+    if backend == "onnx":
+        if ORTModelForSequenceClassification is not None:
+            options = onnxruntime.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+                options.inter_op_num_threads = 1
+            return ORTModelForSequenceClassification.from_pretrained(
+                model_name, export=True, provider="CPUExecutionProvider", session_options=options
+            )
+        print("      ⚠️ optimum[onnxruntime] not installed. Falling back to int8.")
+        backend = "int8"
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
@@ -0,0 +1,100 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Local state lives next to the scripts (ignored by git)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+
+def normalize_text(text):
+    """ Lowercase + collapse whitespace so trivial formatting changes still hit. """
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+def text_key(text, model_id):
+    return hashlib.sha1(f"{model_id}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+class InferenceCache:
+    """
+    Persistent content-hash cache for AgriAIClient results.
+
+    Key = sha1(model id + normalized text), value = analysis JSON.
+    Size bounded with LRU eviction on 'last_used'; hit/miss counters per process.
+    """
+    def __init__(self, path=None, max_entries=500_000):
+        self.path = path or os.path.join(CACHE_DIR, 'inference_cache.sqlite')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_last_used ON analysis(last_used)")
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """ Returns {key: analysis} for the keys present in the cache. """
+        if not keys: return {}
+        found = {}
+        now = time.time()
+        with self._lock:
+            # SQLite caps bound parameters, so look up in slices
+            for k in range(0, len(keys), 500):
+                chunk = keys[k:k + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(f"SELECT key, value FROM analysis WHERE key IN ({marks})", chunk).fetchall()
+                for key, value in rows:
+                    found[key] = json.loads(value)
+                if rows:
+                    self.conn.executemany("UPDATE analysis SET last_used=? WHERE key=?", [(now, key) for key, _ in rows])
+            self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """ Stores (key, analysis) pairs. """
+        if not items: return
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO analysis (key, value, last_used) VALUES (?, ?, ?)",
+                [(key, json.dumps(value), now) for key, value in items]
+            )
+            self._writes += len(items)
+            # Check the bound once per 1000 writes, not on every insert
+            if self._writes >= 1000:
+                self._writes = 0
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM analysis WHERE key IN (SELECT key FROM analysis ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
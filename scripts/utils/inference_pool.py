@@ -0,0 +1,119 @@
+import os
+import threading
+
+from utils.ai_client import AgriAIClient
+from utils.inference_backend import default_backend
+from utils.metrics import REGISTRY
+
+# Set in the parent before the workers fork, so every worker inherits the
+# already-loaded models copy-on-write instead of loading its own copy
+_WORKER_AI = None
+
+def _init_worker(ai, threads, use_cache):
+    global _WORKER_AI
+    import torch
+    torch.set_num_threads(threads)
+    if ai is not None:
+        # spawn: the client arrives pickled, weights via shared-memory handles
+        _WORKER_AI = ai
+    # SQLite handles must not cross a fork -> each worker opens its own
+    _WORKER_AI.cache = None
+    _WORKER_AI._cache_setting = use_cache
+    if _WORKER_AI._loaded:
+        _WORKER_AI._load_cache()
+    # A forked worker starts with a copy of the parent's metrics: only its own count
+    REGISTRY.take()
+
+def _analyze(texts):
+    """ Results plus the metrics recorded for them (a worker's REGISTRY never reaches /metrics). """
+    results = _WORKER_AI.analyze_batch(texts)
+    return results, REGISTRY.take()
+
+class InferencePool:
+    """
+    Process-pool inference service with the same analyze / analyze_batch API
+    as AgriAIClient.
+
+    The models are loaded once in the parent and moved to shared memory;
+    workers are forked from it (copy-on-write), so N workers cost roughly one
+    copy of the weights. Each worker runs 'threads_per_worker' intra-op threads
+    (default 1), so throughput scales with cores instead of fighting over them.
+    The ONNX backend is not fork-safe, so with it each worker loads its own session.
+
+    num_workers defaults to FIN_AI_WORKERS, threads_per_worker to FIN_AI_WORKER_THREADS.
+    Nothing is loaded until load() or the first batch. Forking while other
+    threads are alive can copy a lock one of them holds into the workers, so
+    run_sources() calls load() before any pipeline thread starts; a pool
+    started with other threads running spawns its workers instead.
+    """
+    def __init__(self, num_workers=None, threads_per_worker=None, backend=None, cache=None):
+        self.num_workers = num_workers or int(os.getenv('FIN_AI_WORKERS', '0')) or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or int(os.getenv('FIN_AI_WORKER_THREADS', '1'))
+        self.backend = backend or default_backend()
+        self.cache = None
+        self._cache_setting = cache
+        self._pool = None
+        self._start_lock = threading.Lock()
+
+    def load(self):
+        """ Loads the models and starts the workers (once). """
+        if self._pool is not None: return self
+        with self._start_lock:
+            if self._pool is None:
+                self._start()
+        return self
+
+    def _start(self):
+        import torch.multiprocessing as mp
+
+        threads_per_worker = self.threads_per_worker
+        share = self.backend != "onnx"
+        ai = AgriAIClient(backend=self.backend, cache=False, lazy=not share, num_threads=threads_per_worker)
+        if share:
+            for module in (getattr(ai.classifier, "model", None), ai.model):
+                if hasattr(module, "share_memory"):
+                    module.share_memory()
+
+        # Only fork a single-threaded parent; otherwise pay for spawn
+        forkable = "fork" in mp.get_all_start_methods() and threading.active_count() == 1
+        method = "fork" if forkable else "spawn"
+        context = mp.get_context(method)
+
+        global _WORKER_AI
+        _WORKER_AI = ai
+        print(f"      🧵 Starting {self.num_workers} inference workers ({method}, {threads_per_worker} thread(s) each)...")
+        self._pool = context.Pool(
+            processes=self.num_workers,
+            initializer=_init_worker,
+            initargs=(ai if method == "spawn" else None, threads_per_worker, self._cache_setting)
+        )
+
+    def analyze(self, text):
+        if not text: return None
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts, chunk_size=None):
+        """
+        Splits the batch into length-sorted chunks, one task per chunk, spread
+        over all workers; results come back in input order, and the metrics
+        each worker recorded are merged into this process's REGISTRY.
+        """
+        if not texts: return []
+        self.load()
+        chunk_size = chunk_size or max(1, min(AgriAIClient.BATCH_SIZE, -(-len(texts) // self.num_workers)))
+        chunks = AgriAIClient._length_buckets(texts, range(len(texts)), chunk_size)
+
+        outputs = self._pool.map(_analyze, [[texts[i] for i in chunk] for chunk in chunks])
+
+        results = [None] * len(texts)
+        for chunk, (output, metrics) in zip(chunks, outputs):
+            REGISTRY.merge(metrics)
+            for i, result in zip(chunk, output):
+                results[i] = result
+        return results
+
+    def close(self):
+        if self._pool is None: return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
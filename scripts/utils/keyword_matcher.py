@@ -0,0 +1,135 @@
+import os
+from collections import deque
+
+# Single finance words that are not keywords on their own but make a text
+# worth a look by the gatekeeper (they only move the pre-score, not the tags)
+FINANCE_LEXICON = [
+    "fed", "rates", "rate hike", "rate cut", "earnings", "shares", "stocks", "stock", "markets",
+    "economy", "economic", "dividend", "nasdaq", "dow jones", "s&p", "s&p 500", "bond", "bonds",
+    "yield", "yields", "treasury", "gdp", "crypto", "btc", "eth", "fund", "funds", "bank", "banks",
+    "investor", "investors", "trading", "trader", "tariff", "tariffs", "recession", "revenue",
+    "profit", "valuation", "ipo", "sec", "rbi", "ecb", "cpi", "jobs report", "unemployment",
+]
+
+# Off-topic phrases that settle a text as a miss when nothing finance-related
+# matches. Having no keyword is not evidence (ticker chatter like "$TSLA can
+# you hear that cash burning" matches none), so this list is the only way to a
+# miss; add phrases only once `verify_gatekeeper.py` shows the gatekeeper
+# rejects them too.
+NEGATIVE_LEXICON = []
+
+# kind -> pre-score weight of one distinct match
+WEIGHTS = {"phrase": 0.6, "keyword": 0.4, "hashtag": 0.25, "lexicon": 0.1, "negative": 0.0}
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over lowercase patterns: all occurrences of all
+    patterns in one pass over the text, whatever the number of patterns.
+    """
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern, payload in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(pattern), payload))
+
+        # Breadth-first failure links; outputs inherit their fallback's outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0) if state else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text):
+        """ Yields (start, end, payload) for every pattern occurrence. """
+        state = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for end, ch in enumerate(text, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield end - length, end, payload
+
+class KeywordMatcher:
+    """
+    Compiled matcher over MARKET_KEYWORDS + HASHTAGS (+ a small finance
+    lexicon), matching whole words case-insensitively in one pass.
+
+    triage(text) returns (tags, prescore, decision):
+    - tags:     matched keywords ("Interest Rates") and hashtags ("#crypto")
+    - prescore: sum of per-match weights, capped at 1.0
+    - decision: "hit" (prescore >= hit_threshold, relevant without the
+                gatekeeper), "miss" (a 'negatives' phrase and nothing
+                finance-related) or "ambiguous" (let DistilBERT decide)
+    """
+    def __init__(self, keywords, hashtags=(), lexicon=(), hit_threshold=1.0, negatives=()):
+        self.hit_threshold = hit_threshold
+        patterns = {}
+        for phrase in negatives:
+            patterns[" ".join(phrase.lower().split())] = ("negative", None)
+        for word in lexicon:
+            patterns[word.lower()] = ("lexicon", None)
+        for tag in hashtags:
+            patterns[tag.lower()] = ("hashtag", f"#{tag.lower()}")
+        for keyword in keywords:
+            kind = "phrase" if " " in keyword.strip() else "keyword"
+            patterns[" ".join(keyword.lower().split())] = (kind, keyword)
+        self.automaton = AhoCorasick(patterns.items())
+
+    @staticmethod
+    def _normalize(text):
+        return " ".join((text or "").lower().split())
+
+    def matches(self, text):
+        """ Distinct (kind, tag) pairs found as whole words in text. """
+        text = self._normalize(text)
+        found = set()
+        for start, end, (kind, tag) in self.automaton.iter_matches(text):
+            if start > 0 and text[start - 1].isalnum(): continue
+            if end < len(text) and text[end].isalnum(): continue
+            found.add((kind, tag if tag is not None else text[start:end]))
+        return found
+
+    def match(self, text):
+        """ Matched keyword / hashtag tags, sorted. """
+        return sorted(tag for kind, tag in self.matches(text) if kind not in ("lexicon", "negative"))
+
+    def triage(self, text):
+        found = self.matches(text)
+        prescore = round(min(1.0, sum(WEIGHTS[kind] for kind, _ in found)), 2)
+        tags = sorted(tag for kind, tag in found if kind not in ("lexicon", "negative"))
+        if prescore >= self.hit_threshold:
+            decision = "hit"
+        elif found and all(kind == "negative" for kind, _ in found):
+            decision = "miss"
+        else:
+            decision = "ambiguous"
+        return tags, prescore, decision
+
+_default = None
+
+def default_matcher():
+    """ Shared matcher over financial_keywords (FIN_AI_PREFILTER_HIT sets the hit threshold). """
+    global _default
+    if _default is None:
+        from utils.financial_keywords import MARKET_KEYWORDS, HASHTAGS
+        _default = KeywordMatcher(MARKET_KEYWORDS, HASHTAGS, FINANCE_LEXICON,
+                                  hit_threshold=float(os.getenv('FIN_AI_PREFILTER_HIT', '1.0')),
+                                  negatives=NEGATIVE_LEXICON)
+    return _default
@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds, from a cached page parse to a slow model batch / Mongo flush
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.help}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def take(self):
+        """ Values recorded so far, resetting them. """
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+class Counter(_Metric):
+    """ Monotonic count per label set. """
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def add(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def _samples(self, key, value):
+        yield f"{self.name}_total{_labels(self.labelnames, key)} {value}"
+
+class Histogram(_Metric):
+    """ Cumulative-bucket histogram per label set (bucket counts, count, sum). """
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    def add(self, values):
+        with self._lock:
+            for key, (counts, count, total) in values.items():
+                entry = self._values.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += count
+                entry[2] += total
+
+    def time(self, **labels):
+        """ Context manager observing the seconds spent inside it. """
+        return _Timer(self, labels)
+
+    def _samples(self, key, value):
+        counts, count, total = value
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', bound)])} {cumulative}"
+        yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {count}"
+        yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+        yield f"{self.name}_sum{_labels(self.labelnames, key)} {total}"
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class Registry:
+    """ Process-wide metrics, rendered in the OpenMetrics text format. """
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def take(self):
+        """
+        {name: values} recorded since the last take(), resetting them: a
+        worker process's deltas, shipped to the parent for merge().
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: values for metric in metrics for values in [metric.take()] if values}
+
+    def merge(self, deltas):
+        """ Adds another registry's take() (same metric definitions) into this one. """
+        for name, values in deltas.items():
+            metric = self.metrics.get(name)
+            if metric is not None: metric.add(values)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# ==========================================
+# SOURCE CONTEXT
+# ==========================================
+# Fetch threads run one source each; binding its name lets shared code
+# (http_get, logs) label by source without passing it around
+
+_context = threading.local()
+
+def bind_source(name):
+    _context.source = name
+
+def current_source():
+    return getattr(_context, "source", None) or "unknown"
+
+# ==========================================
+# /metrics ENDPOINT
+# ==========================================
+
+_server = None
+
+def serve(port=None, host=None):
+    """
+    Serves GET /metrics from a daemon thread (once per process). Port from
+    FIN_METRICS_PORT unless given; returns None when no port is configured.
+    """
+    global _server
+    port = port if port is not None else int(os.getenv('FIN_METRICS_PORT', '0'))
+    if not port or _server is not None: return _server
+    host = host or os.getenv('FIN_METRICS_HOST', '127.0.0.1')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        _server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"      ⚠️ Metrics Endpoint Error: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📡 [Metrics] Serving http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+def write_textfile(path):
+    """ Dumps the registry to a file (atomic rename), for one-shot runs scraped by a textfile collector. """
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+# ==========================================
+# JSON LOG MODE
+# ==========================================
+
+class JsonLogStream:
+    """
+    stdout replacement for FIN_LOG_FORMAT=json: every printed line becomes one
+    JSON record {ts, level, thread, source, msg}; log_event() adds structured fields.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._pending = threading.local()
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def record(self, msg, **fields):
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": "warning" if "⚠️" in msg or "❌" in msg else "info",
+            "thread": threading.current_thread().name,
+        }
+        source = getattr(_context, "source", None)
+        if source: record["source"] = source
+        record["msg"] = msg
+        record.update(fields)
+        return record
+
+    def write(self, text):
+        buffered = getattr(self._pending, "text", "") + text
+        *lines, rest = buffered.split("\n")
+        self._pending.text = rest
+        for line in lines:
+            if line.strip():
+                self.emit(self.record(line.strip()))
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def isatty(self):
+        return False
+
+_json_stream = None
+
+def configure_logging(fmt=None):
+    """ 'json' (or FIN_LOG_FORMAT=json) switches stdout to JSON lines; anything else keeps plain prints. """
+    global _json_stream
+    fmt = fmt or os.getenv('FIN_LOG_FORMAT', 'text')
+    if fmt == "json" and _json_stream is None:
+        _json_stream = JsonLogStream(sys.stdout)
+        sys.stdout = _json_stream
+    return fmt
+
+def log_event(event, message, **fields):
+    """ Prints 'message' in text mode; in JSON mode emits it with 'event' and the fields as keys. """
+    if _json_stream is None:
+        print(message)
+        return
+    _json_stream.emit(_json_stream.record(message.strip(), event=event, **fields))
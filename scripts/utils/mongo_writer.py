@@ -0,0 +1,279 @@
+import os
+import time
+import uuid
+import random
+import threading
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, AutoReconnect, ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+from utils.metrics import REGISTRY, SIZE_BUCKETS
+from utils.profiling import span
+
+# Errors worth another attempt: network blips, elections, timeouts, write conflicts
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, ExecutionTimeout, WTimeoutError)
+TRANSIENT_CODES = {6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+DUPLICATE_KEY = 11000
+
+# Fields that change after a post is first stored (re-analysis, source
+# normalization); everything else is only written on insert, so re-saving a
+# post doesn't resend title / content
+MUTABLE_FIELDS = ("analysis", "metrics", "tags", "source_lc")
+# List fields that only grow (merged with $addToSet)
+SET_FIELDS = ("sources",)
+# Set on insert to a per-flush token, so after a whole-batch retry the upserts
+# the failed attempt already applied (matches on retry) are still told apart
+# from posts that existed before
+WRITE_TOKEN_FIELD = "_write_token"
+
+BULK_SECONDS = REGISTRY.histogram("fin_writer_bulk_write_seconds", "bulk_write round trip per attempt", ["collection", "outcome"])
+BULK_OPS = REGISTRY.histogram("fin_writer_bulk_write_ops", "Operations per bulk_write attempt", ["collection"], SIZE_BUCKETS)
+WRITER_DOCS = REGISTRY.counter("fin_writer_ops", "Writer operation outcomes", ["collection", "result"])
+
+class WriterStats:
+    """ written = inserted or modified, unchanged = matched with identical fields. """
+    def __init__(self):
+        self.queued = 0
+        self.written = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.retries = 0
+        self.flushes = 0
+
+    def summary(self):
+        return (f"{self.written} written, {self.unchanged} unchanged, {self.duplicates} duplicates, "
+                f"{self.failed} failed ({self.flushes} flushes, {self.retries} retries)")
+
+class BulkWriter:
+    """
+    Shared buffered writer for one collection.
+
+    Operations are buffered and sent as one unordered bulk_write once
+    'max_ops' are queued or the oldest one is 'max_delay' seconds old
+    (a background thread handles the time threshold). Transient errors are
+    retried with exponential backoff, only for the operations that failed;
+    duplicate-key errors are counted, not retried.
+
+    on_written (optional) is called with the docs whose upserts succeeded,
+    on_inserted (optional) with the subset that created a new document
+    (also across a whole-batch retry, via WRITE_TOKEN_FIELD),
+    on_failed (optional) with the docs given up on (not duplicates).
+
+    max_ops defaults to FIN_WRITER_BATCH, max_delay to FIN_WRITER_FLUSH_SECS.
+    """
+    def __init__(self, collection, key="reddit_id", max_ops=None, max_delay=None,
+                 max_retries=5, backoff=0.5, on_written=None, on_inserted=None, on_failed=None):
+        self.collection = collection
+        self.key = key
+        self.max_ops = max_ops or int(os.getenv('FIN_WRITER_BATCH', '500'))
+        self.max_delay = max_delay or float(os.getenv('FIN_WRITER_FLUSH_SECS', '2'))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_written = on_written
+        self.on_inserted = on_inserted
+        self.on_failed = on_failed
+        self.stats = WriterStats()
+        self._buffer = []        # [filter, update, upsert, doc or None]
+        self._upserts = {}       # key -> buffered upsert entry (coalescing)
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._closed = threading.Event()
+
+    # ---- queueing ----
+
+    def upsert(self, doc):
+        """ Inserts the doc, or updates only its mutable fields if it already exists. """
+        changed = {f: doc[f] for f in MUTABLE_FIELDS if f in doc}
+        grown = {f: {"$each": list(doc[f])} for f in SET_FIELDS if doc.get(f)}
+        fixed = {f: v for f, v in doc.items() if f not in changed and f not in SET_FIELDS and f != "_id"}
+        update = {"$setOnInsert": fixed}
+        if changed: update["$set"] = changed
+        if grown: update["$addToSet"] = grown
+        self._add({self.key: doc[self.key]}, update, True, doc)
+
+    def update(self, key_value, fields):
+        """ $set on an existing doc (no upsert). """
+        self._add({self.key: key_value}, {"$set": fields}, False, None)
+
+    def add_to_set(self, key_value, field, value):
+        """
+        $addToSet on an existing doc. Folded into the doc's upsert when that is
+        still buffered, since an unordered bulk may apply the two in any order.
+        """
+        with self._lock:
+            entry = self._upserts.get(key_value)
+            if entry is not None:
+                each = entry[1].setdefault("$addToSet", {}).setdefault(field, {"$each": []})["$each"]
+                if value not in each: each.append(value)
+                return
+        self._add({self.key: key_value}, {"$addToSet": {field: value}}, False, None)
+
+    def upsert_many(self, docs):
+        for doc in docs: self.upsert(doc)
+        return len(docs)
+
+    def _add(self, filter, update, upsert, doc):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            entry = [filter, update, upsert, doc]
+            self._buffer.append(entry)
+            if upsert:
+                self._upserts[filter[self.key]] = entry
+            self.stats.queued += 1
+            full = len(self._buffer) >= self.max_ops
+            self._start_timer()
+        if full:
+            self.flush()
+
+    def _start_timer(self):
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._tick, name="mongo-writer-flush", daemon=True)
+            self._timer.start()
+
+    def _tick(self):
+        while not self._closed.wait(self.max_delay / 2):
+            with self._lock:
+                due = self._buffer and time.monotonic() - self._oldest >= self.max_delay
+            if due:
+                self.flush()
+
+    # ---- flushing ----
+
+    def flush(self):
+        """ Sends everything buffered so far. Returns the number of docs written. """
+        with self._flush_lock:
+            with self._lock:
+                entries, self._buffer, self._upserts = self._buffer, [], {}
+            if not entries: return 0
+            token = uuid.uuid4().hex
+            for filter, update, upsert, doc in entries:
+                if upsert: update["$setOnInsert"][WRITE_TOKEN_FIELD] = token
+            batch = [(UpdateOne(filter, update, upsert=upsert), doc) for filter, update, upsert, doc in entries]
+            self.stats.flushes += 1
+            return self._write(batch, token)
+
+    def _write(self, batch, token=None):
+        written_docs, inserted_docs, failed_docs, attempt = [], [], [], 0
+        name = self.collection.name
+        maybe_applied = False
+        while batch:
+            started, outcome = time.perf_counter(), "ok"
+            try:
+                BULK_OPS.observe(len(batch), collection=name)
+                with span("mongo.bulk_write", "mongo", collection=name, ops=len(batch), attempt=attempt):
+                    result = self.collection.bulk_write([op for op, _ in batch], ordered=False)
+                inserted = self._inserted(batch, result.bulk_api_result)
+                # Upserts an interrupted attempt applied come back as matches
+                recovered = self._recover_inserted(batch, inserted, token) if maybe_applied else []
+                self._count(result.bulk_api_result, recovered=len(recovered))
+                inserted_docs.extend(inserted + recovered)
+                written_docs.extend(doc for _, doc in batch if doc is not None)
+                break
+            except BulkWriteError as e:
+                outcome = "partial"
+                details = e.details
+                failed = {err["index"]: err for err in details.get("writeErrors", [])}
+                inserted = self._inserted(batch, details)
+                applied = [entry for index, entry in enumerate(batch) if index not in failed]
+                recovered = self._recover_inserted(applied, inserted, token) if maybe_applied else []
+                self._count(details, recovered=len(recovered))
+                inserted_docs.extend(inserted + recovered)
+                retry = []
+                for index, (op, doc) in enumerate(batch):
+                    err = failed.get(index)
+                    if err is None:
+                        if doc is not None: written_docs.append(doc)
+                    elif err.get("code") == DUPLICATE_KEY:
+                        self.stats.duplicates += 1
+                        WRITER_DOCS.inc(collection=name, result="duplicate")
+                    elif err.get("code") in TRANSIENT_CODES:
+                        retry.append((op, doc))
+                    else:
+                        self.stats.failed += 1
+                        WRITER_DOCS.inc(collection=name, result="failed")
+                        if doc is not None: failed_docs.append(doc)
+                        print(f"      ⚠️ Mongo Write Error: {err.get('errmsg')}")
+                batch = retry
+            except TRANSIENT_ERRORS as e:
+                outcome = "transient"
+                maybe_applied = True
+                print(f"      ⚠️ Mongo Transient Error: {e}")
+            except Exception as e:
+                outcome = "error"
+                print(f"      ⚠️ Mongo Write Error: {e}")
+                self.stats.failed += len(batch)
+                WRITER_DOCS.inc(len(batch), collection=name, result="failed")
+                failed_docs.extend(doc for _, doc in batch if doc is not None)
+                break
+            finally:
+                BULK_SECONDS.observe(time.perf_counter() - started, collection=name, outcome=outcome)
+
+            if not batch: break
+            attempt += 1
+            if attempt > self.max_retries:
+                print(f"      ⚠️ Mongo Write: giving up on {len(batch)} ops after {self.max_retries} retries")
+                self.stats.failed += len(batch)
+                WRITER_DOCS.inc(len(batch), collection=name, result="failed")
+                failed_docs.extend(doc for _, doc in batch if doc is not None)
+                break
+            self.stats.retries += 1
+            WRITER_DOCS.inc(len(batch), collection=name, result="retried")
+            time.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+
+        # A failing callback must not lose the write result (or kill the timer thread)
+        for callback, docs in ((self.on_written, written_docs), (self.on_failed, failed_docs),
+                               (self.on_inserted, inserted_docs)):
+            if docs and callback:
+                try:
+                    callback(docs)
+                except Exception as e:
+                    print(f"      ⚠️ Mongo Writer Callback Error: {e}")
+        return len(written_docs)
+
+    @staticmethod
+    def _inserted(batch, result):
+        """ Docs whose upsert created a new document ('upserted' indexes refer to this batch). """
+        return [batch[u["index"]][1] for u in result.get("upserted", []) if batch[u["index"]][1] is not None]
+
+    def _recover_inserted(self, batch, inserted, token):
+        """ Docs of matched upserts that carry this flush's token: inserted by an attempt that raised. """
+        inserted_ids = {id(doc) for doc in inserted}
+        matched = {doc[self.key]: doc for _, doc in batch if doc is not None and id(doc) not in inserted_ids}
+        if not matched or token is None: return []
+        try:
+            cursor = self.collection.find({self.key: {"$in": list(matched)}, WRITE_TOKEN_FIELD: token},
+                                          {self.key: 1, "_id": 0})
+            return [matched[d[self.key]] for d in cursor if d.get(self.key) in matched]
+        except Exception as e:
+            print(f"      ⚠️ Mongo Insert Recovery Error: {e}")
+            return []
+
+    def _count(self, result, recovered=0):
+        # 'recovered' inserts were matched (unchanged) on the retry
+        upserted = result.get("nUpserted", 0) + recovered
+        modified = result.get("nModified", 0)
+        self.stats.written += upserted + modified
+        self.stats.unchanged += result.get("nMatched", 0) - modified - recovered
+        name = self.collection.name
+        WRITER_DOCS.inc(upserted, collection=name, result="inserted")
+        WRITER_DOCS.inc(modified, collection=name, result="modified")
+        WRITER_DOCS.inc(result.get("nMatched", 0) - modified - recovered, collection=name, result="unchanged")
+
+    def close(self):
+        """ Flushes what is left and stops the timer thread. """
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self._closed.clear()
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
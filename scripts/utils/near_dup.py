@@ -0,0 +1,262 @@
+import re
+import random
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.profiling import span
+
+# MinHash LSH: 60 permutations in 10 bands of 6 rows. Pairs with Jaccard
+# similarity >= ~0.8 share at least one band with probability > 0.95, pairs
+# below ~0.3 almost never do; candidates are then checked on the full signature
+NUM_PERM = 60
+BANDS = 10
+ROWS = NUM_PERM // BANDS
+MIN_SIMILARITY = 0.7
+MIN_TOKENS = 6                  # too little text to call two posts the same story
+MAX_TOKENS = 256                # the lead of a story is what syndicated copies share
+
+# Universal hashes (a * x + b) mod p over 32-bit shingle hashes. Fixed seed:
+# signatures are stored in 'posts' and must stay comparable across runs
+_PRIME = 4294967311
+_rng = random.Random(20240601)
+_A = [_rng.randrange(1, 1 << 31) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, 1 << 32) for _ in range(NUM_PERM)]
+if np is not None:
+    _A_NP = np.array(_A, dtype=np.uint64)[:, None]
+    _B_NP = np.array(_B, dtype=np.uint64)[:, None]
+
+URL_RE = re.compile(r"https?://\S+")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Sources whose title and content are both templates around an id or the
+# search query ("YouTube Video: {vid}" / "Video discussion on {q}"): two such
+# posts look alike whatever they are about, so they are never collapsed
+TEMPLATED_SOURCES = {"youtube"}
+# Fixed bodies (scraper / archive placeholders) that would make any two posts
+# of a source look alike; only the title of such posts is compared
+BOILERPLATE_RE = re.compile(r"^(scraped via \w+ from \w+|archived content from \d{4}|medium article: .*)$", re.I)
+
+def normalize_tokens(text):
+    """ Lowercase word tokens without URLs / punctuation (syndication noise). """
+    return TOKEN_RE.findall(URL_RE.sub(" ", (text or "").lower()))
+
+def _hash32(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), "big")
+
+def minhash(text):
+    """ MinHash signature over word unigram + bigram shingles; None if the text is too short. """
+    tokens = normalize_tokens(text)[:MAX_TOKENS]
+    if len(tokens) < MIN_TOKENS: return None
+    shingles = {_hash32(t) for t in tokens} | {_hash32(f"{a} {b}") for a, b in zip(tokens, tokens[1:])}
+    if np is not None:
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))[None, :]
+        return ((_A_NP * values + _B_NP) % _PRIME).min(axis=1).tolist()
+    return [min((a * x + b) % _PRIME for x in shingles) for a, b in zip(_A, _B)]
+
+def signature_text(doc):
+    """ The part of a post that tells it apart from other posts, or None if nothing does. """
+    if (doc.get("source") or "").strip().lower() in TEMPLATED_SOURCES: return None
+    title = doc.get("title") or ""
+    content = (doc.get("content") or "").strip()
+    if BOILERPLATE_RE.match(content) or content == title.strip():
+        content = ""
+    return f"{title} {content}"
+
+def bands(signature):
+    """ One int64 LSH key per band (band number mixed in, so bands never collide). """
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f">B{ROWS}Q", band, *rows), digest_size=8).digest()
+        keys.append(struct.unpack(">q", digest)[0])
+    return keys
+
+def similarity(a, b):
+    """ Estimated Jaccard similarity of two signatures. """
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+def source_entry(doc):
+    return {"source": doc.get("source"), "reddit_id": doc.get("reddit_id"), "url": doc.get("url")}
+
+class _Canonical:
+    __slots__ = ("reddit_id", "signature", "keys", "doc", "held", "saved", "loaded")
+
+    def __init__(self, reddit_id, signature, doc=None, saved=False, loaded=False):
+        self.reddit_id = reddit_id
+        self.signature = signature
+        self.keys = bands(signature)
+        self.doc = doc           # in flight: duplicates go on doc['sources']
+        self.held = None         # being written: duplicates wait here
+        self.saved = saved       # queued / stored: duplicates go through add_to_set
+        self.loaded = loaded     # read back from 'posts', so known to exist
+
+class NearDuplicateIndex:
+    """
+    Cross-source near-duplicate collapse ahead of inference.
+
+    Every new candidate gets a MinHash signature of its normalized title +
+    content. Candidates are looked up by LSH band, in this run's index and in
+    'posts' (minhash_bands, one $in query per page); at MIN_SIMILARITY or above
+    they are not classified or stored on their own - they are added to the
+    canonical post's 'sources' list and share its analysis.
+
+    A canonical that is still in flight (fetched this run, not yet written)
+    collects its duplicates on the doc itself; one already stored gets an
+    $addToSet through the writer. One that inference rejects, whose queueing
+    raises, or that the writer later gives up on (release() as its on_failed
+    hook) is released, so later copies are classified on their own.
+    Posts of TEMPLATED_SOURCES are never collapsed.
+    """
+    def __init__(self, collection, add_to_set=None, max_entries=200_000):
+        self.collection = collection
+        self.add_to_set = add_to_set
+        self.max_entries = max_entries
+        self.by_band = {}          # band key -> [_Canonical]
+        self.by_id = OrderedDict() # reddit_id -> _Canonical, oldest first
+        self.collapsed = 0
+        self._lock = threading.Lock()
+
+    def _candidates(self, keys):
+        seen = {}
+        for key in keys:
+            for canonical in self.by_band.get(key, []):
+                seen[canonical.reddit_id] = canonical
+        return seen.values()
+
+    def _add(self, canonical):
+        self.by_id[canonical.reddit_id] = canonical
+        for key in canonical.keys:
+            self.by_band.setdefault(key, []).append(canonical)
+        # Bounded for long-lived processes; stored canonicals can be re-read from 'posts'
+        while len(self.by_id) > self.max_entries:
+            _, oldest = self.by_id.popitem(last=False)
+            self._unband(oldest)
+
+    def _unband(self, canonical):
+        for key in canonical.keys:
+            entries = self.by_band.get(key, [])
+            if canonical in entries: entries.remove(canonical)
+            if not entries: self.by_band.pop(key, None)
+
+    def _lookup_stored(self, page_keys):
+        """ Loads stored canonicals sharing a band with any page candidate. """
+        if not page_keys: return
+        try:
+            with span("mongo.find_bands", "mongo", bands=len(page_keys)):
+                cursor = self.collection.find(
+                    {"minhash_bands": {"$in": list(page_keys)}, "analysis": {"$exists": True}},
+                    {"reddit_id": 1, "minhash": 1, "_id": 0}
+                )
+                stored = [(d["reddit_id"], d["minhash"]) for d in cursor if d.get("minhash")]
+        except Exception as e:
+            # DB unavailable -> only in-run duplicates are collapsed
+            print(f"      ⚠️ Near-dup Lookup Error: {e}")
+            return
+        with self._lock:
+            for reddit_id, signature in stored:
+                if reddit_id not in self.by_id:
+                    self._add(_Canonical(reddit_id, signature, saved=True, loaded=True))
+
+    def split(self, page):
+        """
+        Returns the (doc, text) candidates that still need inference; near
+        duplicates are folded into their canonical post. Docs that pass get
+        'minhash' / 'minhash_bands' fields and become canonicals themselves.
+        """
+        hashed = []
+        for doc, text in page:
+            body = signature_text(doc)
+            signature = minhash(body) if body else None
+            hashed.append((doc, text, signature, bands(signature) if signature else None))
+        self._lookup_stored({key for _, _, _, keys in hashed if keys for key in keys})
+
+        kept, stored_dups = [], []
+        with self._lock:
+            for doc, text, signature, keys in hashed:
+                if signature is None:
+                    kept.append((doc, text))
+                    continue
+                match = None
+                for canonical in self._candidates(keys):
+                    if canonical.reddit_id != doc["reddit_id"] and similarity(canonical.signature, signature) >= MIN_SIMILARITY:
+                        match = canonical
+                        break
+                if match is None:
+                    doc["minhash"] = signature
+                    doc["minhash_bands"] = keys
+                    doc.setdefault("sources", [source_entry(doc)])
+                    self._add(_Canonical(doc["reddit_id"], signature, doc=doc))
+                    kept.append((doc, text))
+                    continue
+
+                self.collapsed += 1
+                entry = source_entry(doc)
+                if match.saved:
+                    stored_dups.append((match.reddit_id, entry))
+                elif match.held is not None:
+                    if entry not in match.held: match.held.append(entry)
+                elif entry not in match.doc["sources"]:
+                    match.doc["sources"].append(entry)
+
+        if self.add_to_set:
+            for reddit_id, entry in stored_dups:
+                self.add_to_set(reddit_id, "sources", entry)
+        return kept
+
+    def seal(self, docs, write):
+        """
+        Hands in-flight canonicals to 'write' (outside the lock) and marks
+        them stored. Duplicates found while the write runs are held and sent
+        as $addToSet once the doc is queued, so they never reach the writer
+        ahead of the doc itself. A write that raises releases the docs.
+        """
+        with self._lock:
+            sealing = []
+            for doc in docs:
+                canonical = self.by_id.get(doc.get("reddit_id"))
+                if canonical is not None and canonical.doc is doc:
+                    canonical.doc, canonical.held = None, []
+                    sealing.append(canonical)
+        try:
+            result = write(docs)
+        except Exception:
+            with self._lock:
+                self._release(sealing)
+            raise
+
+        held = []
+        with self._lock:
+            for canonical in sealing:
+                held.extend((canonical.reddit_id, entry) for entry in canonical.held)
+                canonical.held, canonical.saved = None, True
+        if self.add_to_set:
+            for reddit_id, entry in held:
+                self.add_to_set(reddit_id, "sources", entry)
+        return result
+
+    def release(self, docs):
+        """
+        Drops this run's canonicals that will not be stored (rejected by
+        inference, or given up on by the writer after they were sealed), so
+        later copies are not folded into a post that doesn't exist.
+        """
+        with self._lock:
+            stale = []
+            for doc in docs:
+                canonical = self.by_id.get(doc.get("reddit_id"))
+                if canonical is None or canonical.loaded: continue
+                if canonical.doc is doc or canonical.doc is None:
+                    stale.append(canonical)
+            self._release(stale)
+
+    def _release(self, canonicals):
+        for canonical in canonicals:
+            if self.by_id.get(canonical.reddit_id) is canonical:
+                del self.by_id[canonical.reddit_id]
+                self._unband(canonical)
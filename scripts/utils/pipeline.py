@@ -0,0 +1,348 @@
+import os
+import time
+import queue
+import random
+import threading
+
+from utils.metrics import REGISTRY, bind_source
+from utils.profiling import span
+
+ITEMS_FETCHED = REGISTRY.counter("fin_items_fetched", "Candidate posts fetched", ["source"])
+ITEMS_CLASSIFIED = REGISTRY.counter("fin_items_classified", "Candidates sent to the model (after dedup)", ["source"])
+ITEMS_REJECTED = REGISTRY.counter("fin_items_rejected", "Candidates classified as not relevant (pre-filter or gatekeeper)", ["source"])
+ITEMS_UPSERTED = REGISTRY.counter("fin_items_upserted", "Relevant posts handed to the writer", ["source"])
+
+_DONE = object()
+_local = threading.local()
+
+def defer(commit, *args):
+    """
+    Called by a source inside a pipeline fetch thread: commit(*args) (a cursor
+    or HTTP validator update) runs only once every page the source yielded
+    before the call is saved. Outside a pipeline it is dropped, so nothing is
+    marked as seen that was never stored.
+    """
+    state = getattr(_local, "source", None)
+    if state is not None:
+        with state.lock:
+            state.commits.append((state.yielded, commit, args))
+
+class _SourceState:
+    """ Page accounting of one source: pages 1..watermark are saved (or had nothing to save). """
+    def __init__(self, lock):
+        self.lock = lock
+        self.yielded = 0
+        self.watermark = 0
+        self.done = set()
+        self.commits = []        # [(pages yielded before the defer, commit, args)], in defer order
+
+    def finish(self, seq):
+        with self.lock:
+            self.done.add(seq)
+            while self.watermark + 1 in self.done:
+                self.watermark += 1
+                self.done.discard(self.watermark)
+
+    def ready(self):
+        """ Pops the commits whose pages are all saved (a prefix: defer order follows the pages). """
+        with self.lock:
+            count = 0
+            while count < len(self.commits) and self.commits[count][0] <= self.watermark:
+                count += 1
+            ready, self.commits = self.commits[:count], self.commits[count:]
+        return ready
+
+class StageStats:
+    """
+    Per-stage counters: items in/out, busy seconds and time blocked on queues,
+    plus a uniform reservoir of per-call busy times (one call = one page for
+    fetch / write, one merged batch for inference) for latency percentiles.
+    """
+    SAMPLES = 4096
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.calls = 0
+        self.samples = []
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+
+    def record(self, items_in, items_out, busy, blocked=0.0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy += busy
+            self.blocked += blocked
+            self.calls += 1
+            if len(self.samples) < self.SAMPLES:
+                self.samples.append(busy)
+            else:
+                slot = self._rng.randrange(self.calls)
+                if slot < self.SAMPLES: self.samples[slot] = busy
+
+    def percentile(self, q):
+        """ Busy seconds of one call at quantile q (0..1), nearest rank. """
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered: return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self, elapsed):
+        rate = self.items_out / self.busy if self.busy else 0.0
+        return (f"{self.name:<9} in={self.items_in:<6} out={self.items_out:<6} "
+                f"busy={self.busy:6.1f}s blocked={self.blocked:6.1f}s "
+                f"p50={self.percentile(0.5) * 1000:.0f}ms p99={self.percentile(0.99) * 1000:.0f}ms "
+                f"({rate:.1f} items/busy-s, {self.items_out / elapsed if elapsed else 0:.1f} items/s wall)")
+
+class IngestPipeline:
+    """
+    Staged ingest: fetch workers -> bounded queue -> inference workers (batched)
+    -> bounded queue -> writer.
+
+    - sources:  {name: callable returning an iterator of pages}, a page being a
+                list of (doc, text) candidates without 'analysis'
+    - classify: callable(texts) -> analyses (AgriAIClient.analyze_batch shape)
+    - write:    callable(source, docs) -> number of docs saved
+    - prefilter (optional): callable(source, page) -> (new_page, known_docs),
+                run in the fetch stage so known posts never reach inference
+    - refresh (optional):   callable(source, known_docs), run by the writer
+                for posts that were filtered out (e.g. metrics-only updates)
+    - reject (optional):    callable(source, docs), run by the inference stage
+                with the docs it rejected (or could not classify)
+
+    - checkpoint (optional): callable() -> bool, makes the pages handed to
+                'write' so far durable (e.g. flushes the writer); False if
+                posts were lost. With it, the writer thread applies deferred
+                commits during the run (at most every commit_interval seconds,
+                FIN_COMMIT_SECS), so an interrupted run keeps the progress of
+                the slices it finished.
+
+    Sources defer() their cursor / validator updates; a commit is applied
+    once every page its source yielded before it went through without errors,
+    during the run (with 'checkpoint') or by commit() afterwards.
+
+    Bounded queues give backpressure: fetchers block while inference is behind,
+    inference blocks while the writer is behind.
+    """
+    def __init__(self, classify, write, prefilter=None, refresh=None, reject=None, checkpoint=None,
+                 inference_workers=1, batch_size=64, queue_size=32, commit_interval=None):
+        self.classify = classify
+        self.write = write
+        self.prefilter = prefilter
+        self.refresh = refresh
+        self.reject = reject
+        self.checkpoint = checkpoint
+        self.commit_interval = float(os.getenv('FIN_COMMIT_SECS', '30')) if commit_interval is None else commit_interval
+        self.inference_workers = inference_workers
+        self.batch_size = batch_size
+        self.candidates = queue.Queue(maxsize=queue_size)
+        self.accepted = queue.Queue(maxsize=queue_size)
+        self.stats = {name: StageStats(name) for name in ("fetch", "inference", "write")}
+        self.saved = {}
+        self.sources = {}        # source -> _SourceState
+        self.failed = set()      # sources with a fetch / inference / write error
+        self._lock = threading.Lock()
+        self._last_commit = time.monotonic()
+
+    def run(self, sources):
+        started = time.time()
+        fetchers = [threading.Thread(target=self._fetch, args=(name, source), name=f"fetch-{name}", daemon=True)
+                    for name, source in sources.items()]
+        inferers = [threading.Thread(target=self._infer, name=f"inference-{i}", daemon=True)
+                    for i in range(self.inference_workers)]
+        writer = threading.Thread(target=self._write, name="writer", daemon=True)
+
+        for t in fetchers + inferers + [writer]: t.start()
+
+        for t in fetchers: t.join()
+        for _ in inferers: self.candidates.put(_DONE)
+        for t in inferers: t.join()
+        self.accepted.put(_DONE)
+        writer.join()
+
+        self.elapsed = time.time() - started
+        return self.saved
+
+    def commit(self, final=True):
+        """
+        Applies the deferred commits whose pages are all saved. The final call
+        (after the run) drops the rest. Returns the number applied.
+        """
+        applied = 0
+        for name, state in list(self.sources.items()):
+            for _, commit, args in state.ready():
+                try:
+                    commit(*args)
+                    applied += 1
+                except Exception as e:
+                    print(f"      ⚠️ {name} commit failed: {e}")
+            if final and state.commits:
+                print(f"      ⚠️ {name}: errors during the run, {len(state.commits)} cursor update(s) left unchanged")
+                state.commits = []
+        return applied
+
+    def _maybe_commit(self):
+        """ Mid-run commit point (writer thread, so no page is being written meanwhile). """
+        if self.checkpoint is None or time.monotonic() - self._last_commit < self.commit_interval: return
+        self._last_commit = time.monotonic()
+        with self._lock:
+            states = list(self.sources.values())
+        if not any(s.commits and s.commits[0][0] <= s.watermark for s in states): return
+        try:
+            durable = self.checkpoint()
+        except Exception as e:
+            print(f"      ⚠️ Checkpoint failed: {e}")
+            return
+        if durable:
+            self.commit(final=False)
+
+    def _fail(self, *names):
+        with self._lock:
+            self.failed.update(names)
+
+    def report(self):
+        print(f"   📊 Pipeline stages ({self.elapsed:.1f}s):")
+        for stats in self.stats.values():
+            print(f"      {stats.summary(self.elapsed)}")
+
+    # ---- stages ----
+
+    def _finish(self, name, seq):
+        self.sources[name].finish(seq)
+
+    def _fetch(self, name, source):
+        stats = self.stats["fetch"]
+        bind_source(name)
+        with self._lock:
+            state = self.sources[name] = _SourceState(threading.Lock())
+        _local.source = state
+        try:
+            pages = iter(source())
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    with span("fetch.page", "fetch", source=name) as trace:
+                        page = next(pages)
+                except StopIteration:
+                    break
+                page = page or []
+                with state.lock:
+                    state.yielded += 1
+                    seq = state.yielded
+                trace.set(items=len(page))
+                size = len(page)
+                ITEMS_FETCHED.inc(size, source=name)
+                if page and self.prefilter:
+                    with span("fetch.dedup", "fetch", source=name, items=size):
+                        page, known = self.prefilter(name, page)
+                    if known and self.refresh:
+                        self.accepted.put((name, known, True, None))
+                fetched = time.perf_counter()
+                if page:
+                    self.candidates.put((name, page, seq))
+                else:
+                    state.finish(seq)
+                stats.record(size, len(page), fetched - t0, time.perf_counter() - fetched)
+        except Exception as e:
+            print(f"      ⚠️ {name} fetch failed: {e}")
+            self._fail(name)
+        finally:
+            _local.source = None
+
+    def _infer(self):
+        stats = self.stats["inference"]
+        done = False
+        while not done:
+            t0 = time.perf_counter()
+            pages = [self.candidates.get()]
+            if pages[0] is _DONE: break
+
+            # Merge queued pages (any source) into one batch
+            size = len(pages[0][1])
+            while size < self.batch_size:
+                try:
+                    item = self.candidates.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                pages.append(item)
+                size += len(item[1])
+            waited = time.perf_counter() - t0
+
+            texts = [text for _, page, _ in pages for _, text in page]
+            failed = False
+            try:
+                with span("inference.batch", "inference", texts=len(texts), pages=len(pages)):
+                    analyses = self.classify(texts)
+            except Exception as e:
+                failed = True
+                print(f"      ⚠️ Inference Error: {e}")
+                self._fail(*(name for name, _, _ in pages))
+                analyses = [None] * len(texts)
+            busy = time.perf_counter() - t0 - waited
+
+            offset, accepted = 0, 0
+            for name, page, seq in pages:
+                docs, rejected = [], []
+                for (doc, _), analysis in zip(page, analyses[offset:offset + len(page)]):
+                    if analysis and analysis['is_relevant']:
+                        doc["analysis"] = analysis
+                        docs.append(doc)
+                    else:
+                        rejected.append(doc)
+                offset += len(page)
+                ITEMS_CLASSIFIED.inc(len(page), source=name)
+                ITEMS_REJECTED.inc(len(rejected), source=name)
+                if rejected and self.reject:
+                    try:
+                        self.reject(name, rejected)
+                    except Exception as e:
+                        print(f"      ⚠️ {name} reject failed: {e}")
+                if docs:
+                    accepted += len(docs)
+                    self.accepted.put((name, docs, False, seq))
+                elif not failed:
+                    # Every candidate rejected: nothing to save
+                    self._finish(name, seq)
+            stats.record(len(texts), accepted, busy, waited)
+
+    def _write(self):
+        stats = self.stats["write"]
+        while True:
+            t0 = time.perf_counter()
+            try:
+                # Idle writers still commit slices whose last page had nothing to save
+                item = self.accepted.get(timeout=1.0 if self.checkpoint else None)
+            except queue.Empty:
+                self._maybe_commit()
+                continue
+            if item is _DONE: break
+            name, docs, is_refresh, seq = item
+            waited = time.perf_counter() - t0
+            if is_refresh:
+                try:
+                    with span("write.refresh", "write", source=name, docs=len(docs)):
+                        self.refresh(name, docs)
+                except Exception as e:
+                    print(f"      ⚠️ {name} refresh failed: {e}")
+                stats.record(0, 0, time.perf_counter() - t0 - waited, waited)
+                self._maybe_commit()
+                continue
+            try:
+                with span("write.page", "write", source=name, docs=len(docs)):
+                    saved = self.write(name, docs) or 0
+                self._finish(name, seq)
+            except Exception as e:
+                print(f"      ⚠️ {name} write failed: {e}")
+                self._fail(name)
+                saved = 0
+            self.saved[name] = self.saved.get(name, 0) + saved
+            ITEMS_UPSERTED.inc(saved, source=name)
+            stats.record(len(docs), saved, time.perf_counter() - t0 - waited, waited)
+            self._maybe_commit()
@@ -0,0 +1,62 @@
+import threading
+
+from pymongo import UpdateOne
+
+COUNTS_COLLECTION = "post_counts"
+
+def count_key(source_lc, sentiment):
+    return f"{source_lc}|{sentiment}"
+
+class PostCounter:
+    """
+    Per-filter post totals for the feed, maintained at ingest.
+
+    One small doc per (source_lc, sentiment_class) pair in 'post_counts';
+    the feed route sums the pairs matching its filter instead of running
+    countDocuments over 'posts'. Only inserts are counted (metric refreshes
+    and re-analysis don't change totals); rebuild() recomputes from scratch.
+    """
+    def __init__(self, db):
+        self.collection = db[COUNTS_COLLECTION]
+        self.posts = db['posts']
+        self._lock = threading.Lock()
+
+    def increment(self, docs):
+        """ Adds freshly inserted posts to their (source, sentiment) counters. """
+        deltas = {}
+        for doc in docs:
+            pair = (doc.get("source_lc", ""), (doc.get("analysis") or {}).get("sentiment_class"))
+            deltas[pair] = deltas.get(pair, 0) + 1
+        if not deltas: return 0
+        ops = [UpdateOne(
+            {"_id": count_key(source, sentiment)},
+            {"$inc": {"count": n}, "$setOnInsert": {"source_lc": source, "sentiment_class": sentiment}},
+            upsert=True
+        ) for (source, sentiment), n in deltas.items()]
+        with self._lock:
+            self.collection.bulk_write(ops, ordered=False)
+        return len(docs)
+
+    def rebuild(self):
+        """ Recomputes every counter from 'posts'. Returns the number of pairs. """
+        groups = self.posts.aggregate([
+            {"$group": {
+                "_id": {"source_lc": "$source_lc", "sentiment_class": "$analysis.sentiment_class"},
+                "count": {"$sum": 1}
+            }}
+        ], allowDiskUse=True)
+        ops, keys = [], []
+        for g in groups:
+            source, sentiment = g["_id"].get("source_lc"), g["_id"].get("sentiment_class")
+            keys.append(count_key(source, sentiment))
+            ops.append(UpdateOne(
+                {"_id": keys[-1]},
+                {"$set": {"count": g["count"], "source_lc": source, "sentiment_class": sentiment}},
+                upsert=True
+            ))
+        with self._lock:
+            if ops: self.collection.bulk_write(ops, ordered=False)
+            # Pairs that no longer exist in 'posts'
+            self.collection.delete_many({"_id": {"$nin": keys}})
+        print(f"      🔢 Rebuilt {len(ops)} post counters")
+        return len(ops)
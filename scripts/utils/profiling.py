@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from datetime import datetime
+
+# ==========================================
+# SPANS (Chrome trace)
+# ==========================================
+
+class Tracer:
+    """
+    Collects complete spans (name, category, start, end, thread, args) and
+    exports them as Chrome trace JSON, which chrome://tracing and
+    ui.perfetto.dev open as a per-thread timeline.
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.threads = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, cat, start, end, args):
+        thread = threading.current_thread()
+        with self._lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append((name, cat, start, end, thread.ident, args))
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        with self._lock:
+            events, threads = list(self.events), dict(self.threads)
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items()]
+        for name, cat, start, end, tid, args in events:
+            trace.append({
+                "name": name, "cat": cat or "default", "ph": "X", "pid": pid, "tid": tid,
+                "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                "args": args,
+            })
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def summary(self):
+        """ Per span name: count, total / mean / p50 / p99 / max milliseconds (sorted by name, diffable). """
+        durations = {}
+        with self._lock:
+            for name, _, start, end, _, _ in self.events:
+                durations.setdefault(name, []).append((end - start) * 1000)
+        summary = {}
+        for name in sorted(durations):
+            values = sorted(durations[name])
+            summary[name] = {
+                "count": len(values),
+                "total_ms": round(sum(values), 2),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(values[len(values) // 2], 3),
+                "p99_ms": round(values[min(len(values) - 1, int(0.99 * len(values)))], 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return summary
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter(), self.args)
+        return False
+
+class _NoSpan:
+    """ What span() returns while profiling is off: no clock reads, no allocation. """
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+_tracer = None
+
+def span(name, cat="", **args):
+    """ Times the enclosed block as one trace span while a profile run is active. """
+    tracer = _tracer
+    if tracer is None: return _NO_SPAN
+    return _Span(tracer, name, cat, args)
+
+def profiling():
+    return _tracer is not None
+
+# ==========================================
+# STATISTICAL STAGE PROFILE
+# ==========================================
+
+def stage_of(thread_name):
+    """ Pipeline stage of a thread, from IngestPipeline / BulkWriter thread names. """
+    if thread_name.startswith("fetch-"): return "fetch"
+    if thread_name.startswith("inference-"): return "inference"
+    if thread_name in ("writer", "mongo-writer-flush"): return "write"
+    if thread_name == "MainThread": return "main"
+    return "other"
+
+class StackSampler:
+    """
+    Sampling profiler: every 'interval' seconds it snapshots the Python stack
+    of every thread (sys._current_frames) and counts it under the thread's
+    stage. Samples whose innermost frame is in threading / queue (a stage
+    waiting on its queue or a lock) are counted as idle, not as stacks, so
+    the folded output is time spent computing or in I/O.
+    Output is one collapsed-stack file per stage (speedscope / flamegraph.pl).
+    """
+    IDLE_FILES = ("threading.py", "queue.py")
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = {}            # stage -> Counter(folded stack)
+        self.idle = Counter()       # stage -> idle samples
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me: continue
+                stage = stage_of(names.get(tid, ""))
+                if os.path.basename(frame.f_code.co_filename) in self.IDLE_FILES:
+                    self.idle[stage] += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+
+    def write(self, directory):
+        """ Writes profile-<stage>.folded files; returns {stage: (busy samples, idle samples)}. """
+        totals = {}
+        for stage, stacks in self.stacks.items():
+            with open(os.path.join(directory, f"profile-{stage}.folded"), "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            totals[stage] = (sum(stacks.values()), self.idle.get(stage, 0))
+        for stage, idle in self.idle.items():
+            totals.setdefault(stage, (0, idle))
+        return totals
+
+# ==========================================
+# PER-RUN ARTIFACT
+# ==========================================
+
+class ProfileRun:
+    """
+    One profiled run, written to DIR/run-YYYYmmdd-HHMMSS/:
+    - trace.json:   Chrome trace of every span (open in ui.perfetto.dev)
+    - summary.json: per-span count / total / p50 / p99 (diff two releases
+                    with profile_startup.py --diff A B)
+    - profile-<stage>.folded: sampled stacks per stage (sample=True)
+    """
+    def __init__(self, directory, sample=False, interval=0.005, label=None):
+        self.directory = os.path.join(directory, datetime.now().strftime("run-%Y%m%d-%H%M%S"))
+        self.sampler = StackSampler(interval) if sample else None
+        self.label = label
+        self.tracer = None
+
+    def start(self):
+        global _tracer
+        self.tracer = _tracer = Tracer()
+        self.started = time.time()
+        if self.sampler: self.sampler.start()
+        return self
+
+    def finish(self, **meta):
+        global _tracer
+        _tracer = None
+        if self.sampler: self.sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "trace.json"), "w", encoding="utf-8") as f:
+            json.dump(self.tracer.chrome_trace(), f)
+
+        summary = {
+            "label": self.label,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "wall_s": round(time.time() - self.started, 3),
+            "meta": meta,
+            "spans": self.tracer.summary(),
+        }
+        if self.sampler:
+            summary["samples"] = {stage: {"busy": busy, "idle": idle}
+                                  for stage, (busy, idle) in sorted(self.sampler.write(self.directory).items())}
+        with open(os.path.join(self.directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+        print(f"   🔬 Profile written to {self.directory} (trace.json, summary.json"
+              f"{', profile-<stage>.folded' if self.sampler else ''})")
+        return self.directory
+
+def start_profile(directory=None, sample=None, label=None):
+    """ Starts a ProfileRun if a directory is given or FIN_PROFILE_DIR is set (FIN_PROFILE_SAMPLE=1 adds stack sampling). """
+    directory = directory or os.getenv('FIN_PROFILE_DIR')
+    if not directory: return None
+    if sample is None:
+        sample = os.getenv('FIN_PROFILE_SAMPLE', '0') != '0'
+    return ProfileRun(directory, sample=sample, label=label).start()
+
+def diff_summaries(old, new, top=25):
+    """ Rows (name, old total ms, new total ms, change) for spans in either summary, biggest change first. """
+    rows = []
+    for name in set(old["spans"]) | set(new["spans"]):
+        a = old["spans"].get(name, {}).get("total_ms", 0.0)
+        b = new["spans"].get(name, {}).get("total_ms", 0.0)
+        rows.append((name, a, b, (b - a) / a if a else None))
+    rows.sort(key=lambda r: (-abs(r[2] - r[1]), r[0]))
+    return rows[:top]
@@ -0,0 +1,229 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+
+from utils.inference_cache import CACHE_DIR
+from utils.fetch_engine import thread_requests, set_request_allowance
+
+# Gamma(PRIOR_POSTS, PRIOR_REQUESTS) prior on new posts per request: mean 2,
+# wide enough that never-tried queries get sampled high and are explored
+PRIOR_POSTS = 1.0
+PRIOR_REQUESTS = 0.5
+# Old evidence is multiplied by DISCOUNT on every update of a source, so
+# yield estimates follow queries that go quiet or heat up
+DISCOUNT = 0.8
+
+class YieldStore:
+    """
+    Persistent (discounted) yield statistics:
+    - arms:    per (source, query) new posts / requests
+    - sources: per source new posts / requests / query groups, polling interval, next due time
+    """
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'scheduler.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS arms ("
+            " source TEXT, query TEXT, posts REAL, requests REAL, pulls INTEGER, updated REAL,"
+            " PRIMARY KEY (source, query))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            " source TEXT PRIMARY KEY, posts REAL, requests REAL, groups REAL,"
+            " interval REAL, next_due REAL, updated REAL)"
+        )
+        self.conn.commit()
+
+    def arms(self, source):
+        """ {query: (posts, requests)} for one source. """
+        with self._lock:
+            rows = self.conn.execute("SELECT query, posts, requests FROM arms WHERE source=?", (source,)).fetchall()
+        return {query: (posts, requests) for query, posts, requests in rows}
+
+    def source(self, source):
+        """ (posts, requests, groups, interval, next_due); None if never polled. """
+        with self._lock:
+            return self.conn.execute(
+                "SELECT posts, requests, groups, interval, next_due FROM sources WHERE source=?", (source,)
+            ).fetchone()
+
+    def update(self, source, arm_deltas, posts, requests, groups, interval, next_due):
+        """ Discounts a source's evidence, then adds one run's deltas ({query: (posts, requests)}). """
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE arms SET posts=posts*?, requests=requests*? WHERE source=?",
+                              (DISCOUNT, DISCOUNT, source))
+            for query, (p, r) in arm_deltas.items():
+                self.conn.execute(
+                    "INSERT INTO arms (source, query, posts, requests, pulls, updated) VALUES (?, ?, ?, ?, 1, ?)"
+                    " ON CONFLICT(source, query) DO UPDATE SET posts=posts+excluded.posts,"
+                    " requests=requests+excluded.requests, pulls=pulls+1, updated=excluded.updated",
+                    (source, query, p, r, now)
+                )
+            old = self.conn.execute("SELECT posts, requests, groups FROM sources WHERE source=?", (source,)).fetchone()
+            old_posts, old_requests, old_groups = old or (0.0, 0.0, 0.0)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources (source, posts, requests, groups, interval, next_due, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, old_posts * DISCOUNT + posts, old_requests * DISCOUNT + requests,
+                 old_groups * DISCOUNT + groups, interval, next_due, now)
+            )
+            self.conn.commit()
+
+class QueryScheduler:
+    """
+    Adaptive polling over the steerable sources (QUERY_SOURCES).
+
+    Yield = new posts inserted per HTTP request. Every cycle:
+    1. due():  sources whose polling interval has elapsed
+    2. plan(): splits the global request budget across due sources in
+               proportion to a Thompson sample of each source's yield (one
+               request each first; with fewer requests than due sources the
+               lowest samples wait for the next cycle), then picks that many
+               query groups per source by Thompson sampling over its queries
+               (Gamma-Poisson posterior per query, discounted evidence)
+    3. source(): wraps an iter_* so it runs only the planned groups, charges
+               every HTTP request to the source's allowance (http_get refuses
+               once it is spent, even mid-paging) and remembers which group
+               produced which post
+    4. update(): credits inserted posts back to their groups and moves each
+               source's interval: halved while yield >= high, x1.5 below low
+    """
+    def __init__(self, sources, budget=None, store=None, base_interval=None,
+                 min_interval=None, max_interval=None, low=None, high=None, rng=None):
+        self.sources = sources   # name -> (iterate, queries, group_size)
+        self.budget = budget or int(os.getenv('FIN_SCHED_BUDGET', '60'))
+        self.store = store or YieldStore()
+        self.base_interval = base_interval or float(os.getenv('FIN_SCHED_INTERVAL', '900'))
+        self.min_interval = min_interval or float(os.getenv('FIN_SCHED_MIN_INTERVAL', '300'))
+        self.max_interval = max_interval or float(os.getenv('FIN_SCHED_MAX_INTERVAL', '21600'))
+        self.low = low if low is not None else float(os.getenv('FIN_SCHED_LOW_YIELD', '0.5'))
+        self.high = high if high is not None else float(os.getenv('FIN_SCHED_HIGH_YIELD', '5'))
+        self.rng = rng or random.Random()
+        self.origin = {}      # reddit_id -> (source, group)
+        self.pulled = {}      # (source, group) -> requests
+        self.inserted = {}    # (source, group) -> new posts
+        self.planned = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sample(rng, posts, requests):
+        return rng.gammavariate(PRIOR_POSTS + posts, 1.0 / (PRIOR_REQUESTS + requests))
+
+    def due(self, now=None):
+        now = now or time.time()
+        due = []
+        for name in self.sources:
+            state = self.store.source(name)
+            if state is None or state[4] <= now:
+                due.append(name)
+        return due
+
+    def next_due(self):
+        """ Earliest time any source is due again. """
+        times = [(self.store.source(name) or (0, 0, 0, 0, 0))[4] for name in self.sources]
+        return min(times) if times else time.time()
+
+    def plan(self, names):
+        """ {source: (groups, request allowance)} for one cycle. """
+        if not names: return {}
+        samples = {}
+        for name in names:
+            posts, requests = (self.store.source(name) or (0.0, 0.0))[:2]
+            samples[name] = self._sample(self.rng, posts, requests)
+        total = sum(samples.values()) or 1.0
+        if self.budget >= len(names):
+            spare = self.budget - len(names)
+            allowances = {name: 1 + int(spare * samples[name] / total) for name in names}
+        else:
+            # Not even one request each: unplanned sources stay due
+            ranked = sorted(names, key=samples.get, reverse=True)
+            allowances = {name: 1 for name in ranked[:max(0, self.budget)]}
+
+        plan = {}
+        for name, allowance in allowances.items():
+            _, queries, group_size = self.sources[name]
+            state = self.store.source(name)
+            # Requests one group costs (paging) from past runs; 1 until measured.
+            # A group that costs more than the allowance is cut short by it
+            per_group = max(1.0, state[1] / state[2]) if state and state[2] else 1.0
+            n_groups = max(1, int(allowance / per_group))
+
+            arms = self.store.arms(name)
+            ranked = sorted(queries, key=lambda q: self._sample(self.rng, *arms.get(q, (0.0, 0.0))), reverse=True)
+            chosen = ranked[:n_groups * group_size]
+            groups = [tuple(chosen[i:i + group_size]) for i in range(0, len(chosen), group_size)]
+            plan[name] = (groups, allowance)
+        self.planned.update(plan)
+        return plan
+
+    def source(self, name, groups, allowance):
+        """ Pipeline source running only the planned groups of one iter_*. """
+        iterate = self.sources[name][0]
+
+        def run():
+            start = thread_requests()
+            set_request_allowance(allowance)
+            try:
+                for group in groups:
+                    if thread_requests() - start >= allowance: break
+                    before = thread_requests()
+                    try:
+                        for page in iterate(queries=list(group)):
+                            with self._lock:
+                                for doc, _ in page or []:
+                                    self.origin[doc["reddit_id"]] = (name, group)
+                            yield page
+                    finally:
+                        with self._lock:
+                            self.pulled[(name, group)] = self.pulled.get((name, group), 0) + thread_requests() - before
+            finally:
+                set_request_allowance(None)
+        return run
+
+    def observe_inserted(self, docs):
+        """ INSERT_LISTENERS hook: credits new posts to the group that fetched them. """
+        with self._lock:
+            for doc in docs:
+                key = self.origin.pop(doc.get("reddit_id"), None)
+                if key is not None:
+                    self.inserted[key] = self.inserted.get(key, 0) + 1
+
+    def update(self, now=None):
+        """ Folds this cycle into the stored yields and intervals. Returns {source: (posts, requests, interval)}. """
+        now = now or time.time()
+        with self._lock:
+            pulled, inserted, planned = self.pulled, self.inserted, self.planned
+            self.pulled, self.inserted, self.origin, self.planned = {}, {}, {}, set()
+
+        # Planned sources that sent nothing still get their next due time
+        by_source = {name: [] for name in planned}
+        for (name, group), requests in pulled.items():
+            by_source.setdefault(name, []).append((group, requests, inserted.get((name, group), 0)))
+
+        report = {}
+        for name, runs in by_source.items():
+            arm_deltas = {}
+            posts = sum(p for _, _, p in runs)
+            requests = sum(r for _, r, _ in runs)
+            for group, r, p in runs:
+                # A group shares one request (reddit OR-chunks, HN) -> split evenly
+                for query in group:
+                    old_p, old_r = arm_deltas.get(query, (0.0, 0.0))
+                    arm_deltas[query] = (old_p + p / len(group), old_r + r / len(group))
+
+            state = self.store.source(name)
+            interval = state[3] if state else self.base_interval
+            if requests:
+                run_yield = posts / requests
+                if run_yield >= self.high:
+                    interval = max(self.min_interval, interval / 2)
+                elif run_yield < self.low:
+                    interval = min(self.max_interval, interval * 1.5)
+            self.store.update(name, arm_deltas, posts, requests, len(runs), interval, now + interval)
+            report[name] = (posts, requests, interval)
+        return report
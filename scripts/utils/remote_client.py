@@ -0,0 +1,42 @@
+import requests
+
+class RemoteAIClient:
+    """
+    Same analyze / analyze_batch API as AgriAIClient, served by a warm
+    scripts/model_server.py process so short-lived jobs skip model loading.
+    If the server is unreachable and a 'fallback' factory is given, the
+    models are loaded locally instead (once).
+    """
+    def __init__(self, url, timeout=300, fallback=None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.fallback = fallback
+        self.cache = None
+        self._local = None
+        self._session = requests.Session()
+
+    def load(self):
+        return self
+
+    def analyze(self, text):
+        if not text: return None
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        if self._local is not None:
+            return self._local.analyze_batch(texts)
+        try:
+            resp = self._session.post(f"{self.url}/analyze", json={"texts": list(texts)}, timeout=self.timeout)
+            resp.raise_for_status()
+            return resp.json()["results"]
+        except requests.exceptions.ConnectionError as e:
+            if not self.fallback: raise
+            print(f"      ⚠️ Model server unreachable ({e.__class__.__name__}). Loading models locally.")
+            self._local = self.fallback()
+            self.cache = getattr(self._local, "cache", None)
+            return self._local.analyze_batch(texts)
+
+    def health(self):
+        resp = self._session.get(f"{self.url}/health", timeout=10)
+        resp.raise_for_status()
+        return resp.json()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import threading
+import urllib.parse
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+FIXTURE_FILE = "responses.jsonl"
+# Only what the fetchers read; transfer headers (Content-Encoding, ...) no longer match the stored body
+KEPT_HEADERS = ("Content-Type",)
+
+class FixtureStore:
+    """
+    Recorded HTTP responses, one JSON line per response in DIR/responses.jsonl:
+    {"url", "status", "headers", "body", "elapsed_ms"}.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, FIXTURE_FILE)
+        self.responses = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            self.responses = [json.loads(line) for line in f if line.strip()]
+        return self
+
+    def add(self, url, status, headers, body, elapsed_ms=0.0):
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in (headers or {}).items() if k in KEPT_HEADERS},
+            "body": body,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+        with self._lock:
+            self.responses.append(entry)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+def route_keys(url):
+    """
+    Lookup keys from most to least specific: the exact URL, then host + path
+    with trailing segments dropped one at a time ('/timelines/tag/stocks' ->
+    '/timelines/tag'), so a request for a keyword that was never recorded is
+    served by another recording of the same endpoint.
+    """
+    parts = urllib.parse.urlsplit(url)
+    keys = [url]
+    segments = parts.path.rstrip("/").split("/")
+    while len(segments) > 1:
+        keys.append(f"{parts.netloc}{'/'.join(segments)}")
+        segments = segments[:-1]
+    keys.append(parts.netloc)
+    return keys
+
+class ReplayAdapter(BaseAdapter):
+    """
+    requests transport that answers from a FixtureStore instead of the network.
+    Requests are matched by route_keys(); several recordings under one key are
+    served round-robin. latency_scale > 0 sleeps for the recorded response
+    time (x scale) to keep network waits in the picture. Unmatched URLs get a 404.
+    """
+    def __init__(self, store, latency_scale=0.0):
+        super().__init__()
+        self.latency_scale = latency_scale
+        self.routes = {}
+        for entry in store.responses:
+            for key in set(route_keys(entry["url"])):
+                self.routes.setdefault(key, []).append(entry)
+        self.served = 0
+        self.misses = 0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def _pick(self, url):
+        with self._lock:
+            for key in route_keys(url):
+                entries = self.routes.get(key)
+                if entries:
+                    index = self._next.get(key, 0)
+                    self._next[key] = index + 1
+                    self.served += 1
+                    return entries[index % len(entries)]
+            self.misses += 1
+        return None
+
+    def send(self, request, **kwargs):
+        entry = self._pick(request.url)
+        resp = Response()
+        resp.url = request.url
+        resp.request = request
+        resp.encoding = "utf-8"
+        if entry is None:
+            resp.status_code, resp.reason, resp._content = 404, "Not Recorded", b""
+            return resp
+        if self.latency_scale > 0:
+            time.sleep(entry.get("elapsed_ms", 0) / 1000 * self.latency_scale)
+        resp.status_code = entry["status"]
+        resp.reason = "OK" if entry["status"] == 200 else ""
+        resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        resp._content = entry["body"].encode("utf-8")
+        # Body already in memory: stream=True callers get it back in slices
+        resp._content_consumed = True
+        return resp
+
+    def close(self):
+        pass
+
+class RecordingAdapter(HTTPAdapter):
+    """ Pass-through HTTPAdapter that appends every 200 response to a FixtureStore. """
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        resp = super().send(request, **kwargs)
+        if resp.status_code == 200:
+            body = resp.content.decode("utf-8", "replace")
+            self.store.add(request.url, resp.status_code, resp.headers, body,
+                           (time.perf_counter() - started) * 1000)
+        return resp
@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, UpdateOne
+
+ROLLUPS_COLLECTION = "sentiment_rollups"
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+# granularity -> (truncate, retention); minute/hour buckets expire via a TTL
+# index on 'expires_at', 'retention' after the bucket itself, and posts
+# already older than that (backfills) skip the granularity; day buckets are
+# kept forever
+GRANULARITIES = {
+    "minute": (lambda ts: ts.replace(second=0, microsecond=0), timedelta(days=2)),
+    "hour": (lambda ts: ts.replace(minute=0, second=0, microsecond=0), timedelta(days=90)),
+    "day": (lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0), None),
+}
+
+class SentimentRollups:
+    """
+    Incremental (granularity x bucket x source) sentiment rollups.
+
+    Each doc in 'sentiment_rollups' holds post counts and confidence sums per
+    sentiment for one minute / hour / day bucket of one source, so the
+    dashboard reads O(buckets) docs instead of grouping over 'posts'.
+    Ingest calls increment() for newly inserted posts; rebuild() recomputes
+    everything (or everything since a date) from 'posts'.
+    """
+    def __init__(self, db):
+        self.collection = db[ROLLUPS_COLLECTION]
+        self.posts = db['posts']
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        self.collection.create_index([("granularity", ASCENDING), ("bucket", ASCENDING)], name="granularity_bucket")
+        self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+
+    @staticmethod
+    def accumulate(deltas, doc):
+        """ Adds one post to an in-memory {(granularity, bucket, source): delta} map. """
+        analysis = doc.get("analysis") or {}
+        sentiment = analysis.get("sentiment_class")
+        timestamp = doc.get("timestamp")
+        if sentiment not in SENTIMENTS or not isinstance(timestamp, datetime):
+            return
+        source = doc.get("source_lc") or (doc.get("source") or "").lower()
+        age = (datetime.now(timezone.utc) if timestamp.tzinfo else datetime.now()) - timestamp
+        for granularity, (truncate, retention) in GRANULARITIES.items():
+            # The bucket would be past its TTL on arrival
+            if retention and age >= retention: continue
+            key = (granularity, truncate(timestamp), source)
+            delta = deltas.setdefault(key, {})
+            delta[f"counts.{sentiment}"] = delta.get(f"counts.{sentiment}", 0) + 1
+            delta[f"confidence.{sentiment}"] = delta.get(f"confidence.{sentiment}", 0.0) + float(analysis.get("confidence") or 0)
+            delta["total"] = delta.get("total", 0) + 1
+
+    def increment(self, docs):
+        """ $inc's the buckets of freshly inserted posts. Returns the number of buckets touched. """
+        deltas = {}
+        for doc in docs:
+            self.accumulate(deltas, doc)
+        return self._apply(deltas)
+
+    def _apply(self, deltas):
+        if not deltas: return 0
+        ops = []
+        for (granularity, bucket, source), inc in deltas.items():
+            update = {"$inc": inc, "$setOnInsert": {"granularity": granularity, "bucket": bucket, "source_lc": source}}
+            retention = GRANULARITIES[granularity][1]
+            if retention:
+                update["$set"] = {"expires_at": bucket + retention}
+            ops.append(UpdateOne({"_id": f"{granularity}|{bucket.isoformat()}|{source}"}, update, upsert=True))
+        with self._lock:
+            self.collection.bulk_write(ops, ordered=False)
+        return len(ops)
+
+    def rebuild(self, since=None, chunk=50_000):
+        """
+        Recomputes rollups from 'posts' (all of them, or posts at/after 'since',
+        which is truncated to the day so no bucket is half-rebuilt).
+        Returns the number of posts scanned.
+        """
+        self.ensure_indexes()
+        query = {"analysis.sentiment_class": {"$in": list(SENTIMENTS)}}
+        if since:
+            since = GRANULARITIES["day"][0](since)
+            query["timestamp"] = {"$gte": since}
+            # Every granularity, so the delete walks the granularity_bucket index
+            self.collection.delete_many({"granularity": {"$in": list(GRANULARITIES)}, "bucket": {"$gte": since}})
+        else:
+            self.collection.delete_many({})
+
+        cursor = self.posts.find(query, {
+            "timestamp": 1, "source": 1, "source_lc": 1,
+            "analysis.sentiment_class": 1, "analysis.confidence": 1, "_id": 0
+        }, batch_size=10_000)
+
+        deltas, scanned = {}, 0
+        for doc in cursor:
+            self.accumulate(deltas, doc)
+            scanned += 1
+            if scanned % chunk == 0:
+                self._apply(deltas)
+                deltas = {}
+                print(f"      📈 Rollups: {scanned:,} posts scanned...")
+        self._apply(deltas)
+        print(f"      📈 Rebuilt rollups from {scanned:,} posts")
+        return scanned
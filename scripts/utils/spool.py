@@ -0,0 +1,252 @@
+import os
+import json
+import mmap
+import time
+import struct
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from utils.inference_cache import CACHE_DIR
+
+# Segment = MAGIC + codec byte, then records of 4-byte big-endian length + payload
+MAGIC = b"FSPL\x01"
+LENGTH = struct.Struct(">I")
+CODEC = b"m" if msgpack is not None else b"j"
+
+# File states: appending -> (wal: waiting for this run's checkpoint) -> ready for replay -> being replayed
+OPEN, PENDING, SEALED, LOADING = ".open", ".pending", ".seg", ".loading"
+
+def _default(obj):
+    if isinstance(obj, datetime): return {"$date": obj.isoformat()}
+    # numpy scalars in analysis scores
+    if hasattr(obj, "item"): return obj.item()
+    raise TypeError(f"Cannot spool {type(obj).__name__}")
+
+def _hook(obj):
+    if len(obj) == 1 and "$date" in obj: return datetime.fromisoformat(obj["$date"])
+    return obj
+
+def encode(doc, codec=CODEC):
+    if codec == b"m":
+        return msgpack.packb(doc, default=_default, use_bin_type=True)
+    return json.dumps(doc, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def decode(payload, codec):
+    if codec == b"m":
+        if msgpack is None: raise RuntimeError("segment was written with msgpack, which is not installed")
+        return msgpack.unpackb(payload, raw=False, object_hook=_hook, strict_map_key=False)
+    return json.loads(payload, object_hook=_hook)
+
+def read_segment(path):
+    """
+    Yields the docs of one segment through a read-only mmap. A torn record at
+    the end (process killed mid-append) ends the segment instead of failing it.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a spool segment")
+            codec = view[len(MAGIC):len(MAGIC) + 1]
+            offset, end = len(MAGIC) + 1, len(view)
+            while offset + LENGTH.size <= end:
+                (size,) = LENGTH.unpack_from(view, offset)
+                offset += LENGTH.size
+                if offset + size > end: break
+                yield decode(view[offset:offset + size], codec)
+                offset += size
+
+def _pid_of(path):
+    try:
+        return int(os.path.basename(path).split(".")[0].rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+def _alive(pid, path):
+    if pid == os.getpid(): return True
+    if pid is None: return False
+    if os.name == "nt":
+        # No cheap liveness probe: trust files touched in the last hour
+        return time.time() - os.path.getmtime(path) < 3600
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class PostSpool:
+    """
+    Local append-only spool of analyzed posts, written before they reach Mongo.
+
+    Posts are appended to segment files (FIN_SPOOL_SEGMENT_MB each) as
+    length-prefixed msgpack records (JSON when msgpack is not installed).
+    FIN_SPOOL picks the mode:
+    - wal:  (default) posts are also written to Mongo right away; a run's
+            segments are deleted at checkpoint() if every post write succeeded,
+            otherwise sealed for replay_spool.py
+    - only: ingest writes to disk only; replay_spool.py loads the segments
+    - off:  no spool
+    Segments left behind by a crashed process are sealed on start-up.
+    """
+    def __init__(self, directory=None, mode=None, segment_bytes=None, fsync=None):
+        self.directory = directory or os.getenv('FIN_SPOOL_DIR') or os.path.join(CACHE_DIR, 'spool')
+        self.mode = mode or os.getenv('FIN_SPOOL', 'wal')
+        self.segment_bytes = segment_bytes or int(float(os.getenv('FIN_SPOOL_SEGMENT_MB', '64')) * 1e6)
+        self.fsync = fsync if fsync is not None else os.getenv('FIN_SPOOL_FSYNC', '0') != '0'
+        self.appended = 0
+        self.failed = 0
+        self._file = None
+        self._path = None
+        self._size = 0
+        self._run = []           # this run's closed, unchecked segments (wal)
+        self._lock = threading.Lock()
+        if self.mode != "off":
+            os.makedirs(self.directory, exist_ok=True)
+            self.recover()
+
+    # ---- writing ----
+
+    def _rename(self, path, state):
+        target = os.path.splitext(path)[0] + state
+        os.replace(path, target)
+        return target
+
+    def _close_active(self):
+        if self._file is None: return
+        self._file.close()
+        path, self._file, self._path = self._path, None, None
+        if self.mode == "wal":
+            self._run.append(self._rename(path, PENDING))
+        else:
+            self._rename(path, SEALED)
+
+    def append(self, docs):
+        """ Appends docs as one write (flushed; fsynced with FIN_SPOOL_FSYNC=1). """
+        if self.mode == "off" or not docs: return 0
+        payload = bytearray()
+        for doc in docs:
+            record = encode(doc)
+            payload += LENGTH.pack(len(record)) + record
+        with self._lock:
+            if self._file is None:
+                self._path = os.path.join(self.directory, f"seg-{time.time_ns()}-{os.getpid()}{OPEN}")
+                self._file = open(self._path, "ab")
+                self._file.write(MAGIC + CODEC)
+                self._size = len(MAGIC) + 1
+            self._file.write(payload)
+            self._file.flush()
+            if self.fsync: os.fsync(self._file.fileno())
+            self._size += len(payload)
+            self.appended += len(docs)
+            if self._size >= self.segment_bytes:
+                self._close_active()
+        return len(docs)
+
+    def mark_failed(self, docs):
+        """ BulkWriter on_failed hook: this run's segments must be replayed. """
+        with self._lock:
+            self.failed += len(docs)
+
+    def checkpoint(self):
+        """
+        End of a run (after the writer is closed). wal: deletes the run's
+        segments when nothing failed, else seals them. Returns the segments sealed.
+        """
+        with self._lock:
+            if self.mode == "off":
+                self.failed = 0
+                return 0
+            self._close_active()
+            run, failed = self._run, self.failed
+            self._run, self.failed = [], 0
+        for path in run:
+            if failed:
+                self._rename(path, SEALED)
+            else:
+                os.remove(path)
+        return len(run) if failed else 0
+
+    # ---- segments ----
+
+    def recover(self):
+        """ Seals open / pending / half-replayed segments whose process is gone. """
+        recovered = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith((OPEN, PENDING, LOADING)) or _alive(_pid_of(path), path): continue
+            try:
+                self._rename(path, SEALED)
+                recovered += 1
+            except OSError:
+                continue
+        if recovered:
+            print(f"      📼 Spool: recovered {recovered} segment(s) from an interrupted run")
+        return recovered
+
+    def segments(self):
+        """ Sealed segments, oldest first. """
+        if not os.path.isdir(self.directory): return []
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(SEALED))
+
+    def claim(self, path):
+        """ Renames a sealed segment to this process's loading name; None if another replayer got it. """
+        stamp = os.path.basename(path).split("-")[1]
+        target = os.path.join(self.directory, f"seg-{stamp}-{os.getpid()}{LOADING}")
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        return target
+
+    def release(self, path, loaded, keep=False):
+        """ Loaded segments are deleted (or moved to done/ with keep); failed ones go back for the next replay. """
+        if not loaded:
+            return self._rename(path, SEALED)
+        if not keep:
+            os.remove(path)
+            return None
+        done = os.path.join(self.directory, "done")
+        os.makedirs(done, exist_ok=True)
+        target = os.path.join(done, os.path.splitext(os.path.basename(path))[0] + SEALED)
+        os.replace(path, target)
+        return target
+
+def replay(spool, make_writer, workers=None, keep=False, chunk=1000):
+    """
+    Bulk-loads every sealed segment into Mongo, 'workers' segments in
+    parallel, each through its own writer from make_writer(). A segment is
+    released only if none of its writes failed. Returns (segments, docs, failed segments).
+    """
+    workers = workers or int(os.getenv('FIN_SPOOL_WORKERS', '4'))
+
+    def load(path):
+        path = spool.claim(path)
+        if path is None: return 0, 0, False
+        writer, count, loaded = make_writer(), 0, True
+        try:
+            batch = []
+            for doc in read_segment(path):
+                batch.append(doc)
+                if len(batch) >= chunk:
+                    count += writer.upsert_many(batch)
+                    batch = []
+            count += writer.upsert_many(batch)
+        except Exception as e:
+            print(f"      ⚠️ Spool Replay Error ({os.path.basename(path)}): {e}")
+            loaded = False
+        writer.close()
+        loaded = loaded and writer.stats.failed == 0
+        spool.release(path, loaded, keep)
+        return 1, count, not loaded
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="spool-replay") as pool:
+        results = list(pool.map(load, spool.segments()))
+    return (sum(r[0] for r in results), sum(r[1] for r in results), sum(1 for r in results if r[2]))
@@ -0,0 +1,214 @@
+import re
+import time
+import threading
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from utils.keyword_matcher import KeywordMatcher
+
+SNAPSHOTS_COLLECTION = "trend_snapshots"
+PANES_COLLECTION = "trend_panes"
+
+# window -> (pane seconds, number of panes); a window is the merge of its
+# most recent panes, so it slides by one pane at a time
+WINDOWS = {
+    "1h": (5 * 60, 12),
+    "24h": (60 * 60, 24),
+    "7d": (6 * 60 * 60, 28),
+}
+
+STOP_WORDS = {
+    "the", "and", "for", "that", "with", "from", "this", "market", "stock", "video", "news",
+    "update", "analysis", "price", "today", "what", "when", "will", "your", "about", "have",
+    "just", "into", "over", "after", "they", "their", "there", "would", "could", "should",
+    "more", "than", "here", "why", "how", "are", "was", "you", "not", "but", "all", "new",
+}
+WORD_RE = re.compile(r"[a-z0-9][a-z0-9\-\.]*[a-z0-9]|[a-z0-9]")
+
+def tokenize(text):
+    return WORD_RE.findall((text or "").lower())
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary (Metwally et al.) over at most k terms.
+    Every tracked count over-estimates the true count by at most 'error';
+    any term occurring more than N/k times is guaranteed to be tracked.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}   # term -> [count, error]
+
+    def offer(self, term, weight=1):
+        entry = self.counts.get(term)
+        if entry is not None:
+            entry[0] += weight
+        elif len(self.counts) < self.k:
+            self.counts[term] = [weight, 0]
+        else:
+            # Evict the minimum; the newcomer inherits its count as error
+            victim = min(self.counts, key=lambda t: self.counts[t][0])
+            floor = self.counts.pop(victim)[0]
+            self.counts[term] = [floor + weight, floor]
+
+    def merge(self, other):
+        """ Sums another summary into this one (counts and errors add up). """
+        for term, (count, error) in other.counts.items():
+            entry = self.counts.setdefault(term, [0, 0])
+            entry[0] += count
+            entry[1] += error
+        if len(self.counts) > self.k:
+            keep = sorted(self.counts.items(), key=lambda kv: kv[1][0], reverse=True)[:self.k]
+            self.counts = dict(keep)
+        return self
+
+    def top(self, n):
+        return sorted(self.counts.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+
+class TrendEngine:
+    """
+    Streaming trend terms over sliding 1h / 24h / 7d windows.
+
+    Each window is a ring of time panes, each pane a Space-Saving summary of
+    at most k terms, so memory is bounded by panes x k whatever the stream
+    size. Terms are MARKET_KEYWORDS phrases (Aho-Corasick match) in the post plus
+    free words / bigrams of the title; counts are posts mentioning the term.
+    Posts are placed by their own timestamp; panes older than the window are
+    dropped.
+
+    Panes persist in 'trend_panes', one document per (window, pane, term),
+    so windows survive between ingest runs. flush() adds only the counts
+    observed since the last flush ($inc), so concurrent ingest processes sum
+    up instead of overwriting each other, drops panes older than their
+    window, then writes the top-K of every window (as now stored) to
+    'trend_snapshots' for the dashboard.
+    """
+    def __init__(self, db, keywords, k=200, top_k=25, clock=time.time):
+        self.db = db
+        self.matcher = KeywordMatcher(keywords)
+        self.k = k
+        self.top_k = top_k
+        self.clock = clock
+        self.panes = {window: {} for window in WINDOWS}   # window -> {pane index: SpaceSaving}
+        self.pending = {window: {} for window in WINDOWS}  # same, only what flush() hasn't written yet
+        self.keyword_terms = set(keywords)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    # ---- ingest ----
+
+    def terms(self, doc):
+        """ Distinct terms of one post. """
+        title = tokenize(doc.get("title"))
+        words = [w for w in title if len(w) > 3 and w not in STOP_WORDS and not w.isdigit()]
+        keywords = set(self.matcher.match(f"{doc.get('title') or ''} {(doc.get('content') or '')[:2000]}"))
+        # Free terms that just repeat a matched keyword would double count it
+        covered = {w for keyword in keywords for w in tokenize(keyword)}
+        free = set(w for w in words if w not in covered)
+        free.update(f"{a} {b}" for a, b in zip(words, words[1:]) if not (a in covered and b in covered))
+        return keywords | free
+
+    def observe(self, docs):
+        """ Adds posts to every window they fall into. """
+        self.load()
+        now = self.clock()
+        with self._lock:
+            for doc in docs:
+                timestamp = doc.get("timestamp")
+                if not isinstance(timestamp, datetime): continue
+                ts = timestamp.timestamp()
+                terms = None
+                for window, (pane_seconds, n_panes) in WINDOWS.items():
+                    if ts < now - pane_seconds * n_panes or ts > now + pane_seconds: continue
+                    terms = terms if terms is not None else self.terms(doc)
+                    index = int(ts // pane_seconds)
+                    pane = self.panes[window].setdefault(index, SpaceSaving(self.k))
+                    delta = self.pending[window].setdefault(index, SpaceSaving(self.k))
+                    for term in terms:
+                        pane.offer(term)
+                        delta.offer(term)
+
+    def top(self, window, n=None):
+        """ Merged top terms of a window: [(term, count, error)]. """
+        pane_seconds, n_panes = WINDOWS[window]
+        oldest = int(self.clock() // pane_seconds) - n_panes + 1
+        merged = SpaceSaving(self.k)
+        with self._lock:
+            for index, pane in self.panes[window].items():
+                if index >= oldest: merged.merge(pane)
+        return [(term, count, error) for term, (count, error) in merged.top(n or self.top_k)]
+
+    # ---- persistence ----
+
+    def _read_panes(self, now):
+        """ Live panes as stored: window -> {pane index: SpaceSaving}, each cut to the top k. """
+        panes = {window: {} for window in WINDOWS}
+        for window, (pane_seconds, n_panes) in WINDOWS.items():
+            oldest = int(now // pane_seconds) - n_panes + 1
+            for doc in self.db[PANES_COLLECTION].find({"window": window, "pane": {"$gte": oldest}, "term": {"$exists": True}}):
+                pane = panes[window].setdefault(doc["pane"], SpaceSaving(self.k))
+                pane.counts[doc["term"]] = [doc["count"], doc.get("error", 0)]
+            for pane in panes[window].values():
+                if len(pane.counts) > self.k: pane.counts = dict(pane.top(self.k))
+        return panes
+
+    def load(self):
+        """ Restores live panes from Mongo (once). """
+        if self._loaded: return
+        with self._lock:
+            if self._loaded: return
+            self._loaded = True
+            try:
+                self.panes = self._read_panes(self.clock())
+            except Exception as e:
+                print(f"      ⚠️ Trend Pane Load Error: {e}")
+
+    def flush(self):
+        """ Adds pending pane counts, drops expired panes and writes top-K snapshots. """
+        if not self._loaded: return
+        now = self.clock()
+        with self._lock:
+            pending, self.pending = self.pending, {window: {} for window in WINDOWS}
+
+        pane_ops = []
+        for window, panes in pending.items():
+            for index, pane in panes.items():
+                for term, (count, error) in pane.counts.items():
+                    pane_ops.append(UpdateOne(
+                        {"_id": f"{window}|{index}|{term}"},
+                        {"$inc": {"count": count, "error": error},
+                         "$setOnInsert": {"window": window, "pane": index, "term": term}},
+                        upsert=True
+                    ))
+        try:
+            if pane_ops: self.db[PANES_COLLECTION].bulk_write(pane_ops, ordered=False)
+        except Exception:
+            # Keep the counts for the next flush (a retried $inc may double count a few terms)
+            with self._lock:
+                for window, panes in pending.items():
+                    for index, pane in panes.items():
+                        self.pending[window].setdefault(index, SpaceSaving(self.k)).merge(pane)
+            raise
+        for window, (pane_seconds, n_panes) in WINDOWS.items():
+            oldest = int(now // pane_seconds) - n_panes + 1
+            self.db[PANES_COLLECTION].delete_many({"window": window, "pane": {"$lt": oldest}})
+
+        # Windows as stored now, other processes' counts included, plus what arrived meanwhile
+        panes = self._read_panes(now)
+        with self._lock:
+            for window, pending_panes in self.pending.items():
+                for index, pane in pending_panes.items():
+                    panes[window].setdefault(index, SpaceSaving(self.k)).merge(pane)
+            self.panes = panes
+
+        snapshot_ops = []
+        for window in WINDOWS:
+            terms = [{"term": term, "count": count, "error": error, "keyword": term in self.keyword_terms}
+                     for term, count, error in self.top(window)]
+            snapshot_ops.append(UpdateOne(
+                {"_id": window},
+                {"$set": {"window": window, "terms": terms, "generated_at": datetime.utcnow()}},
+                upsert=True
+            ))
+        self.db[SNAPSHOTS_COLLECTION].bulk_write(snapshot_ops, ordered=False)
+        return len(snapshot_ops)
@@ -1,38 +1,48 @@
 
 import sys
 import os
+import csv
+import time
+import argparse
 
 # Ensure we can import from local scripts
 sys.path.append(os.path.join(os.getcwd(), 'scripts'))
 
-from utils.ai_client import AgriAIClient
-
-def test_gatekeeper():
-    print("🚀 Initializing AI Client...")
-    ai = AgriAIClient()
-    
-    test_cases = [
-        {
-            "text": "I'm currently at home watching the new episodes of Stranger Things and realized this show is way better with someone else on the couch. I work in finance but tonight implies comfy vibes.",
-            "expected": False,
-            "label": "Non-Financial (Dating/TV)"
-        },
-        {
-            "text": "NVIDIA stock surges 5% after earnings report beats expectations. Analysts predict strong growth in AI sector.",
-            "expected": True,
-            "label": "Financial (Stock News)"
-        },
-        {
-            "text": "The Federal Reserve might raise interest rates next month to combat inflation.",
-            "expected": True,
-            "label": "Financial (Macro)"
-        },
-        {
-            "text": "Looking for a gym buddy in downtown Toronto. I like lifting and cardio.",
-            "expected": False,
-            "label": "Non-Financial (Personal)"
-        }
-    ]
+from utils.ai_client import AgriAIClient, GATEKEEPER_MODEL
+from utils.gatekeeper import ZeroShotGatekeeper
+from utils.keyword_matcher import default_matcher
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test_dataset.csv')
+
+TEST_CASES = [
+    {
+        "text": "I'm currently at home watching the new episodes of Stranger Things and realized this show is way better with someone else on the couch. I work in finance but tonight implies comfy vibes.",
+        "expected": False,
+        "label": "Non-Financial (Dating/TV)"
+    },
+    {
+        "text": "NVIDIA stock surges 5% after earnings report beats expectations. Analysts predict strong growth in AI sector.",
+        "expected": True,
+        "label": "Financial (Stock News)"
+    },
+    {
+        "text": "The Federal Reserve might raise interest rates next month to combat inflation.",
+        "expected": True,
+        "label": "Financial (Macro)"
+    },
+    {
+        "text": "Looking for a gym buddy in downtown Toronto. I like lifting and cardio.",
+        "expected": False,
+        "label": "Non-Financial (Personal)"
+    }
+]
+
+def test_gatekeeper(ai=None):
+    if ai is None:
+        print("🚀 Initializing AI Client...")
+        ai = AgriAIClient()
+    
+    test_cases = TEST_CASES
     
     print("\n🧪 Running Gatekeeper Tests...\n")
     
@@ -49,6 +59,139 @@ def test_gatekeeper():
             passed += 1
             
     print(f"🏁 Result: {passed}/{len(test_cases)} Passed.")
+    return passed
+
+def load_sample_texts(limit=200):
+    texts = [case['text'] for case in TEST_CASES]
+    try:
+        with open(DATASET_PATH, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if len(texts) >= limit: break
+                texts.append(row['text'])
+    except FileNotFoundError:
+        pass
+    return texts
+
+def is_relevant(result):
+    """ Same 0.4 rule as AgriAIClient.analyze_batch """
+    return not (result['labels'][0] != AgriAIClient.CANDIDATE_LABELS[0] and result['scores'][0] > 0.4)
+
+def compare_gatekeepers(ai, limit=200):
+    """
+    Runs the single-pass gatekeeper against the original zero-shot pipeline
+    and reports speedup and decision agreement.
+    """
+    from transformers import pipeline
+    
+    texts = load_sample_texts(limit)
+    labels = AgriAIClient.CANDIDATE_LABELS
+    reference = pipeline("zero-shot-classification", model=GATEKEEPER_MODEL)
+    
+    print(f"\n⏱️  Comparing gatekeepers on {len(texts)} texts...\n")
+    
+    start = time.perf_counter()
+    expected = [reference(text, labels) for text in texts]
+    pipeline_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    actual = []
+    for chunk in ai._length_buckets(texts, range(len(texts)), ai.BATCH_SIZE):
+        actual.extend(zip(chunk, ai.classifier([texts[i] for i in chunk], labels)))
+    actual = [result for _, result in sorted(actual, key=lambda x: x[0])]
+    single_pass_time = time.perf_counter() - start
+    
+    agree = sum(1 for e, a in zip(expected, actual) if is_relevant(e) == is_relevant(a))
+    top_agree = sum(1 for e, a in zip(expected, actual) if e['labels'][0] == a['labels'][0])
+    max_diff = max(abs(e['scores'][0] - a['scores'][a['labels'].index(e['labels'][0])]) for e, a in zip(expected, actual))
+    
+    print(f"   Pipeline:    {pipeline_time:.2f}s ({len(texts) / pipeline_time:.1f} texts/s)")
+    print(f"   Single-pass: {single_pass_time:.2f}s ({len(texts) / single_pass_time:.1f} texts/s)")
+    print(f"   Speedup:     {pipeline_time / single_pass_time:.1f}x")
+    print(f"   Agreement:   {agree}/{len(texts)} relevance decisions, {top_agree}/{len(texts)} top labels (max score diff {max_diff:.4f})")
+    return agree, len(texts)
+
+def current_rss_mb():
+    """ Resident memory of this process (Linux), 0 if unavailable. """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def time_analyze(ai, texts):
+    start = time.perf_counter()
+    results = ai.analyze_batch(texts)
+    return results, time.perf_counter() - start
+
+def compare_backends(reference, backend, limit=200):
+    """
+    Accuracy-parity check of a quantized / ONNX backend against fp32 torch:
+    verify cases, relevance + sentiment agreement, latency and RSS growth.
+    """
+    print(f"\n⚖️  Parity check: {backend} vs {reference.backend}")
+    rss_before = current_rss_mb()
+    candidate = AgriAIClient(backend=backend, cache=False, prefilter=False)
+    rss_delta = current_rss_mb() - rss_before
+    
+    passed = test_gatekeeper(candidate)
+    
+    texts = load_sample_texts(limit)
+    expected, reference_time = time_analyze(reference, texts)
+    actual, candidate_time = time_analyze(candidate, texts)
+    
+    pairs = [(e, a) for e, a in zip(expected, actual) if e and a]
+    relevance = sum(1 for e, a in pairs if e['is_relevant'] == a['is_relevant'])
+    both = [(e, a) for e, a in pairs if e['is_relevant'] and a['is_relevant']]
+    sentiment = sum(1 for e, a in both if e['sentiment_class'] == a['sentiment_class'])
+    
+    print(f"\n   Verify cases: {passed}/{len(TEST_CASES)}")
+    print(f"   Relevance agreement: {relevance}/{len(pairs)}")
+    print(f"   Sentiment agreement: {sentiment}/{len(both)}")
+    print(f"   Latency: {reference.backend} {reference_time:.2f}s vs {backend} {candidate_time:.2f}s ({reference_time / candidate_time:.1f}x)")
+    print(f"   RSS added by {backend} models: {rss_delta:.0f} MB")
+    return relevance, sentiment
+
+def compare_prefilter(ai, limit=200):
+    """
+    How often the keyword pre-filter decides alone (confident hit / negative-
+    list miss) and how often those decisions agree with the gatekeeper model.
+    Check the agreement rate here before turning FIN_AI_PREFILTER on.
+    """
+    matcher = default_matcher()
+    texts = [t for t in load_sample_texts(limit) if len(t.split()) >= 3]
+    print(f"\n🔎 Keyword pre-filter vs gatekeeper on {len(texts)} texts...\n")
+
+    model = ai.analyze_batch(texts)
+    decided, agree = {"hit": 0, "miss": 0}, {"hit": 0, "miss": 0}
+    for text, result in zip(texts, model):
+        _, _, decision = matcher.triage(text)
+        if decision not in decided or result is None: continue
+        decided[decision] += 1
+        if result['is_relevant'] == (decision == "hit"):
+            agree[decision] += 1
+
+    for decision in ("hit", "miss"):
+        print(f"   Clear {decision}s: {decided[decision]}/{len(texts)}, gatekeeper agrees on {agree[decision]}")
+    print(f"   Agreement rate: {sum(agree.values()) / max(1, sum(decided.values())):.1%} of pre-filter decisions")
+    print(f"   Gatekeeper calls saved: {sum(decided.values()) / max(1, len(texts)):.0%}")
+    return decided, agree
 
 if __name__ == "__main__":
-    test_gatekeeper()
+    parser = argparse.ArgumentParser(description="Gatekeeper / backend verification")
+    parser.add_argument("--backend", default=None, help="also run a parity check of this backend (int8, onnx) against fp32")
+    parser.add_argument("--limit", type=int, default=200, help="sample size from test_dataset.csv")
+    args = parser.parse_args()
+    
+    rss_before = current_rss_mb()
+    ai = AgriAIClient(backend="torch", cache=False, prefilter=False)
+    print(f"   RSS added by torch models: {current_rss_mb() - rss_before:.0f} MB")
+    
+    test_gatekeeper(ai)
+    if isinstance(ai.classifier, ZeroShotGatekeeper):
+        compare_gatekeepers(ai, args.limit)
+    compare_prefilter(ai, args.limit)
+    if args.backend and args.backend != "torch":
+        compare_backends(ai, args.backend, args.limit)